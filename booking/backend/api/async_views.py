@@ -0,0 +1,123 @@
+"""
+Support for the async read views.
+
+The hot read endpoints have async-native versions (``<app>/async_views.py``)
+that query through Django's async ORM, so under ASGI a request waiting on the
+database does not hold a worker thread. ``read_async`` puts one in front of
+the matching DRF view: GET requests the async view can answer on its own are
+served there, everything else (writes, the browsable API, ``?format=``
+renderers, rejected credentials) goes to the DRF view unchanged, so both paths
+share one set of error responses.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from users.authentication import ClaimsJWTAuthentication
+from venues import access, routing
+
+_renderer = JSONRenderer()
+
+
+class Fallback(Exception):
+    """The async view cannot answer this request; the DRF view will."""
+
+
+class AsyncJWTAuthentication(ClaimsJWTAuthentication):
+    async def aauthenticate(self, request):
+        """``authenticate`` with the user read through the async ORM; None without credentials."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return await self.aget_user(self.get_validated_token(raw_token))
+
+
+_authentication = AsyncJWTAuthentication()
+
+
+async def authenticated_user(request):
+    """The token's user; raises ``Fallback`` so the DRF view reports missing or bad credentials."""
+    try:
+        user = await _authentication.aauthenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        raise Fallback()
+    if user is None:
+        raise Fallback()
+    return user
+
+
+async def venue_member(request):
+    """Like ``authenticated_user``, for staff of the current venue only."""
+    user = await authenticated_user(request)
+    if not await access.ais_member(user):
+        raise Fallback()
+    return user
+
+
+async def optional_user(request):
+    """The token's user or None without credentials; bad credentials raise ``Fallback``."""
+    try:
+        return await _authentication.aauthenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        raise Fallback()
+
+
+def json_response(data, status=200):
+    """JSON rendered exactly as DRF's ``JSONRenderer`` renders it."""
+    return HttpResponse(_renderer.render(data), status=status, content_type="application/json")
+
+
+async def conditional(request, etag, respond):
+    """
+    ``respond()`` (a coroutine function) tagged with ``etag``, or a 304 when
+    ``If-None-Match`` matches it; ``django.views.decorators.http.condition``
+    for async views.
+    """
+    response = get_conditional_response(request, etag=etag) or await respond()
+    response.headers.setdefault("ETag", etag)
+    return response
+
+
+def _wants_json(request):
+    if "format" in request.GET:
+        return False
+    accept = request.headers.get("Accept", "")
+    return "text/html" not in accept
+
+
+def read_async(async_view):
+    """
+    Route GET requests to ``async_view`` and the rest to the wrapped DRF view.
+    Returns the DRF view itself unless ``ASYNC_READ_VIEWS`` is on.
+    """
+
+    def decorator(sync_view):
+        if not settings.ASYNC_READ_VIEWS:
+            return sync_view
+
+        @csrf_exempt
+        @functools.wraps(sync_view)
+        async def view(request, *args, **kwargs):
+            if request.method == "GET" and _wants_json(request):
+                try:
+                    # Set by VenueMiddleware; activated here too so the async ORM code never resolves it
+                    with routing.activate(await routing.acurrent_id()):
+                        return await async_view(request, *args, **kwargs)
+                except Fallback:
+                    pass
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        view.async_view = async_view
+        return view
+
+    return decorator
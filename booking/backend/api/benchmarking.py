@@ -0,0 +1,298 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks never touch the development database: they run inside a throwaway
+test database that is created on entry and destroyed on exit. The HTTP load
+generator (``load_test``) is the exception: it drives servers that are
+already running.
+"""
+import asyncio
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """Create a fresh test database for the duration of the block."""
+    old_config = setup_databases(verbosity=verbosity, interactive=False, aliases={"default"})
+    try:
+        # Like the test runner: no per-query logging skewing the timings
+        with override_settings(DEBUG=False):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+
+
+def measure(func, repeat=20, setup=None):
+    """
+    Call ``func`` ``repeat`` times and return latency and query statistics;
+    ``setup`` runs untimed before each call (e.g. to clear a cache).
+    """
+    timings = []
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        queries = 0
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "runs": repeat,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3),
+        "per_second": round(repeat / (sum(timings) / 1000), 1),
+        "queries": queries,
+    }
+
+
+def seed_tables(count):
+    """Create ``count`` active tables with 2 to 8 seats in the current venue."""
+    from tables.models import Table
+    from venues.routing import current_id
+
+    venue_id = current_id()
+    rng = random.Random(count)
+    Table.objects.bulk_create(
+        Table(venue_id=venue_id, number=number, seats=rng.choice([2, 2, 4, 4, 4, 6, 8]), is_active=True)
+        for number in range(1, count + 1)
+    )
+    return list(Table.objects.in_venue(venue_id).values_list("id", flat=True))
+
+
+# Relative weight of each weekday (Monday first) and of each quarter hour from
+# 10:00 (index 0) to 22:00 (index 48): lunch and Friday/Saturday dinner peaks
+WEEKDAY_WEIGHTS = (2, 2, 3, 3, 5, 6, 4)
+SLOT_WEIGHTS = tuple(
+    8 if 36 <= slot <= 46 else 5 if 8 <= slot <= 16 else 1 for slot in range(49)
+)
+
+
+def seed_reservations(count, table_ids, days=365, start=None, batch_size=5000, seed=0, peaks=False):
+    """
+    Bulk-create ``count`` reservations spread over ``days`` days around ``start``.
+
+    Start times fall on quarter hours between 10:00 and 22:00 and each
+    reservation holds one or two tables that seat its guests. With ``peaks``
+    days and times follow ``WEEKDAY_WEIGHTS`` and ``SLOT_WEIGHTS`` instead of a
+    uniform spread.
+
+    Like the API, no table is held by two active reservations at once: a
+    reservation that finds no free tables is stored as cancelled.
+    """
+    from reservations import config, occupancy
+    from reservations.models import Reservation
+    from tables.models import Table
+    from venues.routing import current_id
+
+    venue_id = current_id()
+    conf = config.current(venue_id)
+    rng = random.Random(seed)
+    start = start or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = start - timedelta(days=days // 2)
+    statuses = [
+        Reservation.STATUS_CONFIRMED,
+        Reservation.STATUS_CONFIRMED,
+        Reservation.STATUS_PENDING,
+        Reservation.STATUS_CANCELLED,
+    ]
+    Link = Reservation.tables.through
+    seats = dict(Table.objects.filter(id__in=table_ids).values_list("id", "seats"))
+    # The fewest tables that seat each party size, for the turned-away parties
+    largest = sorted(table_ids, key=seats.get, reverse=True)
+    fallback = {}
+    for guests in range(1, 9):
+        chosen = []
+        while largest[len(chosen):] and sum(seats[table_id] for table_id in chosen) < guests:
+            chosen.append(largest[len(chosen)])
+        fallback[guests] = chosen
+    # Active windows per (table, day of start); a window may run past midnight
+    held = {}
+
+    def clashes(table_id, start, end):
+        return any(
+            held_start < end and start < held_end
+            for day in (start.date() + timedelta(days=offset) for offset in (-1, 0, 1))
+            for held_start, held_end in held.get((table_id, day), ())
+        )
+
+    def seat(reservation):
+        for _attempt in range(10):
+            tables = rng.sample(table_ids, rng.choice([1, 1, 1, 2]))
+            if sum(seats[table_id] for table_id in tables) < reservation.guests:
+                continue
+            if reservation.status == Reservation.STATUS_CANCELLED or not any(
+                clashes(table_id, reservation.start_datetime, reservation.end_datetime) for table_id in tables
+            ):
+                break
+        else:
+            reservation.status = Reservation.STATUS_CANCELLED
+            tables = fallback[reservation.guests]
+        if reservation.status != Reservation.STATUS_CANCELLED:
+            for table_id in tables:
+                held.setdefault((table_id, reservation.start_datetime.date()), []).append(
+                    (reservation.start_datetime, reservation.end_datetime)
+                )
+        return tables
+
+    if peaks:
+        day_weights = [WEEKDAY_WEIGHTS[(first_day + timedelta(days=day)).weekday()] for day in range(days)]
+
+        def pick_start():
+            day = rng.choices(range(days), day_weights)[0]
+            slot = rng.choices(range(49), SLOT_WEIGHTS)[0]
+            return first_day + timedelta(days=day, minutes=600 + 15 * slot)
+    else:
+
+        def pick_start():
+            return first_day + timedelta(days=rng.randrange(days), minutes=600 + 15 * rng.randrange(49))
+
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        batch = [
+            Reservation(
+                venue_id=venue_id,
+                customer_name=f"Guest {created + i}",
+                customer_phone="000000000",
+                start_datetime=pick_start(),
+                guests=min(rng.randint(1, 8), sum(seats.values())),
+                status=rng.choice(statuses),
+            )
+            for i in range(size)
+        ]
+        # bulk_create skips save(), which fills the end
+        for reservation in batch:
+            reservation.end_datetime = reservation.start_datetime + conf.duration_for(reservation.guests)
+        batch_tables = [seat(reservation) for reservation in batch]
+        Reservation.objects.bulk_create(batch)
+        links = [
+            Link(reservation_id=reservation.pk, table_id=table_id)
+            for reservation, tables in zip(batch, batch_tables)
+            for table_id in tables
+        ]
+        Link.objects.bulk_create(links)
+        occupancy.sync_reservations(reservation.pk for reservation in batch)
+        created += size
+    return created
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class _Connection:
+    """Minimal keep-alive HTTP/1.1 client connection for ``load_test``."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def get(self, request):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(request)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            raise ConnectionError("Connection closed by the server")
+        status = int(status_line.split()[1])
+        length, chunked, close = None, False, False
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _sep, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding":
+                chunked = "chunked" in value
+            elif name == "connection":
+                close = value == "close"
+
+        if chunked:
+            while size := int((await self.reader.readline()).split(b";")[0], 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        elif length is not None:
+            await self.reader.readexactly(length)
+        else:
+            await self.reader.read()
+            close = True
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def _load(base_url, path, concurrency, requests, headers):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    lines = [f"GET {url.path.rstrip('/')}{path} HTTP/1.1", f"Host: {url.netloc}", "Connection: keep-alive"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    request = ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal errors, remaining
+        connection = _Connection(host, port)
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status = await connection.get(request)
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                connection.close()
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors += 1
+        connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+
+
+def load_test(base_url, path, concurrency=100, requests=2000, headers=None):
+    """
+    Send ``requests`` GETs for ``path`` to a running server from
+    ``concurrency`` keep-alive connections; return throughput and latency
+    percentiles. Responses with a 4xx/5xx status count as errors.
+    """
+    return asyncio.run(_load(base_url, path, concurrency, requests, headers or {}))
@@ -0,0 +1,241 @@
+"""
+Response caching for the stats and availability endpoints.
+
+Cached payloads are keyed by date or slot plus a set of generation tokens.
+Writers never delete cached payloads; they replace the tokens of the days they
+touch (see ``invalidate_reservations`` and ``invalidate_tables``), so every key
+built afterwards is new and stale entries simply expire.
+
+Generation keys are per venue (``gen:<venue id>:...``): a write expires the
+cached payloads of its own venue only. Readers use the current venue; writers
+name the venue of the rows they changed.
+
+The same tokens version the table and reservation collections for
+conditional GETs: ``etag`` hashes the tokens a collection depends on (every
+table and reservation write replaces ``tables`` or ``reservations``), so an
+``If-None-Match`` request is answered from one cache read, before any query.
+
+Payloads are computed from the database the view reads, a replica included
+(see ``api.replicas``). A replica may not have the write that issued a token
+yet, so a payload computed on one is only stored once every token it is keyed
+on is older than ``REPLICA_PIN_SECONDS``, the bound on the replication lag.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from reservations import config
+from . import replicas
+from venues.routing import current_id
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _count(name, namespace):
+    with _counters_lock:
+        _counters[(name, namespace)] += 1
+
+
+def counters():
+    """Hit/miss counters per namespace since the process started."""
+    with _counters_lock:
+        snapshot = dict(_counters)
+    namespaces = sorted({namespace for _name, namespace in snapshot})
+    return {
+        namespace: {
+            "hits": snapshot.get(("hits", namespace), 0),
+            "misses": snapshot.get(("misses", namespace), 0),
+        }
+        for namespace in namespaces
+    }
+
+
+def reset_counters():
+    with _counters_lock:
+        _counters.clear()
+
+
+def _new_token(issued=None):
+    """A generation token: when it was issued (epoch seconds) and a random part."""
+    return f"{time.time() if issued is None else issued:.3f}:{uuid.uuid4().hex}"
+
+
+def _missing_tokens(gen_keys, tokens):
+    # No write issued these, so no replica can miss one
+    return {key: _new_token(issued=0) for key in gen_keys if key not in tokens}
+
+
+def _settled(tokens):
+    """Whether every replica has caught up with the writes that issued ``tokens``."""
+    horizon = time.time() - settings.REPLICA_PIN_SECONDS
+    return all(float(token.partition(":")[0]) <= horizon for token in tokens)
+
+
+def _storable(tokens):
+    return replicas.read_alias() is None or _settled(tokens)
+
+
+def _full_key(namespace, key, tokens):
+    digest = hashlib.md5(":".join(tokens).encode()).hexdigest()
+    return f"{namespace}:{key}:{digest}"
+
+
+def _tokens(gen_keys):
+    """Current token of each generation key, creating the missing ones."""
+    cache = get_cache()
+    tokens = cache.get_many(gen_keys)
+    missing = _missing_tokens(gen_keys, tokens)
+    if missing:
+        cache.set_many(missing, timeout=None)
+        tokens.update(missing)
+    return [tokens[key] for key in gen_keys]
+
+
+async def _atokens(gen_keys):
+    cache = get_cache()
+    tokens = await cache.aget_many(gen_keys)
+    missing = _missing_tokens(gen_keys, tokens)
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        tokens.update(missing)
+    return [tokens[key] for key in gen_keys]
+
+
+def cached(namespace, key, gen_keys, compute):
+    """Return the cached value for ``key``, computing and storing it on a miss."""
+    cache = get_cache()
+    tokens = _tokens(gen_keys)
+    full_key = _full_key(namespace, key, tokens)
+
+    value = cache.get(full_key)
+    if value is not None:
+        _count("hits", namespace)
+        return value
+    _count("misses", namespace)
+    value = compute()
+    if _storable(tokens):
+        cache.set(full_key, value, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    return value
+
+
+async def acached(namespace, key, gen_keys, compute):
+    """``cached`` for async views: ``compute`` is a coroutine function."""
+    cache = get_cache()
+    tokens = await _atokens(gen_keys)
+    full_key = _full_key(namespace, key, tokens)
+
+    value = await cache.aget(full_key)
+    if value is not None:
+        _count("hits", namespace)
+        return value
+    _count("misses", namespace)
+    value = await compute()
+    if _storable(tokens):
+        await cache.aset(full_key, value, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    return value
+
+
+def _days(start, end):
+    day = timezone.localtime(start).date()
+    last = timezone.localtime(end).date()
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+
+def _prefix(venue_id):
+    return f"gen:{venue_id or current_id()}"
+
+
+def stats_gen_keys(start_date, end_date, venue_id=None):
+    prefix = _prefix(venue_id)
+    days = (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1))
+    # Series occurrences can fall on any day, so every entry also depends on gen:series
+    return [*(f"{prefix}:stats:{day.isoformat()}" for day in days), f"{prefix}:series"]
+
+
+def availability_gen_keys(slot, venue_id=None):
+    prefix = _prefix(venue_id)
+    return [f"{prefix}:availability:{timezone.localtime(slot).date().isoformat()}", f"{prefix}:tables", f"{prefix}:series"]
+
+
+def tables_gen_keys(venue_id=None):
+    return [f"{_prefix(venue_id)}:tables"]
+
+
+def reservations_gen_keys(venue_id=None):
+    prefix = _prefix(venue_id)
+    # Reservation payloads embed their tables
+    return [f"{prefix}:reservations", f"{prefix}:tables"]
+
+
+def _etag(request, tokens, variant):
+    parts = [*tokens, request.path, request.META.get("QUERY_STRING", ""), request.headers.get("Accept", ""), *variant]
+    return f'"{hashlib.md5(chr(0).join(map(str, parts)).encode()).hexdigest()}"'
+
+
+def etag(request, gen_keys, *variant):
+    """
+    Strong ETag of a response that only changes with ``gen_keys``, the query
+    string, the Accept header and ``variant`` (e.g. who is asking).
+    """
+    return _etag(request, _tokens(gen_keys), variant)
+
+
+async def aetag(request, gen_keys, *variant):
+    """``etag`` for async views."""
+    return _etag(request, await _atokens(gen_keys), variant)
+
+
+def _bump(gen_keys):
+    if not gen_keys:
+        return
+    get_cache().set_many({key: _new_token() for key in gen_keys}, timeout=None)
+
+
+def _bump_now_and_on_commit(gen_keys):
+    # Bump right away so the writing transaction never reads a stale entry, and
+    # again after commit so nothing cached from pre-commit data survives
+    _bump(gen_keys)
+    transaction.on_commit(lambda: _bump(gen_keys))
+
+
+def invalidate_reservations(starts, stats=True, availability=True, venue_id=None):
+    """Expire the cached payloads affected by reservations of a venue starting at ``starts``."""
+    venue_id = venue_id or current_id()
+    prefix = _prefix(venue_id)
+    gen_keys = {f"{prefix}:reservations"}
+    longest = config.current(venue_id).max_duration
+    for start in starts:
+        if start is None:
+            continue
+        if stats:
+            gen_keys.add(f"{prefix}:stats:{timezone.localtime(start).date().isoformat()}")
+        if availability:
+            # Slots within the longest reservation length on either side see this reservation
+            for day in _days(start - longest, start + longest):
+                gen_keys.add(f"{prefix}:availability:{day.isoformat()}")
+    _bump_now_and_on_commit(sorted(gen_keys))
+
+
+def invalidate_tables(venue_id=None):
+    """Expire every cached availability payload of a venue."""
+    _bump_now_and_on_commit([f"{_prefix(venue_id)}:tables"])
+
+
+def invalidate_series(venue_id=None):
+    """Expire every cached stats and availability payload of a venue (a series spans many days)."""
+    _bump_now_and_on_commit([f"{_prefix(venue_id)}:series"])
@@ -0,0 +1,335 @@
+"""
+Push events for the staff dashboard, served as Server-Sent Events.
+
+Writers record which reservations and tables changed (``reservation_changed``,
+``table_changed``); when the transaction commits the changes are published
+once per object as small deltas::
+
+    reservation.created / reservation.updated / reservation.cancelled  -> lean row
+    reservation.deleted                                                -> {"id": ...}
+    table.created / table.updated                                      -> table row
+    table.deleted                                                      -> {"id": ...}
+    stats.changed                                                      -> {"dates": [...]}
+
+The payload reflects the database after the commit, so several saves of one
+reservation inside a transaction or savepoint (the row, then its tables)
+become a single event. Messages go through a broker: ``LocalBroker`` fans out to the
+subscribers of this process; with ``EVENTS_REDIS_URL`` set, ``RedisBroker``
+relays them through Redis pub/sub so every worker sees every write. Every
+message names its venue and subscribers only receive their venue's messages.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+import weakref
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from venues.routing import current_id
+
+RESERVATION_CREATED = "reservation.created"
+RESERVATION_UPDATED = "reservation.updated"
+RESERVATION_CANCELLED = "reservation.cancelled"
+RESERVATION_DELETED = "reservation.deleted"
+TABLE_CREATED = "table.created"
+TABLE_UPDATED = "table.updated"
+TABLE_DELETED = "table.deleted"
+STATS_CHANGED = "stats.changed"
+
+# Messages a slow subscriber may fall behind before it is disconnected; the
+# client reconnects with Last-Event-ID and catches up from the backlog
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class SubscriptionClosed(Exception):
+    """The subscriber fell too far behind and was dropped."""
+
+
+class Subscription:
+    def __init__(self, broker, loop, venue_id):
+        self.broker = broker
+        self.loop = loop
+        self.venue_id = venue_id
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    def put(self, message):
+        # Runs on the subscriber's event loop
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.closed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout):
+        """Next message, or None when nothing arrived within ``timeout`` seconds."""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is None:
+            raise SubscriptionClosed()
+        return message
+
+    def close(self):
+        self.closed = True
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process fan-out to the subscribers of this process, with a short replay backlog."""
+
+    def __init__(self, backlog=256):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._backlog = deque(maxlen=backlog)
+        self._ids = itertools.count(1)
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def recent(self):
+        with self._lock:
+            return list(self._backlog)
+
+    def publish(self, event, data, venue_id):
+        self.deliver({"id": next(self._ids), "venue": venue_id, "event": event, "data": data})
+
+    def deliver(self, message):
+        """Hand ``message`` to the subscribers of its venue; safe to call from any thread."""
+        with self._lock:
+            self._backlog.append(message)
+            subscribers = [item for item in self._subscribers if item.venue_id == message["venue"]]
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # The subscriber's event loop is gone
+                self.unsubscribe(subscription)
+
+    def subscribe(self, venue_id, last_event_id=None):
+        """
+        Register a subscriber to a venue's messages on the running event loop.
+        Messages newer than ``last_event_id`` still in the backlog are queued first.
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), venue_id)
+        with self._lock:
+            if last_event_id is not None:
+                for message in self._backlog:
+                    if message["id"] > last_event_id and message["venue"] == venue_id:
+                        subscription.put(message)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publishes through Redis pub/sub; a relay thread per process delivers what
+    it receives to the local subscribers. Event ids come from a Redis counter
+    so they stay ordered across processes.
+    """
+
+    channel = "booking:events"
+    sequence_key = "booking:events:seq"
+
+    def __init__(self, url, backlog=256):
+        super().__init__(backlog)
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._relay = None
+
+    def has_subscribers(self):
+        # Other processes may be listening
+        return True
+
+    def publish(self, event, data, venue_id):
+        message = {"id": self._redis.incr(self.sequence_key), "venue": venue_id, "event": event, "data": data}
+        self._redis.publish(self.channel, json.dumps(message, cls=JSONEncoder))
+
+    def subscribe(self, venue_id, last_event_id=None):
+        with self._lock:
+            if self._relay is None:
+                self._relay = threading.Thread(target=self._run_relay, name="events-relay", daemon=True)
+                self._relay.start()
+        return super().subscribe(venue_id, last_event_id)
+
+    def _run_relay(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for item in pubsub.listen():
+                    self.deliver(json.loads(item["data"]))
+            except Exception:
+                # Connection lost: resubscribe after a pause
+                time.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            if settings.EVENTS_REDIS_URL:
+                _broker = RedisBroker(settings.EVENTS_REDIS_URL, settings.EVENTS_BACKLOG)
+            else:
+                _broker = LocalBroker(settings.EVENTS_BACKLOG)
+        return _broker
+
+
+def reset_broker():
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+# A later save does not downgrade an earlier, stronger change of the same object
+_RANK = {
+    RESERVATION_UPDATED: 0, RESERVATION_CANCELLED: 1, RESERVATION_CREATED: 2, RESERVATION_DELETED: 2,
+    TABLE_UPDATED: 0, TABLE_CREATED: 1, TABLE_DELETED: 1,
+}
+
+
+class Batch:
+    """
+    Changes made in one transaction, published by ``flush`` once it commits.
+    Objects are recorded as (venue id, pk), dates as (venue id, date).
+    """
+
+    def __init__(self):
+        self.reservations = {}
+        self.tables = {}
+        self.dates = set()
+        self.flushed = False
+
+    @staticmethod
+    def record(pending, pk, event):
+        current = pending.get(pk)
+        if current is None or (current not in (RESERVATION_CREATED, TABLE_CREATED) and _RANK[event] >= _RANK[current]):
+            pending[pk] = event
+
+    def flush(self):
+        """
+        Publish the changes, reading the rows back so payloads match the
+        committed state; a reservation created and deleted in the same
+        transaction publishes nothing.
+        """
+        from reservations.models import Reservation
+        from reservations.serializers import RESERVATION_FIELDS, serialize_rows
+        from tables.models import Table
+        from tables.serializers import TableSerializer
+
+        self.flushed = True
+        broker = get_broker()
+        if not broker.has_subscribers():
+            return
+
+        if self.reservations:
+            rows = Reservation.objects.filter(id__in=[pk for _venue, pk in self.reservations]).values(
+                *RESERVATION_FIELDS
+            )
+            found = {row["id"]: row for row in serialize_rows(list(rows))}
+            for (venue_id, pk), event in sorted(self.reservations.items()):
+                if pk in found:
+                    broker.publish(event, found[pk], venue_id)
+                elif event != RESERVATION_CREATED:
+                    broker.publish(RESERVATION_DELETED, {"id": pk}, venue_id)
+
+        if self.tables:
+            found = {table.pk: table for table in Table.objects.filter(id__in=[pk for _venue, pk in self.tables])}
+            for (venue_id, pk), event in sorted(self.tables.items()):
+                if pk in found:
+                    broker.publish(event, TableSerializer(found[pk]).data, venue_id)
+                elif event != TABLE_CREATED:
+                    broker.publish(TABLE_DELETED, {"id": pk}, venue_id)
+
+        for venue_id in sorted({venue_id for venue_id, _day in self.dates}):
+            days = sorted(day.isoformat() for venue, day in self.dates if venue == venue_id)
+            broker.publish(STATS_CHANGED, {"dates": days}, venue_id)
+
+
+def _current_batch():
+    """
+    The batch of the current transaction and savepoint.
+
+    Each savepoint records into its own batch, whose ``flush`` is registered
+    with ``on_commit`` inside it. The connection only keeps weak references:
+    the registered callback holds the batch, so once Django discards the
+    callback (the transaction or savepoint rolled back) the batch goes with it
+    and rolled-back changes are never published.
+    """
+    connection = transaction.get_connection()
+    # Blocks without a savepoint commit or roll back with the enclosing one
+    level = tuple(sid for sid in connection.savepoint_ids if sid is not None)
+    batches = {
+        key: ref for key, ref in getattr(connection, "_events_batches", {}).items()
+        if ref() is not None and not ref().flushed
+    }
+    connection._events_batches = batches
+    batch = batches[level]() if level in batches else None
+    if batch is None:
+        batch = Batch()
+        batches[level] = weakref.ref(batch)
+        transaction.on_commit(batch.flush)
+    return batch
+
+
+def reservation_changed(pk, event, starts=(), venue_id=None):
+    """
+    Record a reservation change to publish when the transaction commits;
+    ``starts`` are the start times whose day stats changed. ``venue_id``
+    defaults to the current venue.
+    """
+    venue_id = venue_id or current_id()
+    connection = transaction.get_connection()
+    batch = _current_batch() if connection.in_atomic_block else Batch()
+    batch.record(batch.reservations, (venue_id, pk), event)
+    batch.dates.update((venue_id, timezone.localdate(start)) for start in starts if start is not None)
+    if not connection.in_atomic_block:
+        batch.flush()
+
+
+def table_changed(pk, event, venue_id=None):
+    """Record a table change to publish when the transaction commits (at once in autocommit)."""
+    venue_id = venue_id or current_id()
+    connection = transaction.get_connection()
+    batch = _current_batch() if connection.in_atomic_block else Batch()
+    batch.record(batch.tables, (venue_id, pk), event)
+    if not connection.in_atomic_block:
+        batch.flush()
+
+
+def format_message(message):
+    """One Server-Sent Events frame."""
+    data = json.dumps(message["data"], cls=JSONEncoder, ensure_ascii=False)
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {data}\n\n"
+
+
+async def stream(subscription, keepalive):
+    """Server-Sent Events body: one frame per message, a comment line while idle."""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            message = await subscription.get(keepalive)
+            yield ": keepalive\n\n" if message is None else format_message(message)
+    except SubscriptionClosed:
+        pass
+    finally:
+        subscription.close()
@@ -0,0 +1,124 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Histograms and counters are kept per process, like the cache counters in
+``api.caching``; with several workers each one reports its own series, so
+scrape every worker or aggregate downstream.
+"""
+import bisect
+import math
+import threading
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(key, le=_number(bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(key)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._series)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_labels(key)} {_number(value)}")
+        return lines
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key, **extra):
+    pairs = [*key, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time from the request entering Django to the response.", LATENCY_BUCKETS
+)
+DB_QUERIES = Histogram("http_request_db_queries", "Database queries per request.", QUERY_COUNT_BUCKETS)
+DB_DURATION = Histogram("http_request_db_duration_seconds", "Time spent in database queries per request.", LATENCY_BUCKETS)
+RENDER_DURATION = Histogram(
+    "http_response_render_seconds", "Time spent rendering (serializing) the response body.", LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS)
+REPEATED_QUERIES = Counter(
+    "http_request_repeated_queries_total", "Requests that ran one query shape repeatedly (likely N+1)."
+)
+
+METRICS = (REQUEST_DURATION, DB_QUERIES, DB_DURATION, RENDER_DURATION, RESPONSE_SIZE, REPEATED_QUERIES)
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+def reset():
+    for metric in METRICS:
+        metric.reset()
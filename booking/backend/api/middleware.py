@@ -0,0 +1,148 @@
+"""
+Per-request performance instrumentation.
+
+``PerformanceMiddleware`` times every request and, through an ORM execute
+wrapper installed on each database connection, the queries it runs. Each
+request is recorded in the histograms of ``api.metrics`` (served at
+``/metrics``) and answered with a ``Server-Timing`` header that browser dev
+tools display. A request running one query shape at least
+``PERFORMANCE_REPEATED_QUERY_THRESHOLD`` times is logged as a likely N+1.
+
+Request state lives in a context variable, so queries made from
+``sync_to_async`` threads under ASGI are attributed to the right request.
+"""
+import contextvars
+import logging
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+logger = logging.getLogger("api.performance")
+
+_profile = contextvars.ContextVar("request_profile", default=None)
+
+# Transaction bookkeeping repeats by design
+_IGNORED_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.shapes = Counter()
+
+    def record(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if not sql.startswith(_IGNORED_PREFIXES):
+            self.shapes[sql] += 1
+
+    def repeated(self, threshold):
+        """The most repeated query shape and its count, if it reached ``threshold``."""
+        if not self.shapes:
+            return None
+        sql, count = self.shapes.most_common(1)[0]
+        return (sql, count) if count >= threshold else None
+
+
+def record_query(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record(sql, time.perf_counter() - started)
+
+
+def instrument(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        # First in the list: ``execute_wrapper()`` blocks push and pop at the end
+        connection.execute_wrappers.insert(0, record_query)
+
+
+connection_created.connect(instrument)
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None and match.view_name else "unresolved"
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            instrument(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        request._performance = profile
+        try:
+            response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        request._performance = profile
+        try:
+            response = await self.get_response(request)
+        finally:
+            _profile.reset(token)
+        return self.finish(request, response, profile)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time it as serialization cost
+        profile = request._performance
+        started = time.perf_counter()
+
+        def rendered(_response):
+            profile.render_time += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        view = _view_name(request)
+        metrics.REQUEST_DURATION.observe(total, view=view, method=request.method, status=response.status_code)
+        metrics.DB_QUERIES.observe(profile.queries, view=view)
+        metrics.DB_DURATION.observe(profile.db_time, view=view)
+        metrics.RENDER_DURATION.observe(profile.render_time, view=view)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view=view)
+
+        repeated = profile.repeated(settings.PERFORMANCE_REPEATED_QUERY_THRESHOLD)
+        if repeated is not None:
+            sql, count = repeated
+            metrics.REPEATED_QUERIES.inc(view=view)
+            logger.warning("Possible N+1 in %s: query ran %d times: %s", view, count, sql[:300])
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"',
+            f"render;dur={profile.render_time * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+        return response
@@ -0,0 +1,155 @@
+"""
+Read replicas.
+
+``DATABASE_REPLICAS`` lists the database aliases that replicate ``default``.
+Views decorated with ``replica_reads`` answer GET requests from one of them:
+``ReplicaRouter`` sends every read made while such a view runs to the chosen
+replica. Every write, and every read anywhere else, uses ``default``.
+
+Replicas lag behind the primary, so:
+
+* a client that wrote is pinned to the primary for ``REPLICA_PIN_SECONDS``
+  (``ReplicaPinMiddleware``): by its bearer token in the cache and by a cookie
+  for anonymous customers, so it always reads its own booking back;
+* response cache fills (``api.caching.cached``) computed on a replica are
+  only stored once the generation tokens they are keyed on are older than
+  ``REPLICA_PIN_SECONDS``: a payload computed from a stale replica would
+  otherwise outlive the write that the tokens already recorded.
+"""
+import functools
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = "db_pin"
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explicit, or Django would write rows read from a replica back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get the schema through replication
+        return db not in settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def reading_from(alias):
+    """Send the reads of the block to ``alias`` (None: the primary)."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def read_alias():
+    """The replica reads currently go to, None for the primary."""
+    return _read_alias.get()
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _pin_key(request):
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    return f"replica:pin:{hashlib.sha1(authorization.encode()).hexdigest()}"
+
+
+def pin(request, response):
+    """Keep the client that sent ``request`` on the primary for a while."""
+    key = _pin_key(request)
+    if key is not None:
+        _cache().set(key, True, timeout=settings.REPLICA_PIN_SECONDS)
+    response.set_cookie(PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS, samesite="Lax")
+
+
+def _pinned_by_cookie(request):
+    return PIN_COOKIE in request.COOKIES
+
+
+def is_pinned(request):
+    key = _pin_key(request)
+    return _pinned_by_cookie(request) or (key is not None and bool(_cache().get(key)))
+
+
+async def ais_pinned(request):
+    """``is_pinned`` for async views."""
+    key = _pin_key(request)
+    return _pinned_by_cookie(request) or (key is not None and bool(await _cache().aget(key)))
+
+
+def _replica(request):
+    if request.method not in ("GET", "HEAD") or not settings.DATABASE_REPLICAS:
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def replica_reads(view):
+    """Serve the GET requests of ``view`` (sync or async) from a replica unless the client is pinned."""
+    if iscoroutinefunction(view):
+
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            alias = _replica(request)
+            if alias is None or await ais_pinned(request):
+                return await view(request, *args, **kwargs)
+            with reading_from(alias):
+                return await view(request, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = _replica(request)
+        if alias is None or is_pinned(request):
+            return view(request, *args, **kwargs)
+        with reading_from(alias):
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Pins the clients whose writes succeeded (see ``pin``)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.finish(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.finish(request, await self.get_response(request))
+
+    def finish(self, request, response):
+        if settings.DATABASE_REPLICAS and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            pin(request, response)
+        return response
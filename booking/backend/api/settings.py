@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -21,12 +24,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-tpa_d5%7c$=&2*-i43o1_++mn1cttxmmiet(xf^kha7vm6ft3&"
+SECRET_KEY = os.environ.get(
+    "DJANGO_SECRET_KEY", "django-insecure-tpa_d5%7c$=&2*-i43o1_++mn1cttxmmiet(xf^kha7vm6ft3&"
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DJANGO_DEBUG", "1") == "1"
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
 
 
 # Application definition
@@ -44,9 +49,12 @@ INSTALLED_APPS = [
     "users",
     "reservations",
     "tables",
+    "venues",
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the whole stack (see api/middleware.py)
+    "api.middleware.PerformanceMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -55,6 +63,10 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Activates the venue of the request (see venues/routing.py)
+    "venues.middleware.VenueMiddleware",
+    # Keeps clients that just wrote on the primary database (see api/replicas.py)
+    "api.replicas.ReplicaPinMiddleware",
 ]
 
 ROOT_URLCONF = "api.urls"
@@ -81,13 +93,121 @@ WSGI_APPLICATION = "api.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite (default) suits a single node. Set POSTGRES_DB (and
+# POSTGRES_HOST/PORT/USER/PASSWORD) for production on PostgreSQL.
+SQLITE_PRAGMAS = [
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-32000",
+    "PRAGMA mmap_size=134217728",
+]
+# WAL lets reads run while a booking holds the write lock. The journal mode is
+# stored in the database file, so it is opt-in for deployments (SQLITE_WAL=1)
+# and the db.sqlite3 committed for development keeps its rollback journal.
+if os.environ.get("SQLITE_WAL") == "1":
+    SQLITE_PRAGMAS += [
+        "PRAGMA journal_mode=WAL",
+        # Durable at checkpoints; in WAL mode a crash cannot corrupt the database
+        "PRAGMA synchronous=NORMAL",
+    ]
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Take the write lock when a transaction starts so concurrent
+            # bookings queue up instead of racing (see reservations/booking.py)
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+            "init_command": ";".join(SQLITE_PRAGMAS),
+        },
+        "TEST": {
+            # File-backed so the threaded live-server tests get one
+            # connection per thread and real SQLite locking
+            "NAME": BASE_DIR / "test_db.sqlite3",
+        },
     }
 }
 
+if os.environ.get("POSTGRES_DB"):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ["POSTGRES_DB"],
+        "USER": os.environ.get("POSTGRES_USER", ""),
+        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        # Reuse connections across requests; checked before reuse so a
+        # restarted server does not fail the first request
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if os.environ.get("DB_POOL_MAX_SIZE"):
+        # psycopg 3 connection pool (needs psycopg[pool]); replaces persistent
+        # connections, which Django does not allow alongside a pool
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ["DB_POOL_MAX_SIZE"]),
+            "timeout": 10,
+        }
+
+# Read replicas (see api/replicas.py): the GETs of the list, availability and
+# stats views read from one of these aliases. SQLITE_REPLICA_PATH adds a SQLite
+# copy of the database (to try it locally); POSTGRES_REPLICA_HOSTS a
+# comma-separated list of PostgreSQL standbys. The test suite runs without them.
+if os.environ.get("POSTGRES_DB"):
+    for index, host in enumerate(filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(","))):
+        DATABASES[f"replica{index}"] = {**DATABASES["default"], "HOST": host, "TEST": {"MIRROR": "default"}}
+elif os.environ.get("SQLITE_REPLICA_PATH"):
+    DATABASES["replica0"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["SQLITE_REPLICA_PATH"],
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+# How long a client that wrote keeps reading the primary: longer than the replication lag.
+# Cached payloads computed on a replica are only stored under generations older than this.
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default; set REDIS_URL (e.g. redis://127.0.0.1:6379/0) to share
+# the cache between processes.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "booking",
+    }
+}
+if os.environ.get("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
+
+# Stats and availability responses (see api/caching.py)
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 300
+
+# A request running one query shape this many times is logged as a likely N+1
+PERFORMANCE_REPEATED_QUERY_THRESHOLD = 10
+
+# Serve the hot GET endpoints from async views (see api/async_views.py). Turn on
+# when running under ASGI; under WSGI every async view costs an extra event loop.
+ASYNC_READ_VIEWS = os.environ.get("ASYNC_READ_VIEWS", "0") == "1"
+
+# Push events (see api/events.py): fanned out in-process, or through Redis
+# pub/sub when REDIS_URL is set so every worker process sees every write.
+# The stream is long-lived, so serve it from an ASGI server (api/asgi.py).
+EVENTS_REDIS_URL = os.environ.get("REDIS_URL")
+EVENTS_BACKLOG = 256
+EVENTS_KEEPALIVE = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -133,7 +253,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Django REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
@@ -144,9 +264,39 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    # Access tokens carry the user's flags so requests skip the user query
+    # (see users/authentication.py)
+    "TOKEN_OBTAIN_SERIALIZER": "users.tokens.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.tokens.ClaimsTokenRefreshSerializer",
 }
 
+# Cache holding token revocations (users/revocation.py); must be shared between
+# processes, so set REDIS_URL when running more than one
+AUTH_REVOCATION_CACHE_ALIAS = "default"
+
+# Reservation dashboard defaults: opening hours as (open, close) hours of the day
+# and the longest date range the stats endpoint aggregates in one call
+RESERVATION_OPENING_HOURS = (10, 24)
+RESERVATION_STATS_MAX_DAYS = 366
+# These, the reservation length and the slot granularity are overridden by the
+# RestaurantConfig row (reservations/config.py); other processes pick up a
+# change to it within this many seconds
+RESERVATION_CONFIG_CHECK_SECONDS = 5
+
+# Venue of requests that name none (X-Venue header or ?venue=), and how long a
+# process trusts a resolved slug
+DEFAULT_VENUE = os.environ.get("DJANGO_DEFAULT_VENUE", "main")
+VENUE_CACHE_SECONDS = 60
+
+# Waitlist matching after cancellations (reservations/waitlist.py): worker threads
+# per process (0 runs the match in the cancelling request) and how many waiting
+# parties one match considers
+WAITLIST_WORKERS = 1
+WAITLIST_MATCH_CANDIDATES = 20
+
 # CORS (allow frontend dev server)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
+CORS_ALLOW_HEADERS = (*default_headers, "x-venue")
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor"]
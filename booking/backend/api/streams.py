@@ -0,0 +1,176 @@
+"""
+Line-oriented CSV / NDJSON helpers shared by the list, export and bulk import
+endpoints. Readers and writers work on iterators so whole files never sit in
+memory.
+"""
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = (CSV, NDJSON)
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+# Only the first errors are listed in an import report; all of them are counted
+MAX_REPORTED_ERRORS = 1000
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON, one object per line; selected with ?format=ndjson."""
+
+    media_type = 'application/x-ndjson'
+    format = NDJSON
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(to_ndjson_line(row) for row in rows).encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV export; only used for streamed responses. Anything else (an error
+    payload) is rendered as JSON and labelled as such.
+    """
+
+    media_type = 'text/csv'
+    format = CSV
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+def to_ndjson_line(row):
+    return json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield to_ndjson_line(row)
+
+
+def csv_lines(rows, fields):
+    """Yield a CSV header and one line per row dict; list values are joined with ';'."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(fields)
+    yield flush()
+    for row in rows:
+        writer.writerow(
+            ';'.join(str(item) for item in value) if isinstance(value, list) else value
+            for value in (row.get(field) for field in fields)
+        )
+        yield flush()
+
+
+def lines(rows, fmt, fields):
+    return csv_lines(rows, fields) if fmt == CSV else ndjson_lines(rows)
+
+
+def read_rows(stream, fmt):
+    """
+    Yield ``(line_number, row)`` pairs from a text stream.
+
+    Rows that cannot be decoded are yielded as ``(line_number, ValueError)``
+    so callers can report them next to validation errors.
+    """
+    if fmt == CSV:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value not in ('', None)}
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, ValueError(f"Invalid JSON: {exc}")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ValueError("Expected a JSON object")
+            continue
+        yield line_number, row
+
+
+def request_rows(request):
+    """
+    ``read_rows`` over a request body: ``text/csv`` and ``application/x-ndjson``
+    bodies are decoded line by line from the stream, a JSON body must be a list.
+    Raises ``ValueError`` on other payloads.
+    """
+    media_type = request.content_type.split(';')[0].strip()
+    if media_type in (CSVRenderer.media_type, NDJSONRenderer.media_type):
+        fmt = CSV if media_type == CSVRenderer.media_type else NDJSON
+        return read_rows(codecs.iterdecode(request.stream or [], 'utf-8'), fmt)
+    if not isinstance(request.data, list):
+        raise ValueError("Expected a list of rows, CSV or NDJSON")
+    return (
+        (index, row if isinstance(row, dict) else ValueError("Expected a JSON object"))
+        for index, row in enumerate(request.data, start=1)
+    )
+
+
+def import_options(params):
+    """``dry_run`` and ``chunk_size`` query parameters of the bulk endpoints."""
+    try:
+        chunk_size = int(params.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        raise ValueError("Invalid chunk_size")
+    if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError("Invalid chunk_size")
+    return {"chunk_size": chunk_size, "dry_run": params.get('dry_run', '').lower() in ('1', 'true')}
+
+
+class ImportReport:
+    """Outcome of a bulk import: counters plus per-line errors."""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self):
+        errors = sorted(self.errors, key=lambda error: error["line"])
+        return {"created": self.created, "updated": self.updated, "failed": self.failed, "errors": errors}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def split_ids(value):
+    """Table id lists arrive as JSON lists or as ';'-separated CSV cells."""
+    if value in (None, ''):
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [item for item in str(value).replace(',', ';').split(';') if item.strip()]
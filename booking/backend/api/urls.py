@@ -17,14 +17,19 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from users.views import staff_ping
+from .views import cache_stats, event_stream, metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     # API v1 routes - organized by resource
     path("api/v1/auth/", include("users.urls")),
     path("api/v1/admin/", include("users.admin_urls")),
     path("api/v1/staff/ping/", staff_ping, name="staff_ping"),
+    path("api/v1/staff/cache/", cache_stats, name="cache_stats"),
+    path("api/v1/events/", event_stream, name="event_stream"),
     path("api/v1/tables/", include("tables.urls")),
     path("api/v1/reservations/", include("reservations.urls")),
+    path("api/v1/venues/", include("venues.urls")),
 ]
 
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from . import caching, events, metrics
+from venues import access
+from venues.routing import current_id
+from .async_views import AsyncJWTAuthentication
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def cache_stats(_request):
+    """Response cache hit/miss counters for this process (staff only)"""
+    return Response({"backend": caching.get_cache().__class__.__name__, "namespaces": caching.counters()})
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics_view(_request):
+    """Request latency, query and response size histograms for this process, Prometheus format (staff only)"""
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def _stream_user(request):
+    """Active user from the Authorization header or ?token= (EventSource cannot send headers)"""
+    authenticator = AsyncJWTAuthentication()
+    try:
+        if request.GET.get("token"):
+            user = await authenticator.aget_user(authenticator.get_validated_token(request.GET["token"]))
+        else:
+            user = await authenticator.aauthenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user is not None and user.is_active else None
+
+
+@require_GET
+async def event_stream(request):
+    """Server-Sent Events push of the venue's reservation, table and stats changes (venue staff)"""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI server buffers the whole endless stream, so the client would wait forever
+        return JsonResponse({"detail": "Live events need an ASGI server (api/asgi.py)"}, status=501)
+    user = await _stream_user(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication required"}, status=401)
+    if not await access.ais_member(user):
+        return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID") or request.GET.get("last_event_id"))
+    except (TypeError, ValueError):
+        last_event_id = None
+
+    subscription = events.get_broker().subscribe(current_id(), last_event_id)
+    response = StreamingHttpResponse(
+        events.stream(subscription, settings.EVENTS_KEEPALIVE), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Keep reverse proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,254 @@
+"""
+Capacity-planning analytics over long date ranges.
+
+Two columnar queries read the reservations starting in the range and their
+table links; they become NumPy arrays, are joined with ``np.searchsorted`` and
+every figure is computed by vectorized binning (``np.repeat`` /
+``np.bincount``) instead of a Python loop per row. The occurrences of
+recurring series starting in the range (``recurrence.occurrences``) are
+appended to the arrays and count as reservations, as in the stats:
+
+* ``heatmap`` - seat occupancy per local weekday x hour: the guest-hours
+  seated in the cell over the seat-hours the active tables offer in that cell
+  across the range. A party's guests are spread over its tables by seats;
+* ``cancellation_rate`` - cancelled reservations over all of them;
+* ``no_show_rate`` - reservations that ended while still pending over the
+  ended, uncancelled ones;
+* ``tables`` - per table, the hours it was held and their share of the
+  service hours (``config.Snapshot.service_windows``) in the range.
+
+The database returns the timestamps as epoch minutes (``EpochMinutes``) and
+the rows are fetched without the ORM's per-row conversion, so no Python object
+is built per row beyond the fetched tuples.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import connections
+from django.db.models import BigIntegerField, Func
+from django.utils import timezone
+
+from tables.models import Table
+from . import config, recurrence
+from .models import Reservation
+
+HOURS_PER_WEEK = 7 * 24
+
+
+class EpochMinutes(Func):
+    """Whole minutes since the epoch (UTC) of a datetime, computed by the database."""
+
+    output_field = BigIntegerField()
+    template = "CAST(FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / 60) AS BIGINT)"
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Stored as UTC text; strftime('%s') truncates to the second
+        return self.as_sql(
+            compiler, connection, template="(CAST(strftime('%%%%s', %(expressions)s) AS INTEGER) / 60)", **extra_context
+        )
+
+
+def _columns(queryset, width):
+    """
+    The columns of a ``values_list`` queryset as tuples, fetched in one go.
+
+    The rows skip the ORM's per-row converters, so the selected values must
+    already have their Python type (no datetimes, see ``EpochMinutes``).
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return tuple(zip(*rows)) if rows else ((),) * width
+
+
+def _bounds(start_date, end_date):
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min)),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)),
+    )
+
+
+def _reservations(start_date, end_date):
+    """(id, start, end, guests, status) columns of the reservations starting in the range, by id."""
+    window_start, window_end = _bounds(start_date, end_date)
+    ids, starts, ends, guests, statuses = _columns(
+        Reservation.objects.in_venue().filter(
+            start_datetime__gte=window_start, start_datetime__lt=window_end,
+        ).order_by().values_list(
+            'id', EpochMinutes('start_datetime'), EpochMinutes('end_datetime'), 'guests', 'status'
+        ),
+        5,
+    )
+    # Sorted here rather than by the database, which would sort after the index scan
+    ids = np.array(ids, dtype=np.int64)
+    order = np.argsort(ids)
+    return (
+        ids[order],
+        # Minutes since the epoch (UTC)
+        np.array(starts, dtype=np.float64)[order],
+        np.array(ends, dtype=np.float64)[order],
+        np.array(guests, dtype=np.float64)[order],
+        np.array(statuses, dtype=str)[order],
+    )
+
+
+def _links(reservation_ids):
+    """(position in ``reservation_ids``, table id) of the table links of the sorted ``reservation_ids``."""
+    if not reservation_ids.size:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # An id range is a scan of the (reservation, table) index; ids outside the set are masked out below
+    link_ids, table_ids = (
+        np.array(column, dtype=np.int64)
+        for column in _columns(
+            Reservation.tables.through.objects.filter(
+                reservation_id__gte=int(reservation_ids[0]), reservation_id__lte=int(reservation_ids[-1])
+            ).values_list('reservation_id', 'table_id'),
+            2,
+        )
+    )
+    position = np.searchsorted(reservation_ids, link_ids)
+    found = reservation_ids[np.minimum(position, reservation_ids.size - 1)] == link_ids
+    return position[found], table_ids[found]
+
+
+def _occurrences(start_date, end_date):
+    """
+    (start, end, guests, status) columns of the series occurrences starting in
+    the range, and the (position, table id) of their table links; at most two queries.
+    """
+    found = recurrence.occurrences(*_bounds(start_date, end_date))
+    return (
+        np.array([occurrence['start_datetime'].timestamp() // 60 for occurrence in found], dtype=np.float64),
+        np.array([occurrence['end_datetime'].timestamp() // 60 for occurrence in found], dtype=np.float64),
+        np.array([occurrence['guests'] for occurrence in found], dtype=np.float64),
+        np.array([occurrence['status'] for occurrence in found], dtype=str),
+        np.array(
+            [position for position, occurrence in enumerate(found) for _table_id in occurrence['tables_ids']],
+            dtype=np.int64,
+        ),
+        np.array([table_id for occurrence in found for table_id in occurrence['tables_ids']], dtype=np.int64),
+    )
+
+
+def _to_local(minutes):
+    """Local wall-clock minutes for UTC epoch minutes; one offset lookup per hour spanned, not per row."""
+    if not minutes.size:
+        return minutes
+    hours = (minutes // 60).astype(np.int64)
+    first = int(hours.min())
+    tz = timezone.get_current_timezone()
+    offsets = np.array([
+        datetime.fromtimestamp(hour * 3600, tz).utcoffset().total_seconds() // 60
+        for hour in range(first, int(hours.max()) + 1)
+    ])
+    return minutes + offsets[hours - first]
+
+
+def _hour_cells(start, end):
+    """
+    Split [start, end) local-minute intervals into the hours they cover.
+
+    Returns (interval index, local hour since the epoch, hours covered) with
+    one entry per interval and hour.
+    """
+    first = start // 60
+    counts = np.maximum((end - 1) // 60 - first + 1, 0).astype(np.int64)
+    interval = np.repeat(np.arange(start.size), counts)
+    offset = np.arange(interval.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    hour = first[interval] + offset
+    covered = np.minimum(end[interval], (hour + 1) * 60) - np.maximum(start[interval], hour * 60)
+    return interval, hour.astype(np.int64), covered / 60
+
+
+def _ratio(numerator, denominator):
+    return round(float(numerator) / float(denominator), 4) if denominator else 0.0
+
+
+def _service_hours(start_date, end_date):
+    conf = config.current()
+    total = timedelta()
+    day = start_date
+    while day <= end_date:
+        total += sum((closes - opens for opens, closes in conf.service_windows(day)), timedelta())
+        day += timedelta(days=1)
+    return total.total_seconds() / 3600
+
+
+def build(start_date, end_date, opening_hours):
+    """Analytics payload for reservations starting between two dates (inclusive); at most five queries."""
+    ids, starts, ends, guests, statuses = _reservations(start_date, end_date)
+    link_reservation, link_table = _links(ids)
+    *series_columns, series_link, series_table = _occurrences(start_date, end_date)
+    # Occurrences follow the reservations in every array
+    link_reservation = np.concatenate([link_reservation, series_link + ids.size])
+    link_table = np.concatenate([link_table, series_table])
+    starts, ends, guests, statuses = (
+        np.concatenate([column, series]) for column, series in zip((starts, ends, guests, statuses), series_columns)
+    )
+    tables = list(Table.objects.in_venue().order_by('id').values_list('id', 'number', 'seats', 'is_active'))
+    table_ids = np.array([table_id for table_id, *_rest in tables], dtype=np.int64)
+    table_seats = np.array([seat_count for _id, _number, seat_count, _active in tables], dtype=np.float64)
+    now = timezone.now().timestamp() // 60
+
+    cancelled = statuses == Reservation.STATUS_CANCELLED
+    ended = (ends < now) & ~cancelled
+    no_show = ended & (statuses == Reservation.STATUS_PENDING)
+
+    # Links of active reservations; a party's guests are spread over its tables by seats
+    active = ~cancelled[link_reservation]
+    link_reservation, link_table = link_reservation[active], np.searchsorted(table_ids, link_table[active])
+    seats = table_seats[link_table]
+    party_seats = np.bincount(link_reservation, weights=seats, minlength=starts.size)[link_reservation]
+    link_guests = guests[link_reservation] * np.divide(
+        seats, party_seats, out=np.zeros_like(seats), where=party_seats > 0
+    )
+
+    start, end = np.split(_to_local(np.concatenate([starts[link_reservation], ends[link_reservation]])), 2)
+    end = np.maximum(end, start)
+    link, hour, covered = _hour_cells(start, end)
+    # 1970-01-01 was a Thursday (weekday 3)
+    cell = ((hour // 24 + 3) % 7) * 24 + hour % 24
+    guest_hours = np.bincount(cell, weights=covered * link_guests[link], minlength=HOURS_PER_WEEK).reshape(7, 24)
+
+    days = np.arange(start_date.toordinal(), end_date.toordinal() + 1)
+    # date.fromordinal(1) was a Monday
+    capacity = sum(seat_count for _id, _number, seat_count, is_active in tables if is_active) * np.bincount(
+        (days - 1) % 7, minlength=7
+    )
+    occupancy = np.divide(
+        guest_hours, capacity[:, None], out=np.zeros_like(guest_hours), where=capacity[:, None] > 0
+    )
+    open_hour, close_hour = opening_hours
+
+    hours_held = np.bincount(link_table[link], weights=covered, minlength=table_ids.size)
+    service_hours = _service_hours(start_date, end_date)
+
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'reservations': int(starts.size),
+        'cancelled': int(cancelled.sum()),
+        'no_shows': int(no_show.sum()),
+        'cancellation_rate': _ratio(cancelled.sum(), starts.size),
+        'no_show_rate': _ratio(no_show.sum(), ended.sum()),
+        'heatmap': {
+            'weekdays': list(range(7)),
+            'hours': list(range(open_hour, close_hour)),
+            'occupancy': np.round(occupancy[:, open_hour:close_hour], 4).tolist(),
+        },
+        'tables': sorted(
+            (
+                {
+                    'id': table_id,
+                    'number': number,
+                    'seats': seat_count,
+                    'is_active': is_active,
+                    'hours': round(float(hours), 2),
+                    'utilization': _ratio(hours, service_hours),
+                }
+                for (table_id, number, seat_count, is_active), hours in zip(tables, hours_held)
+            ),
+            key=lambda row: row['number'],
+        ),
+    }
@@ -0,0 +1,99 @@
+"""
+Hot/cold archival of finished reservations.
+
+Nearly all traffic concerns today and the coming weeks, so reservations that
+ended before a cutoff move from ``Reservation`` to ``ArchivedReservation``
+(``archive``, run by the ``archive_reservations`` command). Each chunk of the
+oldest ``chunk_size`` finished reservations of a venue is one transaction:
+
+* the rows and their table links are read with two queries, the rows on
+  ``reservation_venue_end_idx`` and locked against concurrent edits;
+* the archive rows are written with one ``bulk_create``, table ids inlined;
+* occupancy rows, table links and the reservations are removed with one
+  ``DELETE`` each. Deleting the reservations skips the collector and the
+  signal handlers: a finished reservation frees no tables anyone can still
+  book, so instead of an invalidation and an event per row the cached
+  payloads of the archived days are expired once per chunk.
+
+The reservation list and stats read the hot table only; history is queried
+through the archive endpoint (``filter_history``).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from api import caching
+from api.streams import DEFAULT_CHUNK_SIZE
+from venues.routing import current_id
+from .bulk import delete_reservations
+from .listing import parse_bound
+from .models import ArchivedReservation, Reservation, TableSlotOccupancy, WaitlistEntry
+
+FIELDS = ('id', 'customer_name', 'customer_phone', 'start_datetime', 'end_datetime', 'guests', 'notes', 'status')
+
+ReservationTable = Reservation.tables.through
+
+
+def _archive_chunk(before, chunk_size):
+    rows = list(
+        Reservation.objects.in_venue().select_for_update()
+        .filter(end_datetime__lt=before)
+        .order_by('end_datetime', 'id')
+        .values(*FIELDS)[:chunk_size]
+    )
+    if not rows:
+        return 0
+    ids = [row['id'] for row in rows]
+    tables = {}
+    for reservation_id, table_id in (
+        ReservationTable.objects.filter(reservation_id__in=ids).order_by('table_id').values_list('reservation_id', 'table_id')
+    ):
+        tables.setdefault(reservation_id, []).append(table_id)
+
+    venue_id = current_id()
+    ArchivedReservation.objects.bulk_create(
+        ArchivedReservation(venue_id=venue_id, tables_ids=tables.get(row['id'], []), **row) for row in rows
+    )
+    # A waitlist entry booked into one of them stays on record without the link
+    WaitlistEntry.objects.filter(reservation_id__in=ids).update(reservation=None)
+    TableSlotOccupancy.objects.filter(reservation_id__in=ids).delete()
+    ReservationTable.objects.filter(reservation_id__in=ids).delete()
+    # Nothing references them any more
+    delete_reservations(ids)
+
+    starts = {timezone.localtime(row['start_datetime']).date(): row['start_datetime'] for row in rows}
+    caching.invalidate_reservations(starts.values(), venue_id=venue_id)
+    return len(rows)
+
+
+def archive(before, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Move the current venue's reservations that ended before ``before`` to the archive; returns how many."""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            count = _archive_chunk(before, chunk_size)
+        moved += count
+        if count < chunk_size:
+            return moved
+
+
+def filter_history(queryset, params):
+    """
+    Apply the archive filters from the query string.
+
+    ``start`` / ``end`` bound ``start_datetime`` (inclusive / exclusive),
+    ``status`` takes comma-separated values and ``phone`` matches the customer
+    phone exactly. Raises ``ValueError`` on malformed input.
+    """
+    if params.get('start'):
+        queryset = queryset.filter(start_datetime__gte=parse_bound(params['start'], 'start'))
+    if params.get('end'):
+        queryset = queryset.filter(start_datetime__lt=parse_bound(params['end'], 'end'))
+    if params.get('status'):
+        statuses = params['status'].upper().split(',')
+        valid = {value for value, _label in Reservation.STATUS_CHOICES}
+        if not set(statuses) <= valid:
+            raise ValueError("Invalid status")
+        queryset = queryset.filter(status__in=statuses)
+    if params.get('phone'):
+        queryset = queryset.filter(customer_phone=params['phone'])
+    return queryset.order_by('start_datetime', 'id')
@@ -0,0 +1,70 @@
+"""
+Async versions of the hot reservation read endpoints (see ``api/async_views.py``).
+Each mirrors the GET branch of its DRF view in ``views.py``.
+"""
+from django.http import HttpResponse
+
+from api import caching
+from api.async_views import conditional, json_response, venue_member
+from api.replicas import replica_reads
+from . import config, listing, serializers, stats
+from .models import Reservation
+from .views import stats_cache_key, stats_request
+
+
+@replica_reads
+async def reservation_list(request):
+    await venue_member(request)
+    etag = await caching.aetag(request, caching.reservations_gen_keys())
+    return await conditional(request, etag, lambda: _reservation_list(request))
+
+
+async def _reservation_list(request):
+    params = request.GET
+    try:
+        reservations = listing.filter_reservations(Reservation.objects.in_venue(), params)
+        limit = listing.page_size(params)
+    except ValueError as exc:
+        return json_response({"detail": str(exc)}, status=400)
+
+    paged = 'limit' in params or 'cursor' in params
+    try:
+        page, next_cursor = await listing.apaginate(
+            reservations.values(*serializers.RESERVATION_FIELDS),
+            params.get('cursor'),
+            limit if paged else listing.MAX_LIST_SIZE,
+        )
+    except ValueError as exc:
+        return json_response({"detail": str(exc)}, status=400)
+    if paged:
+        return json_response({"results": await serializers.aserialize_rows(page), "next_cursor": next_cursor})
+
+    response = json_response(await serializers.aserialize_rows(page))
+    if next_cursor:
+        response[listing.NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+async def reservation_detail(request, pk):
+    await venue_member(request)
+    rows = [row async for row in Reservation.objects.in_venue().filter(pk=pk).values(*serializers.RESERVATION_FIELDS)]
+    if not rows:
+        return HttpResponse(status=404)
+    return json_response((await serializers.aserialize_rows(rows))[0])
+
+
+@replica_reads
+async def reservation_stats(request):
+    await venue_member(request)
+    try:
+        start_date, end_date, opening_hours = stats_request(request.GET, await config.acurrent())
+    except ValueError as exc:
+        return json_response({"detail": str(exc)}, status=400)
+
+    data = await caching.acached(
+        'stats',
+        stats_cache_key(start_date, end_date, opening_hours),
+        caching.stats_gen_keys(start_date, end_date),
+        lambda: stats.abuild_stats(start_date, end_date, opening_hours),
+    )
+    return json_response(data)
@@ -0,0 +1,175 @@
+"""
+Staff actions on many reservations in one request.
+
+``apply`` runs one action over a list of reservation ids of the current venue
+inside one transaction, with set-based statements whatever the number of ids:
+
+* ``confirm`` / ``cancel`` - one ``UPDATE`` of the status;
+* ``delete`` - one ``DELETE`` each for the occupancy rows, the table links
+  and the reservations;
+* ``reassign`` - the table links of every reservation are replaced by
+  ``tables_ids``, after one conflict check against the occupancy and the
+  series (``bulk.held_buckets``) and against the other reservations of the
+  batch.
+
+The statements bypass the per-row signal handlers: the occupancy is updated
+in bulk, the affected days are invalidated with one
+``caching.invalidate_reservations`` call, and the changes are recorded in the
+transaction's event batch, which publishes them once it commits.
+
+Every id gets a result; the ids an action cannot apply to (unknown, a
+cancelled reservation to confirm, a clash) are reported and left untouched.
+"""
+from django.db import transaction
+from rest_framework import serializers
+
+from api import caching, events
+from tables.models import Table
+from venues.routing import current_id
+from . import occupancy, waitlist
+from .bulk import clashing_tables, delete_reservations, held_buckets
+from .models import Reservation, TableSlotOccupancy, WaitlistEntry
+
+ACTION_CONFIRM = 'confirm'
+ACTION_CANCEL = 'cancel'
+ACTION_DELETE = 'delete'
+ACTION_REASSIGN = 'reassign'
+ACTIONS = (ACTION_CONFIRM, ACTION_CANCEL, ACTION_DELETE, ACTION_REASSIGN)
+
+MAX_IDS = 500
+
+ReservationTable = Reservation.tables.through
+
+
+class BatchActionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=ACTIONS)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=MAX_IDS)
+    tables_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    def validate(self, attrs):
+        if attrs['action'] != ACTION_REASSIGN:
+            attrs.pop('tables_ids', None)
+            return attrs
+        table_ids = sorted(set(attrs.get('tables_ids') or []))
+        if not table_ids:
+            raise serializers.ValidationError({"tables_ids": "Tables are required to reassign."})
+        tables = dict(
+            Table.objects.in_venue().filter(id__in=table_ids, is_active=True).values_list('id', 'seats')
+        )
+        unknown = sorted(set(table_ids) - tables.keys())
+        if unknown:
+            raise serializers.ValidationError({"tables_ids": f"Unknown or inactive tables: {unknown}"})
+        attrs['tables_ids'] = table_ids
+        attrs['seats'] = sum(tables.values())
+        return attrs
+
+
+def _confirm(rows, errors, **_options):
+    for pk, row in rows.items():
+        if row['status'] == Reservation.STATUS_CANCELLED:
+            errors[pk] = "Cancelled reservations cannot be confirmed."
+    pending = [pk for pk, row in rows.items() if row['status'] == Reservation.STATUS_PENDING]
+    Reservation.objects.filter(pk__in=pending).update(status=Reservation.STATUS_CONFIRMED)
+    # Both statuses hold the same tables
+    return pending, events.RESERVATION_UPDATED, {'availability': False}
+
+
+def _cancel(rows, errors, **_options):
+    active = [pk for pk, row in rows.items() if row['status'] in Reservation.ACTIVE_STATUSES]
+    Reservation.objects.filter(pk__in=active).update(status=Reservation.STATUS_CANCELLED)
+    occupancy.clear_reservations(active)
+    _free([rows[pk] for pk in active])
+    return active, events.RESERVATION_CANCELLED, {}
+
+
+def _delete(rows, errors, **_options):
+    ids = list(rows)
+    WaitlistEntry.objects.filter(reservation_id__in=ids).update(reservation=None)
+    TableSlotOccupancy.objects.filter(reservation_id__in=ids).delete()
+    ReservationTable.objects.filter(reservation_id__in=ids).delete()
+    # Nothing references them any more; the signal handlers' work is done below, once
+    delete_reservations(ids)
+    _free([row for row in rows.values() if row['status'] in Reservation.ACTIVE_STATUSES])
+    return ids, events.RESERVATION_DELETED, {}
+
+
+def _reassign(rows, errors, tables_ids, seats):
+    claims = {}
+    for pk, row in rows.items():
+        if row['guests'] > seats:
+            errors[pk] = "Selected tables do not seat all guests."
+        elif row['status'] in Reservation.ACTIVE_STATUSES:
+            claims[pk] = {
+                (slot, table_id)
+                for table_id in tables_ids
+                for slot in occupancy.slots_covering(row['start_datetime'], row['end_datetime'])
+            }
+        else:
+            claims[pk] = set()
+
+    wanted = set().union(*claims.values())
+    held = held_buckets(wanted) if wanted else {}
+    accepted = []
+    for pk, claim in claims.items():
+        start, end = rows[pk]['start_datetime'], rows[pk]['end_datetime']
+        # A reservation's own tables are no clash: they move with it
+        clashes = clashing_tables(held, claim, start, end, ignore={pk})
+        if clashes:
+            errors[pk] = f"Tables already reserved for this time: {sorted(clashes)}"
+            continue
+        for bucket in claim:
+            held.setdefault(bucket, []).append((pk, start, end))
+        accepted.append(pk)
+
+    ReservationTable.objects.filter(reservation_id__in=accepted).delete()
+    ReservationTable.objects.bulk_create(
+        ReservationTable(reservation_id=pk, table_id=table_id) for pk in accepted for table_id in tables_ids
+    )
+    occupancy.sync_reservations(accepted)
+    return accepted, events.RESERVATION_UPDATED, {'stats': False}
+
+
+def _free(rows):
+    # One match per freed window, like the signal handlers
+    for start, end in {(row['start_datetime'], row['end_datetime']) for row in rows}:
+        waitlist.freed(current_id(), start, end)
+
+
+_ACTIONS = {
+    ACTION_CONFIRM: _confirm,
+    ACTION_CANCEL: _cancel,
+    ACTION_DELETE: _delete,
+    ACTION_REASSIGN: _reassign,
+}
+
+
+def apply(action, ids, tables_ids=(), seats=0):
+    """
+    Apply ``action`` to the reservations ``ids`` of the current venue in one transaction.
+
+    Returns one ``{"id", "ok"}`` result per id, in request order, with a
+    ``detail`` when the action was not applied to it.
+    """
+    ids = list(dict.fromkeys(ids))
+    venue_id = current_id()
+    with transaction.atomic():
+        rows = {
+            row['id']: row
+            for row in Reservation.objects.in_venue().select_for_update().filter(id__in=ids).order_by('id').values(
+                'id', 'start_datetime', 'end_datetime', 'guests', 'status'
+            )
+        }
+        errors = {pk: "Not found." for pk in ids if pk not in rows}
+        changed, event, scope = _ACTIONS[action](rows, errors, tables_ids=tables_ids, seats=seats)
+
+        if changed:
+            caching.invalidate_reservations([rows[pk]['start_datetime'] for pk in changed], venue_id=venue_id, **scope)
+        for pk in changed:
+            events.reservation_changed(
+                pk, event, [] if scope.get('stats') is False else [rows[pk]['start_datetime']], venue_id=venue_id
+            )
+
+    return [
+        {'id': pk, 'ok': False, 'detail': errors[pk]} if pk in errors else {'id': pk, 'ok': True}
+        for pk in ids
+    ]
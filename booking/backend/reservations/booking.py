@@ -0,0 +1,166 @@
+"""
+Race-free booking.
+
+A booking runs in one transaction that first locks the requested ``Table``
+rows, then re-checks that none of them is held by an overlapping active
+reservation, and only then writes. On PostgreSQL the lock is a
+``SELECT ... FOR UPDATE`` on the tables; SQLite ignores that clause, so the
+``default`` database opens every transaction with ``BEGIN IMMEDIATE`` (see
+``api/settings.py``), which serializes writers on the database lock instead.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from tables import assignment, availability
+from tables.models import Table
+from . import config, recurrence
+from .models import Reservation, TableSlotOccupancy
+from .occupancy import slot_floor, slots_covering
+
+# Open-ended series are checked against other series this far ahead; single
+# reservations are always checked in full (and check series when they are booked)
+SERIES_CONFLICT_HORIZON = timedelta(days=366)
+
+
+class BookingConflict(Exception):
+    """Some of the requested tables are already held for the requested window."""
+
+    detail = "Some tables are already reserved for this time"
+
+    def __init__(self, table_ids):
+        super().__init__(f"Tables already reserved: {sorted(table_ids)}")
+        self.table_ids = sorted(table_ids)
+
+
+class NoTablesAvailable(BookingConflict):
+    """No combination of free tables can seat the party."""
+
+    detail = "No combination of free tables seats this party"
+
+    def __init__(self):
+        super().__init__([])
+
+
+def book(serializer, auto_assign=False, respect_groups=False):
+    """
+    Save a validated ``ReservationSerializer`` (create or update) atomically.
+
+    With ``auto_assign`` and no ``tables_ids``, the tables are picked by
+    ``tables.assignment``. Raises ``BookingConflict`` when an active
+    reservation already holds one of the tables during the reservation window;
+    nothing is written in that case.
+    """
+    instance = serializer.instance
+    data = serializer.validated_data
+    start = data.get('start_datetime', getattr(instance, 'start_datetime', None))
+    end = data.get('end_datetime', getattr(instance, 'end_datetime', None))
+    status = getattr(instance, 'status', Reservation.STATUS_PENDING)
+
+    with transaction.atomic():
+        if auto_assign and not data.get('tables'):
+            table_ids = assignment.suggest(start, data['guests'], respect_groups, window=end - start)
+            if table_ids is None:
+                raise NoTablesAvailable()
+            data['tables'] = list(Table.objects.filter(id__in=table_ids))
+
+        if 'tables' in data:
+            table_ids = [table.pk for table in data['tables']]
+        elif instance is not None:
+            table_ids = list(instance.tables.values_list('id', flat=True))
+        else:
+            table_ids = []
+
+        if table_ids and status in Reservation.ACTIVE_STATUSES:
+            _claim(table_ids, start, end, exclude_reservation=getattr(instance, 'pk', None))
+
+        return serializer.save()
+
+
+def _claim(table_ids, start, end, exclude_reservation=None):
+    """Lock ``table_ids`` and raise ``BookingConflict`` unless all are free during [start, end)."""
+    # Lock in a stable order so concurrent bookings cannot deadlock
+    list(Table.objects.select_for_update().filter(id__in=table_ids).order_by('id'))
+    taken = availability.reserved_table_ids(start, window=end - start, exclude_reservation=exclude_reservation)
+    conflicts = taken.intersection(table_ids)
+    if conflicts:
+        raise BookingConflict(conflicts)
+
+
+def set_status(reservation, status):
+    """
+    Change the status of ``reservation`` atomically.
+
+    A cancelled reservation holds no tables, so reactivating one claims its
+    tables again like ``book``: raises ``BookingConflict`` and writes nothing
+    when another reservation or a series took them in the meantime.
+    """
+    with transaction.atomic():
+        if reservation.status not in Reservation.ACTIVE_STATUSES and status in Reservation.ACTIVE_STATUSES:
+            table_ids = list(reservation.tables.values_list('id', flat=True))
+            if table_ids:
+                _claim(table_ids, reservation.start_datetime, reservation.end_datetime, reservation.pk)
+        reservation.status = status
+        reservation.save()
+    return reservation
+
+
+def _series_conflicts(rule, table_ids, exclude_series=None):
+    """Tables of ``table_ids`` that an occurrence of ``rule`` would share with a reservation or another series."""
+    first = timezone.make_aware(rule.first)
+    last_index = rule.last_index()
+    last = None if last_index is None else timezone.make_aware(rule.nth(last_index)) + rule.duration
+
+    taken = TableSlotOccupancy.objects.filter(table_id__in=table_ids, slot__gte=slot_floor(first))
+    if last is not None:
+        taken = taken.filter(slot__lt=last)
+    taken = set(taken.values_list('slot', 'table_id'))
+
+    horizon = max([first + SERIES_CONFLICT_HORIZON, *(slot + rule.duration for slot, _table_id in taken)])
+    if last is not None:
+        horizon = min(horizon, last)
+    buckets = {
+        bucket
+        for start in rule.starts(first, horizon)
+        for bucket in slots_covering(start, start + rule.duration)
+    }
+
+    conflicts = {table_id for bucket, table_id in taken if bucket in buckets}
+    for start, end, table_id, series_id in recurrence.held(first, horizon):
+        if series_id != exclude_series and table_id in table_ids and table_id not in conflicts:
+            if any(bucket in buckets for bucket in slots_covering(start, end)):
+                conflicts.add(table_id)
+    return conflicts
+
+
+def book_series(serializer):
+    """
+    Save a validated ``ReservationSeriesSerializer`` atomically, like ``book``.
+
+    Raises ``BookingConflict`` when one of its occurrences would share a table
+    with an active reservation or an occurrence of another active series.
+    """
+    instance = serializer.instance
+    data = serializer.validated_data
+
+    with transaction.atomic():
+        if 'tables' in data:
+            table_ids = [table.pk for table in data['tables']]
+        elif instance is not None:
+            table_ids = list(instance.tables.values_list('id', flat=True))
+        else:
+            table_ids = []
+
+        status = data.get('status', getattr(instance, 'status', Reservation.STATUS_PENDING))
+        if table_ids and status in Reservation.ACTIVE_STATUSES:
+            list(Table.objects.select_for_update().filter(id__in=table_ids).order_by('id'))
+            rule = recurrence.Rule(
+                *(data.get(field, getattr(instance, field, None)) for field in recurrence.RULE_FIELDS),
+                duration=config.current().duration_for(data.get('guests', getattr(instance, 'guests', None))),
+            )
+            conflicts = _series_conflicts(rule, table_ids, exclude_series=getattr(instance, 'pk', None))
+            if conflicts:
+                raise BookingConflict(conflicts)
+
+        return serializer.save()
@@ -0,0 +1,316 @@
+"""
+Bulk import and export of reservations.
+
+Imports are processed in chunks. Each chunk is validated row by row with one
+shared serializer instance, checked for table conflicts in memory against a
+single occupancy query (and against the other rows of the same chunk), and
+written with ``bulk_create`` / ``bulk_update`` on ``Reservation`` and its
+through-table inside one transaction. Rows that fail are reported with their
+line number; the other rows of the chunk are still written.
+"""
+from django.db import connections, router, transaction
+from rest_framework import serializers
+
+from api import caching, events
+from api.streams import DEFAULT_CHUNK_SIZE, ImportReport, chunked, split_ids
+from tables.models import Table
+from venues.routing import current_id
+from . import config, occupancy, recurrence, waitlist
+from .models import Reservation, TableSlotOccupancy
+
+FIELDS = (
+    'id', 'customer_name', 'customer_phone', 'start_datetime', 'end_datetime', 'guests', 'notes', 'status', 'tables_ids'
+)
+MODEL_FIELDS = ('customer_name', 'customer_phone', 'start_datetime', 'end_datetime', 'guests', 'notes', 'status')
+
+ReservationTable = Reservation.tables.through
+
+
+class ReservationImportSerializer(serializers.ModelSerializer):
+    """Validates one imported row; ``tables`` (active table id -> seats) comes from the context."""
+
+    id = serializers.IntegerField(required=False, min_value=1)
+    tables_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    class Meta:
+        model = Reservation
+        fields = list(FIELDS)
+        extra_kwargs = {'end_datetime': {'required': False}}
+
+    def validate_tables_ids(self, value):
+        tables = self.context['tables']
+        unknown = sorted(set(value) - tables.keys())
+        if unknown:
+            raise serializers.ValidationError(f"Unknown or inactive tables: {unknown}")
+        return sorted(set(value))
+
+    def validate(self, attrs):
+        tables = self.context['tables']
+        table_ids = attrs.get('tables_ids')
+        if table_ids and sum(tables[table_id] for table_id in table_ids) < attrs['guests']:
+            raise serializers.ValidationError({"tables_ids": "Selected tables do not seat all guests."})
+        # Rows are full records (like PUT), so updates overwrite every field
+        attrs.setdefault('notes', '')
+        attrs.setdefault('status', Reservation.STATUS_PENDING)
+        if 'end_datetime' not in attrs:
+            attrs['end_datetime'] = attrs['start_datetime'] + config.current().duration_for(attrs['guests'])
+        elif attrs['end_datetime'] <= attrs['start_datetime']:
+            raise serializers.ValidationError({"end_datetime": "Must be after the start."})
+        return attrs
+
+
+def import_rows(numbered_rows, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Import ``(line_number, row)`` pairs (see ``api.streams.read_rows``) into the current venue.
+
+    Rows with an ``id`` update that reservation, the others are created.
+    Returns the ``ImportReport``; with ``dry_run`` nothing is written.
+    """
+    report = ImportReport()
+    tables = dict(Table.objects.in_venue().filter(is_active=True).values_list('id', 'seats'))
+    validator = ReservationImportSerializer(context={'tables': tables})
+    for chunk in chunked(numbered_rows, chunk_size):
+        _import_chunk(chunk, validator, report, dry_run)
+    return report
+
+
+def _validate(chunk, validator, report):
+    valid = []
+    for line, row in chunk:
+        if isinstance(row, Exception):
+            report.fail(line, {"non_field_errors": [str(row)]})
+            continue
+        if 'tables_ids' in row:
+            row = {**row, 'tables_ids': split_ids(row['tables_ids'])}
+        try:
+            valid.append((line, validator.run_validation(row)))
+        except serializers.ValidationError as exc:
+            report.fail(line, exc.detail)
+    return valid
+
+
+def _import_chunk(chunk, validator, report, dry_run):
+    valid = _validate(chunk, validator, report)
+    if not valid:
+        return
+
+    with transaction.atomic():
+        update_ids = [data['id'] for _line, data in valid if 'id' in data]
+        previous = {
+            row['id']: row
+            for row in Reservation.objects.in_venue().filter(id__in=update_ids).values(
+                'id', 'start_datetime', 'end_datetime', 'status'
+            )
+        }
+        # Updates that do not list tables keep the ones they have
+        kept_tables = {}
+        for reservation_id, table_id in ReservationTable.objects.filter(
+            reservation_id__in=previous
+        ).values_list('reservation_id', 'table_id'):
+            kept_tables.setdefault(reservation_id, []).append(table_id)
+
+        rows = []
+        for line, data in valid:
+            if 'id' in data and data['id'] not in previous:
+                report.fail(line, {"id": [f"Reservation {data['id']} does not exist."]})
+                continue
+            if 'tables_ids' not in data:
+                data['tables_ids'] = kept_tables.get(data.get('id'), [])
+            rows.append((line, data))
+
+        rows = _drop_conflicts(rows, report)
+
+        if dry_run:
+            for _line, data in rows:
+                if 'id' in data:
+                    report.updated += 1
+                else:
+                    report.created += 1
+            return
+        _write(rows, previous, kept_tables, report)
+
+
+def _claims(data):
+    """(slot, table id) buckets a row would occupy."""
+    if data['status'] not in Reservation.ACTIVE_STATUSES:
+        return set()
+    return {
+        (slot, table_id)
+        for table_id in data['tables_ids']
+        for slot in occupancy.slots_covering(data['start_datetime'], data['end_datetime'])
+    }
+
+
+def held_buckets(wanted):
+    """
+    Lock the tables of the (slot, table id) buckets in ``wanted`` and map the
+    buckets already held to ``(holder, start, end)`` entries of what holds
+    them: the reservation id, or None for a series occurrence. Two queries,
+    however many buckets.
+    """
+    table_ids = sorted({table_id for _slot, table_id in wanted})
+    # Lock in a stable order, as reservations.booking does
+    list(Table.objects.select_for_update().filter(id__in=table_ids).order_by('id'))
+    slots = {slot for slot, _table_id in wanted}
+    held = {}
+    for slot, table_id, reservation_id, start, end in TableSlotOccupancy.objects.filter(
+        slot__in=slots, table_id__in=table_ids
+    ).values_list('slot', 'table_id', 'reservation_id', 'reservation__start_datetime', 'reservation__end_datetime'):
+        held.setdefault((slot, table_id), []).append((reservation_id, start, end))
+    for start, end, table_id, _series in recurrence.held(min(slots), max(slots) + occupancy.SLOT):
+        if table_id in table_ids:
+            for slot in occupancy.slots_covering(start, end):
+                held.setdefault((slot, table_id), []).append((None, start, end))
+    return held
+
+
+def clashing_tables(held, claim, start, end, ignore=()):
+    """
+    Tables of the ``claim`` buckets that a holder in ``held`` (see
+    ``held_buckets``) other than those in ``ignore`` keeps during [start, end).
+    A shared bucket alone is no clash.
+    """
+    return {
+        table_id
+        for slot, table_id in claim
+        for holder, held_start, held_end in held.get((slot, table_id), ())
+        if holder not in ignore and held_start < end and held_end > start
+    }
+
+
+def _own(data):
+    # A reservation never clashes with the tables it already holds
+    return {data['id']} if 'id' in data else set()
+
+
+def _drop_conflicts(rows, report):
+    claims = [_claims(data) for _line, data in rows]
+    wanted = set().union(*claims)
+    if not wanted:
+        return rows
+
+    held = held_buckets(wanted)
+    # An update frees the tables its reservation holds only once it is accepted;
+    # rows refused because of such tables are tried again after it
+    released = set()
+    accepted = {}
+    pending = list(enumerate(zip(rows, claims)))
+    while pending:
+        refused = []
+        for index, ((line, data), claim) in pending:
+            start, end = data['start_datetime'], data['end_datetime']
+            if clashing_tables(held, claim, start, end, ignore=released | _own(data)):
+                refused.append((index, ((line, data), claim)))
+                continue
+            for bucket in claim:
+                held.setdefault(bucket, []).append((('row', index), start, end))
+            if 'id' in data:
+                released.add(data['id'])
+            accepted[index] = (line, data)
+        if len(refused) == len(pending):
+            break
+        pending = refused
+
+    for _index, ((line, data), claim) in pending:
+        start, end = data['start_datetime'], data['end_datetime']
+        clashes = clashing_tables(held, claim, start, end, ignore=released | _own(data))
+        report.fail(line, {"tables_ids": [f"Tables already reserved for this time: {sorted(clashes)}"]})
+    return [accepted[index] for index in sorted(accepted)]
+
+
+def _freed_windows(updates, previous, old_tables):
+    """Windows left by active reservations that an update cancels or moves."""
+    windows = set()
+    for data in updates:
+        old = previous[data['id']]
+        if old['status'] not in Reservation.ACTIVE_STATUSES:
+            continue
+        if (
+            data['status'] not in Reservation.ACTIVE_STATUSES
+            or (data['start_datetime'], data['end_datetime']) != (old['start_datetime'], old['end_datetime'])
+            or set(data['tables_ids']) != set(old_tables.get(data['id'], []))
+        ):
+            windows.add((old['start_datetime'], old['end_datetime']))
+    return windows
+
+
+def _write(rows, previous, old_tables, report):
+    creates = [data for _line, data in rows if 'id' not in data]
+    updates = [data for _line, data in rows if 'id' in data]
+
+    venue_id = current_id()
+    freed = _freed_windows(updates, previous, old_tables)
+    created = [
+        Reservation(venue_id=venue_id, **{field: data[field] for field in MODEL_FIELDS}) for data in creates
+    ]
+    updated = [
+        Reservation(id=data['id'], venue_id=venue_id, **{field: data[field] for field in MODEL_FIELDS})
+        for data in updates
+    ]
+    Reservation.objects.bulk_create(created)
+    Reservation.objects.bulk_update(updated, MODEL_FIELDS)
+
+    ReservationTable.objects.filter(reservation_id__in=[data['id'] for data in updates]).delete()
+    ReservationTable.objects.bulk_create(
+        ReservationTable(reservation_id=reservation.pk, table_id=table_id)
+        for reservation, data in zip(created + updated, creates + updates)
+        for table_id in data['tables_ids']
+    )
+
+    reservation_ids = [reservation.pk for reservation in created + updated]
+    occupancy.sync_reservations(reservation_ids)
+    old_starts = {pk: old['start_datetime'] for pk, old in previous.items()}
+    caching.invalidate_reservations(
+        [data['start_datetime'] for data in creates + updates] + list(old_starts.values()), venue_id=venue_id
+    )
+    for reservation in created:
+        events.reservation_changed(
+            reservation.pk, events.RESERVATION_CREATED, [reservation.start_datetime], venue_id=venue_id
+        )
+    for reservation in updated:
+        events.reservation_changed(
+            reservation.pk, events.RESERVATION_UPDATED,
+            [reservation.start_datetime, old_starts[reservation.pk]], venue_id=venue_id,
+        )
+    # One match per freed window, like the signal handlers
+    for start, end in freed:
+        waitlist.freed(venue_id, start, end)
+    report.created += len(created)
+    report.updated += len(updated)
+
+
+def delete_reservations(ids):
+    """
+    Delete the reservations ``ids`` with one plain ``DELETE``.
+
+    ``QuerySet.delete()`` would load every reservation to send its
+    ``post_delete`` signal. Callers first drop the rows referencing them
+    (occupancy, table links, waitlist links) and do the signal handlers' work
+    once for the whole set.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    connection = connections[router.db_for_write(Reservation)]
+    table = connection.ops.quote_name(Reservation._meta.db_table)
+    column = connection.ops.quote_name(Reservation._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+def export_rows(queryset, chunk_size=1000):
+    """Yield reservations in the import format, one table query per chunk."""
+    rows = queryset.values('id', *MODEL_FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in chunked(rows, chunk_size):
+        tables = {}
+        for reservation_id, table_id in (
+            ReservationTable.objects.filter(reservation_id__in=[row['id'] for row in chunk])
+            .order_by('id')
+            .values_list('reservation_id', 'table_id')
+        ):
+            tables.setdefault(reservation_id, []).append(table_id)
+        for row in chunk:
+            row['start_datetime'] = row['start_datetime'].isoformat()
+            row['end_datetime'] = row['end_datetime'].isoformat()
+            row['tables_ids'] = tables.get(row['id'], [])
+            yield row
@@ -0,0 +1,149 @@
+"""
+Venue configuration, cached in-process.
+
+``current()`` returns an immutable ``Snapshot`` of the current venue's
+``RestaurantConfig`` with its service periods and duration rules. Snapshots
+live in this process, one per venue, and cost no query on the hot paths; one
+is re-read when ``invalidate()`` runs here (the signal handlers call it on
+every change) or when another process bumped the venue's shared version key,
+which is checked at most every ``RESERVATION_CONFIG_CHECK_SECONDS``. Without a
+configuration row the defaults apply: ``Reservation.DURATION``, 15 minute
+slots and ``RESERVATION_OPENING_HOURS`` every day.
+"""
+import threading
+import time as clock
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from venues.routing import acurrent_id, current_id
+from .models import Reservation, RestaurantConfig
+
+DEFAULT_SLOT_MINUTES = 15
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    slot_minutes: int
+    default_duration: timedelta
+    # (min_guests, duration), largest party first
+    rules: tuple = ()
+    # (name, weekday or None, opens, closes)
+    periods: tuple = ()
+
+    def duration_for(self, guests):
+        """How long a party of ``guests`` holds its tables."""
+        for min_guests, duration in self.rules:
+            if guests is not None and guests >= min_guests:
+                return duration
+        return self.default_duration
+
+    @property
+    def max_duration(self):
+        return max([self.default_duration, *(duration for _min_guests, duration in self.rules)])
+
+    def service_windows(self, day):
+        """Aware (opens, closes) of the service periods of ``day``, sorted."""
+        windows = []
+        for _name, weekday, opens, closes in self.periods:
+            if weekday is not None and weekday != day.weekday():
+                continue
+            closing_day = day if closes > opens else day + timedelta(days=1)
+            windows.append((
+                timezone.make_aware(datetime.combine(day, opens)),
+                timezone.make_aware(datetime.combine(closing_day, closes)),
+            ))
+        return sorted(windows)
+
+    def opening_hours(self):
+        """(open, close) hours spanning every service period, for the stats dashboard."""
+        opens = min(opens.hour for _name, _weekday, opens, _closes in self.periods)
+        close = max(
+            24 if closes <= opens else closes.hour + (closes.minute > 0)
+            for _name, _weekday, opens, closes in self.periods
+        )
+        return opens, close
+
+
+def _default_periods():
+    open_hour, close_hour = settings.RESERVATION_OPENING_HOURS
+    return (("", None, time(open_hour), time(close_hour % 24)),)
+
+
+def load(venue_id):
+    """Read a fresh snapshot of a venue from the database (three queries)."""
+    row = RestaurantConfig.objects.filter(venue_id=venue_id).first()
+    if row is None:
+        return Snapshot(DEFAULT_SLOT_MINUTES, Reservation.DURATION, periods=_default_periods())
+    rules = tuple(
+        (min_guests, timedelta(minutes=minutes))
+        for min_guests, minutes in row.duration_rules.order_by("-min_guests").values_list(
+            "min_guests", "duration_minutes"
+        )
+    )
+    periods = tuple(row.periods.values_list("name", "weekday", "opens", "closes"))
+    return Snapshot(
+        row.slot_minutes,
+        timedelta(minutes=row.default_duration_minutes),
+        rules,
+        periods or _default_periods(),
+    )
+
+
+_lock = threading.Lock()
+_snapshots = {}  # venue id -> (snapshot, version, checked at)
+
+
+def _get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(venue_id):
+    return f"config:{venue_id}:version"
+
+
+def _fresh(venue_id):
+    """The venue's snapshot when it was checked recently enough, else None."""
+    entry = _snapshots.get(venue_id)
+    if entry is not None and clock.monotonic() - entry[2] < settings.RESERVATION_CONFIG_CHECK_SECONDS:
+        return entry[0]
+    return None
+
+
+def current(venue_id=None):
+    """The cached configuration snapshot of ``venue_id``, by default the current venue."""
+    venue_id = venue_id or current_id()
+    snapshot = _fresh(venue_id)
+    if snapshot is not None:
+        return snapshot
+    version = _get_cache().get(_version_key(venue_id))
+    with _lock:
+        entry = _snapshots.get(venue_id)
+        snapshot = load(venue_id) if entry is None or entry[1] != version else entry[0]
+        _snapshots[venue_id] = (snapshot, version, clock.monotonic())
+        return snapshot
+
+
+async def acurrent(venue_id=None):
+    """``current`` for async views."""
+    venue_id = venue_id or await acurrent_id()
+    return _fresh(venue_id) or await sync_to_async(current)(venue_id)
+
+
+def _bump(venue_id):
+    with _lock:
+        _snapshots.pop(venue_id, None)
+    _get_cache().set(_version_key(venue_id), uuid.uuid4().hex, timeout=None)
+
+
+def invalidate(venue_id=None):
+    """Drop a venue's snapshot here and in every other process, now and after commit."""
+    venue_id = venue_id or current_id()
+    _bump(venue_id)
+    transaction.on_commit(lambda: _bump(venue_id))
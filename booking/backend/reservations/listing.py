@@ -0,0 +1,122 @@
+"""
+Filtering and keyset pagination for the reservation list.
+
+Pages are ordered by ``(start_datetime, id)`` and addressed by an opaque
+cursor holding the last row of the previous page, so fetching page N costs the
+same as fetching page 1.
+"""
+import base64
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Reservation
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# The unpaginated list stops here; past it the X-Next-Cursor header continues
+MAX_LIST_SIZE = 1000
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+ORDERING = ('start_datetime', 'id')
+
+
+def parse_bound(value, name):
+    """Accept an ISO datetime or a bare date (midnight, current timezone)."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid {name}")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_reservations(queryset, params):
+    """
+    Apply the list filters from the query string.
+
+    ``start`` / ``end`` bound ``start_datetime`` (inclusive / exclusive),
+    ``status`` and ``table`` take comma-separated values. Raises ``ValueError``
+    on malformed input.
+    """
+    if params.get('start'):
+        queryset = queryset.filter(start_datetime__gte=parse_bound(params['start'], 'start'))
+    if params.get('end'):
+        queryset = queryset.filter(start_datetime__lt=parse_bound(params['end'], 'end'))
+
+    if params.get('status'):
+        statuses = params['status'].upper().split(',')
+        valid = {value for value, _label in Reservation.STATUS_CHOICES}
+        if not set(statuses) <= valid:
+            raise ValueError("Invalid status")
+        queryset = queryset.filter(status__in=statuses)
+
+    if params.get('table'):
+        try:
+            table_ids = [int(value) for value in params['table'].split(',')]
+        except ValueError:
+            raise ValueError("Invalid table")
+        # A subquery on the through-table avoids duplicate rows from the join
+        links = Reservation.tables.through.objects.filter(table_id__in=table_ids)
+        queryset = queryset.filter(id__in=links.values('reservation_id'))
+
+    return queryset.order_by(*ORDERING)
+
+
+def encode_cursor(row):
+    raw = f"{row['start_datetime'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        start, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        start = datetime.fromisoformat(start)
+        return start, int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def page_size(params):
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("Invalid limit")
+    if limit < 1:
+        raise ValueError("Invalid limit")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _page_query(queryset, cursor, limit):
+    if cursor:
+        start, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(start_datetime__gt=start) | Q(start_datetime=start, id__gt=pk)
+        )
+    return queryset[:limit + 1]
+
+
+def _split_page(rows, limit):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def paginate(queryset, cursor, limit):
+    """
+    Return one page of ``.values()`` rows from an ordered queryset and the
+    cursor of the next page (or None).
+    """
+    return _split_page(list(_page_query(queryset, cursor, limit)), limit)
+
+
+async def apaginate(queryset, cursor, limit):
+    """``paginate`` for async views."""
+    rows = [row async for row in _page_query(queryset, cursor, limit)]
+    return _split_page(rows, limit)
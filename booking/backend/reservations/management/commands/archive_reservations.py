@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.streams import DEFAULT_CHUNK_SIZE
+from reservations import archive
+from reservations.listing import parse_bound
+from venues import routing
+from venues.models import Venue
+
+
+class Command(BaseCommand):
+    help = "Move reservations that ended before a cutoff to the archive, in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365, help="Archive reservations that ended this many days ago")
+        parser.add_argument("--before", help="Archive reservations that ended before this date/datetime instead")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Reservations per transaction")
+        parser.add_argument("--venue", default=None, help="Slug of the venue to archive (default: every venue)")
+
+    def handle(self, *args, **options):
+        if options["days"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--days and --chunk-size must be at least 1")
+        if options["before"]:
+            try:
+                before = parse_bound(options["before"], "--before")
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        else:
+            before = timezone.now() - timedelta(days=options["days"])
+        if before > timezone.now():
+            raise CommandError("The cutoff must not be in the future")
+
+        venues = Venue.objects.order_by("pk")
+        if options["venue"]:
+            venues = venues.filter(slug=options["venue"])
+            if not venues.exists():
+                raise CommandError(f"Unknown venue {options['venue']}")
+
+        for venue in venues:
+            with routing.activate(venue.pk):
+                moved = archive.archive(before, chunk_size=options["chunk_size"])
+            self.stdout.write(self.style.SUCCESS(f"Archived {moved} reservations of {venue.slug}"))
@@ -0,0 +1,152 @@
+import json
+import platform
+import subprocess
+from datetime import timedelta
+from itertools import count
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api import caching
+from api.benchmarking import measure, seed_reservations, seed_tables, throwaway_database
+from venues.routing import current_id
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark availability, booking, stats, analytics, listing and JWT login through the full "
+        "request stack against a seeded throwaway database. Save a run with --output and "
+        "compare a later one (e.g. on another commit) with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tables", type=int, default=300)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--per-day", type=int, default=150)
+        parser.add_argument("--repeat", type=int, default=30, help="Requests per scenario")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON results to this file")
+        parser.add_argument("--compare", help="Earlier results file to report median latency changes against")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as handle:
+                baseline = json.load(handle)
+
+        with throwaway_database(), override_settings(ALLOWED_HOSTS=["testserver"]):
+            reservations = options["days"] * options["per_day"]
+            table_ids = seed_tables(options["tables"])
+            seed_reservations(reservations, table_ids, days=options["days"], seed=options["seed"], peaks=True)
+            user = get_user_model().objects.create_user(username="bench", password="bench", is_staff=True)
+            # Staff only reach the venues they belong to
+            user.venues.add(current_id())
+            results = self.run_scenarios(options["repeat"], table_ids)
+
+        report = {
+            "commit": _git_commit(),
+            "created_at": timezone.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "tables": options["tables"],
+            "reservations": reservations,
+            "repeat": options["repeat"],
+            "results": results,
+        }
+        if baseline is not None:
+            report["compared_to"] = baseline.get("commit")
+            report["median_change_pct"] = {
+                name: round((timing["median_ms"] / before["median_ms"] - 1) * 100, 1)
+                for name, timing in results.items()
+                if (before := baseline.get("results", {}).get(name)) and before["median_ms"]
+            }
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output + "\n")
+        self.stdout.write(output)
+
+    def run_scenarios(self, repeat, table_ids):
+        client = Client()
+        auth = {}
+
+        def check(response, expected):
+            if response.status_code != expected:
+                raise CommandError(
+                    f"{response.request['REQUEST_METHOD']} {response.request['PATH_INFO']} answered "
+                    f"{response.status_code}: {response.content[:200]!r}"
+                )
+
+        def get(path, **params):
+            check(client.get(path, params, **auth), 200)
+
+        def post(path, payload, expected):
+            response = client.post(path, payload, content_type="application/json", **auth)
+            check(response, expected)
+            return response
+
+        login = {"username": "bench", "password": "bench"}
+        auth["HTTP_AUTHORIZATION"] = f"Bearer {post('/api/v1/auth/token/', login, 200).json()['access']}"
+
+        # Friday 20:00 is the busiest slot of the week
+        now = timezone.localtime().replace(hour=20, minute=0, second=0, microsecond=0)
+        friday = now + timedelta(days=(4 - now.weekday()) % 7)
+        day = friday.date().isoformat()
+        month = [friday + timedelta(days=n) for n in range(31)]
+        tables = ",".join(str(table_id) for table_id in table_ids[:3])
+
+        # Bookings start past the seeded year so every one finds free tables
+        quarter_hours = count()
+
+        def book():
+            start = friday + timedelta(days=400, minutes=15 * next(quarter_hours))
+            post("/api/v1/reservations/", {
+                "customer_name": "Bench", "customer_phone": "912345678", "guests": 2,
+                "start_datetime": start.isoformat(), "auto_assign": True,
+            }, 201)
+
+        def expire_day():
+            caching.invalidate_reservations([friday])
+
+        # name -> (request, untimed setup); setups expire the response cache for a cold read
+        scenarios = {
+            "availability_slot": (lambda: get("/api/v1/tables/", datetime=friday.isoformat()), expire_day),
+            "availability_slot_cached": (lambda: get("/api/v1/tables/", datetime=friday.isoformat()), None),
+            "availability_day_grid": (lambda: get("/api/v1/tables/availability/", date=day, guests=4), expire_day),
+            "booking_auto_assign": (book, None),
+            "stats_day": (lambda: get("/api/v1/reservations/stats/", date=day), expire_day),
+            "stats_month": (
+                lambda: get("/api/v1/reservations/stats/", start_date=day, end_date=month[-1].date().isoformat()),
+                lambda: caching.invalidate_reservations(month),
+            ),
+            "analytics_year": (
+                lambda: get(
+                    "/api/v1/reservations/analytics/",
+                    start_date=(friday - timedelta(days=182)).date().isoformat(),
+                    end_date=(friday + timedelta(days=182)).date().isoformat(),
+                ),
+                None,
+            ),
+            "list_page": (lambda: get("/api/v1/reservations/", limit=100, start=day), None),
+            "list_filtered": (
+                lambda: get("/api/v1/reservations/", limit=100, start=day, status="confirmed", table=tables), None
+            ),
+            "jwt_login": (lambda: post("/api/v1/auth/token/", login, 200), None),
+        }
+        return {name: measure(func, repeat, setup) for name, (func, setup) in scenarios.items()}
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import measure, seed_reservations, seed_tables, throwaway_database
+from reservations import serializers
+from reservations.models import Reservation
+
+
+class Command(BaseCommand):
+    help = "Compare reservation serialization throughput before and after the lean read path"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reservations", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        count = options["reservations"]
+        repeat = options["repeat"]
+        with throwaway_database():
+            seed_reservations(count, seed_tables(60), days=30)
+            queryset = Reservation.objects.order_by("start_datetime", "id")
+
+            variants = {
+                "model_serializer_depth_1": lambda: serializers.ReservationSerializer(
+                    queryset.all(), many=True
+                ).data,
+                "model_serializer_prefetched": lambda: serializers.ReservationSerializer(
+                    queryset.prefetch_related("tables"), many=True
+                ).data,
+                "lean_read_path": lambda: list(serializers.iter_serialized(queryset.all())),
+            }
+            results = {"reservations": count}
+            for name, func in variants.items():
+                timing = measure(func, repeat)
+                timing["rows_per_second"] = round(count / (timing["median_ms"] / 1000))
+                results[name] = timing
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api import streams
+from reservations import bulk as reservation_bulk, listing
+from reservations.models import Reservation
+from tables import bulk as table_bulk
+from tables.models import Table
+
+
+class Command(BaseCommand):
+    help = "Export reservations or tables as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=['reservations', 'tables'])
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or - for stdout")
+        parser.add_argument('--format', choices=streams.FORMATS, default=streams.NDJSON)
+        parser.add_argument('--start', help="Reservations starting at or after this date/datetime")
+        parser.add_argument('--end', help="Reservations starting before this date/datetime")
+
+    def handle(self, *args, **options):
+        if options['resource'] == 'tables':
+            rows, fields = table_bulk.export_rows(Table.objects.all()), ('id', *table_bulk.FIELDS)
+        else:
+            params = {key: options[key] for key in ('start', 'end') if options[key]}
+            reservations = listing.filter_reservations(Reservation.objects.all(), params)
+            rows, fields = reservation_bulk.export_rows(reservations), reservation_bulk.FIELDS
+
+        path = options['path']
+        out = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            out.writelines(streams.lines(rows, options['format'], fields))
+        finally:
+            if out is not sys.stdout:
+                out.close()
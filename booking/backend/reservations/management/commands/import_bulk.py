@@ -0,0 +1,45 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import streams
+from reservations import bulk as reservation_bulk
+from tables import bulk as table_bulk
+
+IMPORTERS = {'reservations': reservation_bulk.import_rows, 'tables': table_bulk.import_rows}
+
+
+class Command(BaseCommand):
+    help = "Import reservations or tables from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help="File to read, or - for stdin")
+        parser.add_argument('--format', choices=streams.FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--chunk-size', type=int, default=streams.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Validate without writing")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (streams.CSV if path.endswith('.csv') else streams.NDJSON)
+        if not 1 <= options['chunk_size'] <= streams.MAX_CHUNK_SIZE:
+            raise CommandError("Invalid --chunk-size")
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            report = IMPORTERS[options['resource']](
+                streams.read_rows(stream, fmt),
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        summary = f"Created {report.created}, updated {report.updated}, failed {report.failed}"
+        if options['dry_run']:
+            summary += " (dry run)"
+        self.stdout.write(self.style.SUCCESS(summary) if not report.failed else summary)
@@ -0,0 +1,65 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.benchmarking import load_test
+from reservations.models import Reservation
+from users.tokens import add_claims
+from venues.routing import current_id
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the hot read endpoints of running deployments and compare throughput and "
+        "p99 latency. Start them on the same database first, e.g. "
+        "'gunicorn api.wsgi -b 127.0.0.1:8000 --threads 32' and "
+        "'ASYNC_READ_VIEWS=1 uvicorn api.asgi:application --port 8001', then run "
+        "'loadtest --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True, metavar="NAME=URL")
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint and target")
+        parser.add_argument("--date", help="Day to query (YYYY-MM-DD); defaults to today")
+        parser.add_argument("--username", help="User the access token is minted for; defaults to a staff member of the default venue")
+
+    def handle(self, *args, **options):
+        targets = {}
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep or not url.startswith("http://"):
+                raise CommandError(f"Invalid --target {target!r}, expected NAME=http://HOST:PORT")
+            targets[name] = url
+
+        users = get_user_model().objects.filter(is_active=True)
+        if options["username"]:
+            user = users.filter(username=options["username"]).first()
+        else:
+            user = users.filter(is_staff=True, venues=current_id()).order_by("pk").first()
+        if user is None:
+            raise CommandError("No user to authenticate as; pass --username")
+        headers = {"Authorization": f"Bearer {add_claims(AccessToken.for_user(user), user)}", "Accept": "application/json"}
+
+        day = options["date"] or timezone.localdate().isoformat()
+        endpoints = {
+            "availability": f"/api/v1/tables/?datetime={day}T20:00:00Z",
+            "availability_grid": f"/api/v1/tables/availability/?date={day}&guests=4",
+            "stats": f"/api/v1/reservations/stats/?date={day}",
+            "reservation_list": f"/api/v1/reservations/?limit=100&start={day}",
+            "auth_me": "/api/v1/auth/me/",
+        }
+        reservation = Reservation.objects.order_by("pk").values_list("pk", flat=True).first()
+        if reservation is not None:
+            endpoints["reservation_detail"] = f"/api/v1/reservations/{reservation}/"
+
+        results = {"concurrency": options["concurrency"], "requests": options["requests"], "endpoints": {}}
+        for endpoint, path in endpoints.items():
+            results["endpoints"][endpoint] = {
+                name: load_test(url, path, options["concurrency"], options["requests"], headers)
+                for name, url in targets.items()
+            }
+        self.stdout.write(json.dumps(results, indent=2))
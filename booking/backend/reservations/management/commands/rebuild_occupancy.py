@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reservations import occupancy
+
+
+class Command(BaseCommand):
+    help = "Rebuild the table slot occupancy from the reservations"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = occupancy.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} occupancy rows"))
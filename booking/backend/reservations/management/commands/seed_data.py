@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import caching
+from api.benchmarking import seed_reservations, seed_tables
+from reservations.models import Reservation
+from tables.models import Table
+from venues import routing
+from venues.models import Venue
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with realistic data: tables, a year of "
+        "reservations with lunch and weekend dinner peaks, and a staff user"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tables", type=int, default=300)
+        parser.add_argument("--days", type=int, default=365, help="Days of reservations, centred on today")
+        parser.add_argument("--per-day", type=int, default=150, help="Average reservations per day")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same data")
+        parser.add_argument("--username", default="bench", help="Staff user to create (password = username)")
+        parser.add_argument(
+            "--flush", action="store_true", help="Delete the venue's existing tables and reservations first"
+        )
+        parser.add_argument("--venue", default=None, help="Slug of the venue to fill (created if missing)")
+
+    def handle(self, *args, **options):
+        if options["tables"] < 2 or options["days"] < 1 or options["per_day"] < 0:
+            raise CommandError("--tables must be at least 2, --days at least 1 and --per-day at least 0")
+        slug = options["venue"] or settings.DEFAULT_VENUE
+        venue, _created = Venue.objects.get_or_create(slug=slug, defaults={"name": slug.title()})
+        with routing.activate(venue.pk):
+            self.seed(venue, options)
+
+    def seed(self, venue, options):
+        if Table.objects.in_venue().exists() and not options["flush"]:
+            raise CommandError(f"Venue {venue.slug} already has tables; pass --flush to replace them")
+
+        count = options["days"] * options["per_day"]
+        with transaction.atomic():
+            if options["flush"]:
+                Reservation.objects.in_venue().delete()
+                Table.objects.in_venue().delete()
+            table_ids = seed_tables(options["tables"])
+            seed_reservations(count, table_ids, days=options["days"], seed=options["seed"], peaks=True)
+            # Bulk inserts skip the signals, so expire the cached stats of every seeded day here
+            caching.invalidate_reservations(Reservation.objects.in_venue().datetimes("start_datetime", "day"))
+            caching.invalidate_tables()
+
+            User = get_user_model()
+            user = User.objects.filter(username=options["username"]).first()
+            if user is None:
+                user = User.objects.create_user(
+                    username=options["username"], password=options["username"], is_staff=True
+                )
+            venue.staff.add(user)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['tables']} tables and {count} reservations over {options['days']} days in {venue.slug}"
+        ))
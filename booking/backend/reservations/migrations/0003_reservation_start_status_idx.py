@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reservations", "0002_remove_reservation_table_reservation_tables"),
+        ("tables", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["start_datetime", "status"], name="reservation_start_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:05
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_occupancy(apps, schema_editor):
+    from reservations.occupancy import slots_covering
+
+    Reservation = apps.get_model("reservations", "Reservation")
+    TableSlotOccupancy = apps.get_model("reservations", "TableSlotOccupancy")
+    links = Reservation.tables.through.objects.filter(
+        reservation__status__in=["PENDING", "CONFIRMED"]
+    ).values_list("reservation_id", "table_id", "reservation__start_datetime")
+    TableSlotOccupancy.objects.bulk_create(
+        (
+            TableSlotOccupancy(reservation_id=reservation_id, table_id=table_id, slot=slot)
+            for reservation_id, table_id, start in links.iterator()
+            for slot in slots_covering(start, start + timedelta(hours=2))
+        ),
+        batch_size=2000,
+    )
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reservations", "0003_reservation_start_status_idx"),
+        ("tables", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TableSlotOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slot", models.DateTimeField()),
+                (
+                    "reservation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occupancy",
+                        to="reservations.reservation",
+                    ),
+                ),
+                (
+                    "table",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occupancy",
+                        to="tables.table",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["slot", "table"], name="occupancy_slot_table_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
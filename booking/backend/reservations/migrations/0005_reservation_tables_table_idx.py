@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reservations", "0004_tableslotoccupancy"),
+    ]
+
+    # The auto-created through-table cannot declare Meta.indexes. Its unique
+    # (reservation_id, table_id) index serves lookups by reservation; this one
+    # serves the table-first lookups (the ?tables= filter, table deletes)
+    # without touching the rows.
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX reservation_tables_table_res_idx "
+            "ON reservations_reservation_tables (table_id, reservation_id)",
+            "DROP INDEX reservation_tables_table_res_idx",
+        ),
+    ]
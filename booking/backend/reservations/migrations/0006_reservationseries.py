@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reservations", "0005_reservation_tables_table_idx"),
+        ("tables", "0002_table_group"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReservationSeries",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("customer_name", models.CharField(max_length=120)),
+                ("customer_phone", models.CharField(max_length=32)),
+                ("start_datetime", models.DateTimeField()),
+                ("guests", models.PositiveIntegerField()),
+                ("notes", models.TextField(blank=True, default="")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("CONFIRMED", "Confirmed"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        default="PENDING",
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "frequency",
+                    models.CharField(
+                        choices=[("WEEKLY", "Weekly"), ("MONTHLY", "Monthly")],
+                        max_length=8,
+                    ),
+                ),
+                ("interval", models.PositiveIntegerField(default=1)),
+                ("until", models.DateField(blank=True, null=True)),
+                ("count", models.PositiveIntegerField(blank=True, null=True)),
+                ("exceptions", models.JSONField(blank=True, default=list)),
+                (
+                    "last_start",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                (
+                    "tables",
+                    models.ManyToManyField(related_name="series", to="tables.table"),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["start_datetime", "last_start"],
+                        name="series_window_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:50
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_end_datetime(apps, schema_editor):
+    # Every existing reservation held its tables for the former fixed two hours
+    Reservation = apps.get_model("reservations", "Reservation")
+    Reservation.objects.update(end_datetime=F("start_datetime") + timedelta(hours=2))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reservations", "0006_reservationseries"),
+        ("tables", "0002_table_group"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DurationRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("min_guests", models.PositiveIntegerField()),
+                ("duration_minutes", models.PositiveIntegerField()),
+            ],
+            options={
+                "ordering": ["min_guests"],
+            },
+        ),
+        migrations.CreateModel(
+            name="RestaurantConfig",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slot_minutes", models.PositiveIntegerField(default=15)),
+                ("default_duration_minutes", models.PositiveIntegerField(default=120)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ServicePeriod",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(blank=True, default="", max_length=40)),
+                (
+                    "weekday",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        choices=[
+                            (0, "Monday"),
+                            (1, "Tuesday"),
+                            (2, "Wednesday"),
+                            (3, "Thursday"),
+                            (4, "Friday"),
+                            (5, "Saturday"),
+                            (6, "Sunday"),
+                        ],
+                        null=True,
+                    ),
+                ),
+                ("opens", models.TimeField()),
+                ("closes", models.TimeField()),
+            ],
+            options={
+                "ordering": ["weekday", "opens"],
+            },
+        ),
+        migrations.AddField(
+            model_name="reservation",
+            name="end_datetime",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(fill_end_datetime, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="reservation",
+            name="end_datetime",
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["end_datetime", "start_datetime"],
+                name="reservation_end_start_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="durationrule",
+            name="config",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="duration_rules",
+                to="reservations.restaurantconfig",
+            ),
+        ),
+        migrations.AddField(
+            model_name="serviceperiod",
+            name="config",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="periods",
+                to="reservations.restaurantconfig",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="durationrule",
+            constraint=models.UniqueConstraint(
+                fields=("config", "min_guests"), name="duration_rule_unique_party_size"
+            ),
+        ),
+    ]
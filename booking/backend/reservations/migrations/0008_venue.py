@@ -0,0 +1,162 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Existing rows belong to the default venue created by venues.0001
+APP = "reservations"
+MODELS = ("Reservation", "ReservationSeries", "RestaurantConfig", "TableSlotOccupancy")
+
+
+def fill_venue(apps, schema_editor):
+    Venue = apps.get_model("venues", "Venue")
+    venue = Venue.objects.get(slug=settings.DEFAULT_VENUE)
+    for model in MODELS:
+        apps.get_model(APP, model).objects.update(venue=venue)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0007_restaurant_config_end_datetime"),
+        ("tables", "0003_table_venue"),
+        ("venues", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="reservation",
+            name="reservation_start_status_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="reservation",
+            name="reservation_end_start_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="reservationseries",
+            name="series_window_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="tableslotoccupancy",
+            name="occupancy_slot_table_idx",
+        ),
+        migrations.AddField(
+            model_name="reservation",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reservationseries",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.AddField(
+            model_name="restaurantconfig",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.AddField(
+            model_name="tableslotoccupancy",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.RunPython(fill_venue, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="reservation",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="reservationseries",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="restaurantconfig",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tableslotoccupancy",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["venue", "start_datetime", "status"],
+                name="reservation_venue_start_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["venue", "end_datetime", "start_datetime"],
+                name="reservation_venue_end_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservationseries",
+            index=models.Index(
+                fields=["venue", "start_datetime", "last_start"],
+                name="series_venue_window_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tableslotoccupancy",
+            index=models.Index(
+                fields=["venue", "slot", "table"], name="occupancy_venue_slot_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="restaurantconfig",
+            constraint=models.UniqueConstraint(
+                fields=("venue",), name="config_one_per_venue"
+            ),
+        ),
+    ]
@@ -1,8 +1,11 @@
+from datetime import timedelta
+
 from django.db import models
 from tables.models import Table
+from venues.models import VenueScopedModel
 
 
-class Reservation(models.Model):
+class Reservation(VenueScopedModel):
     STATUS_PENDING = "PENDING"
     STATUS_CONFIRMED = "CONFIRMED"
     STATUS_CANCELLED = "CANCELLED"
@@ -13,9 +16,17 @@ class Reservation(models.Model):
         (STATUS_CANCELLED, "Cancelled"),
     ]
 
+    # Statuses that hold tables
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_CONFIRMED]
+
+    # How long a reservation keeps its tables when no RestaurantConfig says otherwise
+    DURATION = timedelta(hours=2)
+
     customer_name = models.CharField(max_length=120)
     customer_phone = models.CharField(max_length=32)
     start_datetime = models.DateTimeField()
+    # Filled from the restaurant's duration rules when left empty
+    end_datetime = models.DateTimeField()
     tables = models.ManyToManyField(Table, related_name="reservations")
     guests = models.PositiveIntegerField()
     notes = models.TextField(blank=True, default="")
@@ -25,5 +36,245 @@ class Reservation(models.Model):
         default=STATUS_PENDING,
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored start time so writers can invalidate the old slot too,
+        # and the stored status so a cancellation can be told from other updates
+        instance._loaded_start = instance.__dict__.get("start_datetime")
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    class Meta:
+        indexes = [
+            # Availability and stats lookups filter on the start time and status
+            models.Index(fields=["venue", "start_datetime", "status"], name="reservation_venue_start_idx"),
+            # Overlap checks: end_datetime > window start and start_datetime < window end
+            models.Index(fields=["venue", "end_datetime", "start_datetime"], name="reservation_venue_end_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.end_datetime is None and self.start_datetime is not None:
+            from .config import current
+
+            self.end_datetime = self.start_datetime + current().duration_for(self.guests)
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "end_datetime"}
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"{self.customer_name} ({self.guests}) @ {self.start_datetime}"
+
+
+class ReservationSeries(VenueScopedModel):
+    """
+    A booking that repeats weekly or monthly at the same local time.
+
+    Occurrences are not stored: ``reservations.recurrence`` expands them on
+    read within the window a query asks for. ``exceptions`` lists the local
+    dates (ISO strings) of skipped occurrences; ``last_start`` is the start of
+    the final occurrence, or None while the series is open-ended.
+    """
+
+    FREQUENCY_WEEKLY = "WEEKLY"
+    FREQUENCY_MONTHLY = "MONTHLY"
+
+    FREQUENCY_CHOICES = [
+        (FREQUENCY_WEEKLY, "Weekly"),
+        (FREQUENCY_MONTHLY, "Monthly"),
+    ]
+
+    customer_name = models.CharField(max_length=120)
+    customer_phone = models.CharField(max_length=32)
+    start_datetime = models.DateTimeField()
+    tables = models.ManyToManyField(Table, related_name="series")
+    guests = models.PositiveIntegerField()
+    notes = models.TextField(blank=True, default="")
+    status = models.CharField(
+        max_length=16,
+        choices=Reservation.STATUS_CHOICES,
+        default=Reservation.STATUS_PENDING,
+    )
+    frequency = models.CharField(max_length=8, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveIntegerField(default=1)
+    until = models.DateField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True)
+    exceptions = models.JSONField(default=list, blank=True)
+    last_start = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Window lookups: series that started before the window and have not ended
+            models.Index(fields=["venue", "start_datetime", "last_start"], name="series_venue_window_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .recurrence import last_start
+
+        self.last_start = last_start(self)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "last_start"}
+        super().save(*args, **kwargs)
+
+    def __str__(self) -> str:
+        return f"{self.customer_name} ({self.guests}) {self.frequency.lower()} from {self.start_datetime}"
+
+
+class RestaurantConfig(VenueScopedModel):
+    """
+    How a venue takes bookings.
+
+    One row per venue holding the slot granularity of the availability grid and the
+    default reservation length; its ``periods`` say when reservations may be
+    held and its ``duration_rules`` lengthen (or shorten) them by party size.
+    Readers go through ``reservations.config.current()``, which caches it.
+    """
+
+    slot_minutes = models.PositiveIntegerField(default=15)
+    default_duration_minutes = models.PositiveIntegerField(default=120)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["venue"], name="config_one_per_venue"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.default_duration_minutes} min reservations, {self.slot_minutes} min slots"
+
+
+class ServicePeriod(models.Model):
+    WEEKDAY_CHOICES = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+
+    config = models.ForeignKey(RestaurantConfig, on_delete=models.CASCADE, related_name="periods")
+    name = models.CharField(max_length=40, blank=True, default="")
+    # Empty for a period served every day
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES, null=True, blank=True)
+    opens = models.TimeField()
+    # At or before ``opens`` means after midnight (00:00 is midnight)
+    closes = models.TimeField()
+
+    class Meta:
+        ordering = ["weekday", "opens"]
+
+    def __str__(self) -> str:
+        return f"{self.name or 'Service'} {self.opens:%H:%M}-{self.closes:%H:%M}"
+
+
+class DurationRule(models.Model):
+    """Parties of at least ``min_guests`` hold their tables for ``duration_minutes``."""
+
+    config = models.ForeignKey(RestaurantConfig, on_delete=models.CASCADE, related_name="duration_rules")
+    min_guests = models.PositiveIntegerField()
+    duration_minutes = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["min_guests"]
+        constraints = [
+            models.UniqueConstraint(fields=["config", "min_guests"], name="duration_rule_unique_party_size"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.min_guests}+ guests: {self.duration_minutes} min"
+
+
+class WaitlistEntry(VenueScopedModel):
+    """
+    A party waiting for tables at a time that was fully booked.
+
+    When a reservation is cancelled or deleted, ``reservations.waitlist``
+    books the longest-waiting entry that now fits into the freed window and
+    links it to the new reservation.
+    """
+
+    STATUS_WAITING = "WAITING"
+    STATUS_BOOKED = "BOOKED"
+    STATUS_CANCELLED = "CANCELLED"
+
+    STATUS_CHOICES = [
+        (STATUS_WAITING, "Waiting"),
+        (STATUS_BOOKED, "Booked"),
+        (STATUS_CANCELLED, "Cancelled"),
+    ]
+
+    customer_name = models.CharField(max_length=120)
+    customer_phone = models.CharField(max_length=32)
+    start_datetime = models.DateTimeField()
+    guests = models.PositiveIntegerField()
+    notes = models.TextField(blank=True, default="")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_WAITING)
+    reservation = models.OneToOneField(
+        Reservation, on_delete=models.SET_NULL, null=True, blank=True, related_name="waitlist_entry"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Matching: waiting parties wanting a start in the freed window, by size
+            models.Index(fields=["venue", "status", "start_datetime", "guests"], name="waitlist_venue_match_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.customer_name} ({self.guests}) waiting for {self.start_datetime}"
+
+
+class TableSlotOccupancy(VenueScopedModel):
+    """
+    Denormalized table x time-bucket occupancy.
+
+    One row per table and per bucket covered by an active reservation. Rows are
+    maintained by ``reservations.occupancy`` so availability lookups are a
+    single range scan on ``slot``.
+    """
+
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name="occupancy")
+    reservation = models.ForeignKey(
+        Reservation, on_delete=models.CASCADE, related_name="occupancy"
+    )
+    slot = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["venue", "slot", "table"], name="occupancy_venue_slot_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Table {self.table_id} @ {self.slot}"
+
+
+class ArchivedReservation(VenueScopedModel):
+    """
+    A finished reservation moved out of the hot ``Reservation`` table.
+
+    Written by ``reservations.archive`` (the ``archive_reservations`` command)
+    and only read by the archive endpoint. The row keeps the reservation's id
+    and its table links as ``tables_ids``, so it no longer depends on
+    ``Reservation`` or on the tables still existing.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    customer_name = models.CharField(max_length=120)
+    customer_phone = models.CharField(max_length=32)
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    guests = models.PositiveIntegerField()
+    notes = models.TextField(blank=True, default="")
+    status = models.CharField(max_length=16, choices=Reservation.STATUS_CHOICES)
+    tables_ids = models.JSONField(default=list)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # History pages are read in (start_datetime, id) order within a venue
+            models.Index(fields=["venue", "start_datetime", "id"], name="archive_venue_start_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.customer_name} ({self.guests}) @ {self.start_datetime} (archived)"
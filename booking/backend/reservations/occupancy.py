@@ -0,0 +1,87 @@
+"""
+Maintenance of the ``TableSlotOccupancy`` table.
+
+Each active reservation is expanded into one row per table and per
+``SLOT``-sized bucket it covers. The rows are kept in step with the
+reservations by the signal handlers in ``reservations.signals``; ``rebuild``
+recreates them from scratch.
+"""
+from datetime import timedelta
+
+from .models import Reservation, TableSlotOccupancy
+
+SLOT = timedelta(minutes=15)
+
+ReservationTable = Reservation.tables.through
+
+
+def slot_floor(value):
+    """Start of the bucket containing ``value``."""
+    return value - timedelta(
+        minutes=value.minute % (SLOT.seconds // 60),
+        seconds=value.second,
+        microseconds=value.microsecond,
+    )
+
+
+def slots_covering(start, end):
+    """Bucket starts covering the half-open interval [start, end)."""
+    slot = slot_floor(start)
+    while slot < end:
+        yield slot
+        slot += SLOT
+
+
+def _rows(links):
+    """Occupancy rows for (reservation_id, table_id, start_datetime, end_datetime, venue_id) links."""
+    for reservation_id, table_id, start, end, venue_id in links:
+        for slot in slots_covering(start, end):
+            yield TableSlotOccupancy(reservation_id=reservation_id, table_id=table_id, slot=slot, venue_id=venue_id)
+
+
+def _active_links(reservation_ids=None):
+    links = ReservationTable.objects.filter(reservation__status__in=Reservation.ACTIVE_STATUSES)
+    if reservation_ids is not None:
+        links = links.filter(reservation_id__in=reservation_ids)
+    return links.values_list(
+        "reservation_id", "table_id", "reservation__start_datetime", "reservation__end_datetime", "reservation__venue_id"
+    )
+
+
+def sync_reservations(reservation_ids):
+    """
+    Bring the occupancy of the given reservations up to date.
+
+    Used for single reservations by the signal handlers and for whole batches
+    by bulk writers; the number of queries does not depend on the batch size.
+    """
+    reservation_ids = list(reservation_ids)
+    if not reservation_ids:
+        return
+    TableSlotOccupancy.objects.filter(reservation_id__in=reservation_ids).delete()
+    TableSlotOccupancy.objects.bulk_create(_rows(_active_links(reservation_ids)), batch_size=2000)
+
+
+def clear_reservations(reservation_ids):
+    """Drop the occupancy of reservations that no longer hold tables."""
+    TableSlotOccupancy.objects.filter(reservation_id__in=list(reservation_ids)).delete()
+
+
+def clear_tables(table_ids):
+    """Drop the occupancy held on the given tables."""
+    TableSlotOccupancy.objects.filter(table_id__in=list(table_ids)).delete()
+
+
+def rebuild(batch_size=5000):
+    """Recreate the whole occupancy table from the reservations. Returns the row count."""
+    TableSlotOccupancy.objects.all().delete()
+    total = 0
+    batch = []
+    for row in _rows(_active_links().iterator(chunk_size=batch_size)):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            TableSlotOccupancy.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    TableSlotOccupancy.objects.bulk_create(batch)
+    return total + len(batch)
@@ -0,0 +1,217 @@
+"""
+Lazy expansion of reservation series.
+
+A ``ReservationSeries`` stores its rule, never its occurrences. Readers ask
+for the occurrences that overlap a window and they are computed from the
+rule on the spot, with one query per lookup however long the series runs:
+
+* ``held`` - (start, end, table, series) of active occurrences, for availability
+* ``stats_rows`` - per-occurrence rows in the shape of ``stats.hourly_rows``
+* ``occurrences`` - serialized occurrences for the API
+
+Occurrences keep the local wall-clock time of the first one across DST
+changes; ``exceptions`` (local ISO dates) are skipped. Only the series of the
+current venue are read. Each occurrence lasts
+the configured duration for the series' party size (``reservations.config``).
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from venues.routing import current_id
+from . import config
+from .models import Reservation, ReservationSeries
+
+RULE_FIELDS = ('start_datetime', 'frequency', 'interval', 'until', 'count', 'exceptions')
+
+SeriesTable = ReservationSeries.tables.through
+
+
+def _add_months(moment, months):
+    # Monthly series start on day 1-28 (see ReservationSeriesSerializer), so every month has the day
+    month = moment.month - 1 + months
+    return moment.replace(year=moment.year + month // 12, month=month % 12 + 1)
+
+
+class Rule:
+    """The recurrence rule of one series, in local time."""
+
+    def __init__(self, start_datetime, frequency, interval=1, until=None, count=None, exceptions=(), duration=None):
+        self.duration = duration or config.current().default_duration
+        self.first = timezone.localtime(start_datetime).replace(tzinfo=None)
+        self.frequency = frequency
+        self.interval = interval or 1
+        self.until = until
+        self.count = count
+        self.skipped = set(exceptions or ())
+
+    @classmethod
+    def of(cls, series):
+        return cls(
+            *(getattr(series, field) for field in RULE_FIELDS),
+            duration=config.current().duration_for(series.guests),
+        )
+
+    def nth(self, index):
+        """Local (naive) start of occurrence ``index``, exceptions included."""
+        if self.frequency == ReservationSeries.FREQUENCY_WEEKLY:
+            return self.first + timedelta(weeks=self.interval * index)
+        return _add_months(self.first, self.interval * index)
+
+    def _index_at(self, moment):
+        """Index of the last occurrence starting at or before local ``moment`` (may be -1)."""
+        if self.frequency == ReservationSeries.FREQUENCY_WEEKLY:
+            index = (moment - self.first) // timedelta(weeks=self.interval)
+        else:
+            index = ((moment.year - self.first.year) * 12 + moment.month - self.first.month) // self.interval
+        while index >= 0 and self.nth(index) > moment:
+            index -= 1
+        return max(index, -1)
+
+    def last_index(self):
+        """Index of the final occurrence; None while open-ended."""
+        bounds = []
+        if self.count is not None:
+            bounds.append(self.count - 1)
+        if self.until is not None:
+            bounds.append(self._index_at(datetime.combine(self.until, time.max)))
+        return min(bounds) if bounds else None
+
+    def starts(self, window_start, window_end):
+        """Aware start times of the occurrences overlapping [window_start, window_end)."""
+        tz = timezone.get_current_timezone()
+        # An hour of slack for DST: starting early only costs a skipped iteration
+        earliest = timezone.localtime(window_start - self.duration, tz).replace(tzinfo=None) - timedelta(hours=1)
+        index = max(self._index_at(earliest), 0)
+        last = self.last_index()
+        starts = []
+        while last is None or index <= last:
+            local = self.nth(index)
+            start = timezone.make_aware(local, tz)
+            if start >= window_end:
+                break
+            if start + self.duration > window_start and local.date().isoformat() not in self.skipped:
+                starts.append(start)
+            index += 1
+        return starts
+
+
+def last_start(series):
+    """Start of the final occurrence of ``series``, None while it is open-ended."""
+    rule = Rule.of(series)
+    index = rule.last_index()
+    if index is None or index < 0:
+        return None if index is None else series.start_datetime
+    return timezone.make_aware(rule.nth(index))
+
+
+def window_filter(window_start, window_end, prefix=''):
+    """Series with an occurrence that may overlap [window_start, window_end)."""
+    return Q(**{f'{prefix}start_datetime__lt': window_end}) & (
+        Q(**{f'{prefix}last_start__isnull': True})
+        | Q(**{f'{prefix}last_start__gt': window_start - config.current().max_duration})
+    )
+
+
+def _held_query(window_start, window_end):
+    return SeriesTable.objects.filter(
+        window_filter(window_start, window_end, 'reservationseries__'),
+        reservationseries__venue_id=current_id(),
+        reservationseries__status__in=Reservation.ACTIVE_STATUSES,
+    ).values_list(
+        'reservationseries_id', 'table_id', 'reservationseries__guests',
+        *(f'reservationseries__{field}' for field in RULE_FIELDS),
+    )
+
+
+def _expand_held(rows, window_start, window_end):
+    conf = config.current()
+    occurrences = {}
+    held = []
+    for series_id, table_id, guests, *rule in rows:
+        if series_id not in occurrences:
+            duration = conf.duration_for(guests)
+            occurrences[series_id] = [
+                (start, start + duration)
+                for start in Rule(*rule, duration=duration).starts(window_start, window_end)
+            ]
+        held.extend((start, end, table_id, series_id) for start, end in occurrences[series_id])
+    return held
+
+
+def held(window_start, window_end):
+    """(start, end, table id, series id) of every active occurrence overlapping the window, in one query."""
+    return _expand_held(_held_query(window_start, window_end), window_start, window_end)
+
+
+async def aheld(window_start, window_end):
+    """``held`` for async views."""
+    await config.acurrent()
+    return _expand_held([row async for row in _held_query(window_start, window_end)], window_start, window_end)
+
+
+def _stats_query(window_start, window_end):
+    return ReservationSeries.objects.in_venue().filter(window_filter(window_start, window_end)).values_list(
+        'guests', 'status', *RULE_FIELDS
+    )
+
+
+def _expand_stats(rows, window_start, window_end):
+    conf = config.current()
+    stats = []
+    for guests, status, *rule in rows:
+        active = status in Reservation.ACTIVE_STATUSES
+        for start in Rule(*rule, duration=conf.duration_for(guests)).starts(window_start, window_end):
+            if start < window_start:
+                # Counted on the day it starts, like a reservation
+                continue
+            stats.append({
+                'hour': timezone.localtime(start).replace(minute=0, second=0, microsecond=0),
+                'reservations': int(active),
+                'guests': guests if active else 0,
+                'pending': int(status == Reservation.STATUS_PENDING),
+                'confirmed': int(status == Reservation.STATUS_CONFIRMED),
+                'cancelled': int(status == Reservation.STATUS_CANCELLED),
+            })
+    return stats
+
+
+def stats_rows(window_start, window_end):
+    """One ``hourly_rows``-shaped row per occurrence starting in the window, in one query."""
+    return _expand_stats(_stats_query(window_start, window_end), window_start, window_end)
+
+
+async def astats_rows(window_start, window_end):
+    """``stats_rows`` for async views."""
+    await config.acurrent()
+    return _expand_stats([row async for row in _stats_query(window_start, window_end)], window_start, window_end)
+
+
+def occurrences(window_start, window_end):
+    """Occurrences starting in [window_start, window_end), sorted by start; two queries."""
+    series = list(ReservationSeries.objects.in_venue().filter(window_filter(window_start, window_end)))
+    tables = {}
+    for series_id, table_id in SeriesTable.objects.filter(
+        reservationseries_id__in=[item.pk for item in series]
+    ).order_by('table_id').values_list('reservationseries_id', 'table_id'):
+        tables.setdefault(series_id, []).append(table_id)
+
+    found = []
+    for item in series:
+        rule = Rule.of(item)
+        for start in rule.starts(window_start, window_end):
+            if start >= window_start:
+                found.append({
+                    'series': item.pk,
+                    'start_datetime': start,
+                    'end_datetime': start + rule.duration,
+                    'customer_name': item.customer_name,
+                    'customer_phone': item.customer_phone,
+                    'guests': item.guests,
+                    'notes': item.notes,
+                    'status': item.status,
+                    'tables_ids': tables.get(item.pk, []),
+                })
+    found.sort(key=lambda occurrence: (occurrence['start_datetime'], occurrence['series']))
+    return found
@@ -1,19 +1,281 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Reservation
+from tables.models import Table
+from tables.serializers import TableSerializer
+from . import config
+from .models import (
+    ArchivedReservation, DurationRule, Reservation, ReservationSeries, RestaurantConfig, ServicePeriod, WaitlistEntry,
+)
+
+
+class ActiveTableField(serializers.PrimaryKeyRelatedField):
+    """An active table of the current venue."""
+
+    def get_queryset(self):
+        return Table.objects.in_venue().filter(is_active=True)
+
 
 class ReservationSerializer(serializers.ModelSerializer):
-    tables_ids = serializers.PrimaryKeyRelatedField(
+    tables = TableSerializer(many=True, read_only=True)
+    tables_ids = ActiveTableField(
         many=True, 
         write_only=True,
         source='tables',
         required=False,
-        read_only=False,
-        queryset=Reservation.tables.rel.model.objects.filter(is_active=True)
     )
     
     class Meta:
         model = Reservation
-        fields = ['id', 'customer_name', 'customer_phone', 'start_datetime', 
+        fields = ['id', 'customer_name', 'customer_phone', 'start_datetime', 'end_datetime',
                  'tables', 'tables_ids', 'guests', 'notes', 'status']
         read_only_fields = ['id', 'status']
-        depth = 1  # Include all table details
+        extra_kwargs = {'end_datetime': {'required': False}}
+
+    def validate(self, attrs):
+        tables = attrs.get('tables')
+        guests = attrs.get('guests', getattr(self.instance, 'guests', None))
+        if tables and guests and sum(table.seats for table in tables) < guests:
+            raise serializers.ValidationError({"tables_ids": "Selected tables do not seat all guests."})
+        start = attrs.get('start_datetime', getattr(self.instance, 'start_datetime', None))
+        if 'end_datetime' not in attrs and ('start_datetime' in attrs or 'guests' in attrs):
+            # Moving or resizing a reservation gives it the configured length again
+            attrs['end_datetime'] = start + config.current().duration_for(guests)
+        end = attrs.get('end_datetime', getattr(self.instance, 'end_datetime', None))
+        if start is not None and end is not None and end <= start:
+            raise serializers.ValidationError({"end_datetime": "Must be after the start."})
+        return attrs
+
+
+class ReservationSeriesSerializer(serializers.ModelSerializer):
+    tables = TableSerializer(many=True, read_only=True)
+    tables_ids = ActiveTableField(
+        many=True,
+        write_only=True,
+        source='tables',
+        required=False,
+    )
+    # Local dates of skipped occurrences
+    exceptions = serializers.ListField(child=serializers.DateField(), required=False)
+
+    class Meta:
+        model = ReservationSeries
+        fields = ['id', 'customer_name', 'customer_phone', 'start_datetime', 'frequency', 'interval',
+                  'until', 'count', 'exceptions', 'last_start', 'tables', 'tables_ids', 'guests', 'notes', 'status']
+        read_only_fields = ['id', 'last_start']
+
+    def validate(self, attrs):
+        def value(field):
+            return attrs.get(field, getattr(self.instance, field, None))
+
+        tables = attrs.get('tables')
+        guests = value('guests')
+        if tables and guests and sum(table.seats for table in tables) < guests:
+            raise serializers.ValidationError({"tables_ids": "Selected tables do not seat all guests."})
+        if value('interval') == 0:
+            raise serializers.ValidationError({"interval": "Must be at least 1."})
+        if value('count') == 0:
+            raise serializers.ValidationError({"count": "Must be at least 1."})
+
+        start = value('start_datetime')
+        if start is not None:
+            local_start = timezone.localtime(start)
+            if value('frequency') == ReservationSeries.FREQUENCY_MONTHLY and local_start.day > 28:
+                raise serializers.ValidationError({"start_datetime": "Monthly series must start on day 1-28."})
+            if value('until') is not None and value('until') < local_start.date():
+                raise serializers.ValidationError({"until": "Must not be before the first occurrence."})
+        if 'exceptions' in attrs:
+            attrs['exceptions'] = sorted({day.isoformat() for day in attrs['exceptions']})
+        return attrs
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'customer_name', 'customer_phone', 'start_datetime', 'guests', 'notes', 'status',
+                  'reservation', 'created_at']
+        read_only_fields = ['id', 'status', 'reservation', 'created_at']
+        extra_kwargs = {'guests': {'min_value': 1}}
+
+    def validate_start_datetime(self, value):
+        if value <= timezone.now():
+            raise serializers.ValidationError("Must be in the future.")
+        return value
+
+
+class ArchivedReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedReservation
+        fields = ['id', 'customer_name', 'customer_phone', 'start_datetime', 'end_datetime', 'guests', 'notes',
+                  'status', 'tables_ids', 'archived_at']
+        read_only_fields = fields
+
+
+class ServicePeriodSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ServicePeriod
+        fields = ['name', 'weekday', 'opens', 'closes']
+
+    def validate(self, attrs):
+        if attrs['opens'] == attrs['closes']:
+            raise serializers.ValidationError({"closes": "Must differ from the opening time."})
+        return attrs
+
+
+class DurationRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DurationRule
+        fields = ['min_guests', 'duration_minutes']
+        extra_kwargs = {
+            'min_guests': {'min_value': 1},
+            'duration_minutes': {'min_value': 15, 'max_value': 24 * 60},
+        }
+
+
+class RestaurantConfigSerializer(serializers.ModelSerializer):
+    """The whole configuration; ``periods`` and ``duration_rules`` replace the stored ones when given."""
+
+    periods = ServicePeriodSerializer(many=True, required=False)
+    duration_rules = DurationRuleSerializer(many=True, required=False)
+
+    class Meta:
+        model = RestaurantConfig
+        fields = ['slot_minutes', 'default_duration_minutes', 'periods', 'duration_rules']
+        extra_kwargs = {
+            # The grid step limits of tables.views.grid_request
+            'slot_minutes': {'min_value': 5, 'max_value': 120},
+            'default_duration_minutes': {'min_value': 15, 'max_value': 24 * 60},
+        }
+
+    def validate_duration_rules(self, value):
+        sizes = [rule['min_guests'] for rule in value]
+        if len(sizes) != len(set(sizes)):
+            raise serializers.ValidationError("Party sizes must be unique.")
+        return value
+
+    def save(self, **kwargs):
+        with transaction.atomic():
+            return super().save(**kwargs)
+
+    def create(self, validated_data):
+        return self.update(RestaurantConfig(), validated_data)
+
+    def update(self, instance, validated_data):
+        periods = validated_data.pop('periods', None)
+        rules = validated_data.pop('duration_rules', None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save()
+        # Saved one by one so every change reaches reservations.signals
+        if periods is not None:
+            instance.periods.all().delete()
+            for period in periods:
+                ServicePeriod.objects.create(config=instance, **period)
+        if rules is not None:
+            instance.duration_rules.all().delete()
+            for rule in rules:
+                DurationRule.objects.create(config=instance, **rule)
+        return instance
+
+
+def config_payload(conf):
+    """A ``config.Snapshot`` in the shape of ``RestaurantConfigSerializer``, without a query."""
+    to_time = serializers.TimeField().to_representation
+    return {
+        'slot_minutes': conf.slot_minutes,
+        'default_duration_minutes': int(conf.default_duration.total_seconds()) // 60,
+        'periods': [
+            {'name': name, 'weekday': weekday, 'opens': to_time(opens), 'closes': to_time(closes)}
+            for name, weekday, opens, closes in conf.periods
+        ],
+        'duration_rules': [
+            {'min_guests': min_guests, 'duration_minutes': int(duration.total_seconds()) // 60}
+            for min_guests, duration in reversed(conf.rules)
+        ],
+    }
+
+
+# Lean read path for list responses. ReservationSerializer introspects its
+# fields for every row and, through its nested tables, issues one query per
+# reservation for them; the functions below read plain rows with .values() and fetch the
+# tables of a whole batch with a single query, producing the same payload.
+
+RESERVATION_FIELDS = (
+    'id', 'customer_name', 'customer_phone', 'start_datetime', 'end_datetime', 'guests', 'notes', 'status'
+)
+TABLE_FIELDS = ('id', 'number', 'seats', 'is_active', 'group')
+
+_datetime_field = serializers.DateTimeField()
+
+
+def _table_links(reservation_ids):
+    return (
+        Reservation.tables.through.objects
+        .filter(reservation_id__in=reservation_ids)
+        .order_by('id')
+        .values_list(
+            'reservation_id', 'table_id', 'table__number', 'table__seats', 'table__is_active', 'table__group'
+        )
+    )
+
+
+def _build(rows, links):
+    tables = defaultdict(list)
+    for reservation_id, *table in links:
+        tables[reservation_id].append(dict(zip(TABLE_FIELDS, table)))
+    to_datetime = _datetime_field.to_representation
+    return [
+        {
+            'id': row['id'],
+            'customer_name': row['customer_name'],
+            'customer_phone': row['customer_phone'],
+            'start_datetime': to_datetime(row['start_datetime']),
+            'end_datetime': to_datetime(row['end_datetime']),
+            'tables': tables.get(row['id'], []),
+            'guests': row['guests'],
+            'notes': row['notes'],
+            'status': row['status'],
+        }
+        for row in rows
+    ]
+
+
+def serialize_occurrences(occurrences):
+    """Series occurrences from ``recurrence.occurrences`` with their times formatted like a reservation's."""
+    to_datetime = _datetime_field.to_representation
+    return [
+        {
+            **occurrence,
+            'start_datetime': to_datetime(occurrence['start_datetime']),
+            'end_datetime': to_datetime(occurrence['end_datetime']),
+        }
+        for occurrence in occurrences
+    ]
+
+
+def serialize_rows(rows):
+    """Serialize ``.values(*RESERVATION_FIELDS)`` rows with one query for their tables."""
+    if not rows:
+        return []
+    return _build(rows, _table_links([row['id'] for row in rows]))
+
+
+async def aserialize_rows(rows):
+    """``serialize_rows`` for async views."""
+    if not rows:
+        return []
+    links = [link async for link in _table_links([row['id'] for row in rows])]
+    return _build(rows, links)
+
+
+def iter_serialized(queryset, chunk_size=1000):
+    """Yield serialized reservations, reading the queryset in chunks of ``chunk_size``."""
+    chunk = []
+    for row in queryset.values(*RESERVATION_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield from serialize_rows(chunk)
+            chunk = []
+    yield from serialize_rows(chunk)
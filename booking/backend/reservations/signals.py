@@ -0,0 +1,91 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api import caching, events
+from . import config, occupancy, waitlist
+from .models import DurationRule, Reservation, ReservationSeries, RestaurantConfig, ServicePeriod
+
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, created, **kwargs):
+    # A new reservation has no tables yet; they arrive through m2m_changed
+    if created:
+        caching.invalidate_reservations([instance.start_datetime], availability=False, venue_id=instance.venue_id)
+        events.reservation_changed(
+            instance.pk, events.RESERVATION_CREATED, [instance.start_datetime], venue_id=instance.venue_id
+        )
+        return
+    if instance.status in Reservation.ACTIVE_STATUSES:
+        occupancy.sync_reservations([instance.pk])
+    else:
+        occupancy.clear_reservations([instance.pk])
+    starts = [instance.start_datetime, getattr(instance, "_loaded_start", None)]
+    caching.invalidate_reservations(starts, venue_id=instance.venue_id)
+    cancelled = (
+        instance.status == Reservation.STATUS_CANCELLED
+        and getattr(instance, "_loaded_status", None) != Reservation.STATUS_CANCELLED
+    )
+    events.reservation_changed(
+        instance.pk, events.RESERVATION_CANCELLED if cancelled else events.RESERVATION_UPDATED, starts,
+        venue_id=instance.venue_id,
+    )
+    if cancelled and getattr(instance, "_loaded_status", None) in Reservation.ACTIVE_STATUSES:
+        waitlist.freed(instance.venue_id, instance.start_datetime, instance.end_datetime)
+    instance._loaded_start = instance.start_datetime
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_deleted(sender, instance, **kwargs):
+    # Occupancy rows go away with the FK cascade
+    caching.invalidate_reservations([instance.start_datetime], venue_id=instance.venue_id)
+    events.reservation_changed(
+        instance.pk, events.RESERVATION_DELETED, [instance.start_datetime], venue_id=instance.venue_id
+    )
+    if instance.status in Reservation.ACTIVE_STATUSES:
+        waitlist.freed(instance.venue_id, instance.start_datetime, instance.end_datetime)
+
+
+@receiver(m2m_changed, sender=Reservation.tables.through)
+def reservation_tables_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        occupancy.sync_reservations([instance.pk])
+        caching.invalidate_reservations([instance.start_datetime], stats=False, venue_id=instance.venue_id)
+        events.reservation_changed(instance.pk, events.RESERVATION_UPDATED, venue_id=instance.venue_id)
+    elif action == "post_clear":
+        # table.reservations.clear(): the affected reservations are unknown here
+        occupancy.clear_tables([instance.pk])
+        caching.invalidate_tables(instance.venue_id)
+        events.table_changed(instance.pk, events.TABLE_UPDATED, venue_id=instance.venue_id)
+    else:
+        # Tables only hold reservations of their own venue
+        occupancy.sync_reservations(pk_set)
+        starts = Reservation.objects.filter(pk__in=pk_set).values_list("start_datetime", flat=True)
+        caching.invalidate_reservations(starts, stats=False, venue_id=instance.venue_id)
+        for pk in pk_set:
+            events.reservation_changed(pk, events.RESERVATION_UPDATED, venue_id=instance.venue_id)
+
+
+@receiver(post_save, sender=ReservationSeries)
+@receiver(post_delete, sender=ReservationSeries)
+@receiver(m2m_changed, sender=ReservationSeries.tables.through)
+def series_changed(sender, instance, action="post_save", **kwargs):
+    if action.startswith("pre_"):
+        return
+    # Occurrences are expanded on read; only the cached payloads need expiring
+    caching.invalidate_series(instance.venue_id)
+
+
+@receiver(post_save, sender=RestaurantConfig)
+@receiver(post_delete, sender=RestaurantConfig)
+@receiver(post_save, sender=ServicePeriod)
+@receiver(post_delete, sender=ServicePeriod)
+@receiver(post_save, sender=DurationRule)
+@receiver(post_delete, sender=DurationRule)
+def config_changed(sender, instance, **kwargs):
+    # Stored reservations keep their end; grid slots and series lengths change
+    venue_id = instance.venue_id if sender is RestaurantConfig else instance.config.venue_id
+    config.invalidate(venue_id)
+    caching.invalidate_tables(venue_id)
@@ -0,0 +1,103 @@
+"""Dashboard statistics computed from a single grouped aggregation."""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from . import recurrence
+from .models import Reservation
+
+ACTIVE = Q(status__in=Reservation.ACTIVE_STATUSES)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def hourly_rows(start_date, end_date):
+    """
+    Per-hour counters for reservations starting between two dates (inclusive).
+
+    One query: ``start_datetime`` is truncated to the hour and every status is
+    counted with a conditional aggregate.
+    """
+    return (
+        Reservation.objects.in_venue().filter(
+            start_datetime__gte=_day_start(start_date),
+            start_datetime__lt=_day_start(end_date + timedelta(days=1)),
+        )
+        .annotate(hour=TruncHour('start_datetime'))
+        .values('hour')
+        .annotate(
+            reservations=Count('id', filter=ACTIVE),
+            guests=Sum('guests', filter=ACTIVE, default=0),
+            pending=Count('id', filter=Q(status=Reservation.STATUS_PENDING)),
+            confirmed=Count('id', filter=Q(status=Reservation.STATUS_CONFIRMED)),
+            cancelled=Count('id', filter=Q(status=Reservation.STATUS_CANCELLED)),
+        )
+        .order_by('hour')
+    )
+
+
+def build_stats(start_date, end_date, opening_hours):
+    """
+    Dashboard payload for a date range.
+
+    Totals cover every reservation and series occurrence in the range;
+    ``hourly_data`` folds the range onto the hours of the day between
+    ``opening_hours`` (open, close).
+    """
+    rows = list(hourly_rows(start_date, end_date))
+    rows += recurrence.stats_rows(_day_start(start_date), _day_start(end_date + timedelta(days=1)))
+    return summarize(rows, start_date, end_date, opening_hours)
+
+
+async def abuild_stats(start_date, end_date, opening_hours):
+    """``build_stats`` for async views."""
+    rows = [row async for row in hourly_rows(start_date, end_date)]
+    rows += await recurrence.astats_rows(_day_start(start_date), _day_start(end_date + timedelta(days=1)))
+    return summarize(rows, start_date, end_date, opening_hours)
+
+
+def summarize(rows, start_date, end_date, opening_hours):
+    """Fold ``hourly_rows`` into the dashboard payload (no queries)."""
+    open_hour, close_hour = opening_hours
+    hourly = {hour: {'reservations': 0, 'guests': 0} for hour in range(open_hour, close_hour)}
+    daily = {}
+    totals = {'reservations': 0, 'guests': 0, 'pending': 0, 'confirmed': 0, 'cancelled': 0}
+
+    for row in rows:
+        local_hour = timezone.localtime(row['hour'])
+        for key in totals:
+            totals[key] += row[key]
+
+        day = daily.setdefault(local_hour.date(), {'reservations': 0, 'guests': 0})
+        day['reservations'] += row['reservations']
+        day['guests'] += row['guests']
+
+        bucket = hourly.get(local_hour.hour)
+        if bucket is not None:
+            bucket['reservations'] += row['reservations']
+            bucket['guests'] += row['guests']
+
+    payload = {
+        'date': start_date.strftime('%Y-%m-%d'),
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'opening_hours': {'open': open_hour, 'close': close_hour},
+        'total_reservations': totals['reservations'],
+        'total_guests': totals['guests'],
+        'pending_reservations': totals['pending'],
+        'confirmed_reservations': totals['confirmed'],
+        'cancelled_reservations': totals['cancelled'],
+        'hourly_data': [
+            {'hour': f"{hour}:00", **counts} for hour, counts in hourly.items()
+        ],
+    }
+    if end_date > start_date:
+        payload['daily_data'] = [
+            {'date': day.strftime('%Y-%m-%d'), **daily.get(day, {'reservations': 0, 'guests': 0})}
+            for day in (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1))
+        ]
+    return payload
@@ -1,3 +1,1217 @@
-from django.test import TestCase
+import contextlib
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, LiveServerTestCase, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import caching, events, metrics, replicas
+from api.async_views import Fallback, read_async
+from api.middleware import PerformanceMiddleware
+from tables import async_views as table_async_views
+from tables import availability
+from tables.availability import _grid_links
+from tables.models import Table
+from users import async_views as user_async_views
+from users.authentication import ClaimsUser
+from users.tokens import add_claims
+from venues import routing
+from venues.routing import current_id
+from . import analytics, async_views as reservation_async_views, config, views, waitlist
+from .listing import filter_reservations
+from .models import ArchivedReservation, Reservation, ReservationSeries, RestaurantConfig, TableSlotOccupancy, WaitlistEntry
+from .serializers import ReservationSerializer
+from .stats import hourly_rows
+
+
+def at(hour, minute=0, day=17):
+    return datetime(2030, 5, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+class StaffClientMixin:
+    def setUp(self):
+        cache.clear()
+        self.staff = get_user_model().objects.create(username="staff", is_staff=True)
+        self.staff.venues.add(current_id())
+        self.client = APIClient()
+        # As the JWT authentication does: the user (and its venues) from the token's claims
+        self.client.force_authenticate(ClaimsUser(add_claims(AccessToken.for_user(self.staff), self.staff)))
+        self.tables = [Table.objects.create(number=n, seats=4) for n in range(1, 4)]
+
+    def reserve(self, start, *tables, status=Reservation.STATUS_PENDING, guests=2):
+        reservation = Reservation.objects.create(
+            customer_name="Ana", customer_phone="912345678",
+            start_datetime=start, guests=guests, status=status,
+        )
+        reservation.tables.set(tables)
+        return reservation
+
+
+class OccupancyTests(StaffClientMixin, TestCase):
+    def occupied(self):
+        return sorted(TableSlotOccupancy.objects.values_list("table__number", "slot"))
+
+    def test_create_through_api_fills_the_buckets(self):
+        response = self.client.post("/api/v1/reservations/", {
+            "customer_name": "Ana", "customer_phone": "912345678",
+            "start_datetime": "2030-05-17T20:00:00Z", "guests": 6,
+            "tables_ids": [self.tables[0].id, self.tables[1].id],
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+
+        rows = self.occupied()
+        self.assertEqual(len(rows), 16)
+        self.assertEqual(rows[0], (1, at(20)))
+        self.assertEqual(rows[7], (1, at(21, 45)))
+
+    def test_unaligned_start_is_rounded_outwards(self):
+        self.reserve(at(20, 10), self.tables[0])
+        slots = [slot for _number, slot in self.occupied()]
+        self.assertEqual(slots[0], at(20))
+        self.assertEqual(slots[-1], at(22))
+
+    def test_cancel_and_delete_release_the_tables(self):
+        reservation = self.reserve(at(20), self.tables[0])
+        other = self.reserve(at(12), self.tables[1])
+
+        response = self.client.patch(
+            f"/api/v1/reservations/{reservation.pk}/", {"status": "CANCELLED"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({n for n, _slot in self.occupied()}, {2})
+
+        self.client.delete(f"/api/v1/reservations/{other.pk}/")
+        self.assertEqual(self.occupied(), [])
+
+    def test_retabling_moves_the_buckets(self):
+        reservation = self.reserve(at(20), self.tables[0])
+        reservation.tables.set([self.tables[2]])
+        self.assertEqual({n for n, _slot in self.occupied()}, {3})
+
+        self.tables[2].reservations.remove(reservation)
+        self.assertEqual(self.occupied(), [])
+
+    def test_rebuild_command(self):
+        self.reserve(at(20), self.tables[0])
+        self.reserve(at(20), self.tables[1], status=Reservation.STATUS_CANCELLED)
+        expected = self.occupied()
+        TableSlotOccupancy.objects.all().delete()
+
+        call_command("rebuild_occupancy", stdout=StringIO())
+        self.assertEqual(self.occupied(), expected)
+
+
+class StatsTests(StaffClientMixin, TestCase):
+    def test_day_stats_in_constant_queries(self):
+        self.reserve(at(12), self.tables[0], guests=2)
+        self.reserve(at(12, 30), self.tables[1], guests=3, status=Reservation.STATUS_CONFIRMED)
+        self.reserve(at(13), self.tables[2], guests=4, status=Reservation.STATUS_CANCELLED)
+        self.reserve(at(9), self.tables[0], guests=5)
+        self.reserve(at(12, day=18), self.tables[0], guests=6)
+
+        # Reservations and series
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/reservations/stats/", {"date": "2030-05-17"})
+        data = response.json()
+
+        self.assertEqual(data["date"], "2030-05-17")
+        self.assertEqual(data["total_reservations"], 3)
+        self.assertEqual(data["total_guests"], 10)
+        self.assertEqual(data["pending_reservations"], 2)
+        self.assertEqual(data["confirmed_reservations"], 1)
+        self.assertEqual(data["cancelled_reservations"], 1)
+        self.assertEqual(len(data["hourly_data"]), 14)
+        self.assertEqual(data["hourly_data"][2], {"hour": "12:00", "reservations": 2, "guests": 5})
+        self.assertEqual(data["hourly_data"][3], {"hour": "13:00", "reservations": 0, "guests": 0})
+
+    def test_range_and_opening_hours(self):
+        for day in range(10, 20):
+            self.reserve(at(9, day=day), self.tables[0])
+            self.reserve(at(20, day=day), self.tables[1])
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/reservations/stats/", {
+                "start_date": "2030-05-11", "end_date": "2030-05-15", "open": 8, "close": 22,
+            })
+        data = response.json()
+
+        self.assertEqual(data["total_reservations"], 10)
+        self.assertEqual(len(data["hourly_data"]), 14)
+        self.assertEqual(data["hourly_data"][1]["reservations"], 5)
+        self.assertEqual(len(data["daily_data"]), 5)
+        self.assertEqual(data["daily_data"][0], {"date": "2030-05-11", "reservations": 2, "guests": 4})
+
+    def test_invalid_parameters(self):
+        for params in ({"date": "tomorrow"}, {"open": 20, "close": 10},
+                       {"start_date": "2030-05-17", "end_date": "2030-05-01"}):
+            response = self.client.get("/api/v1/reservations/stats/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class ResponseCacheTests(StaffClientMixin, TestCase):
+    def stats(self):
+        return self.client.get("/api/v1/reservations/stats/", {"date": "2030-05-17"}).json()
+
+    def available(self):
+        response = self.client.get("/api/v1/tables/", {"datetime": "2030-05-17T20:00:00Z"})
+        return [t["number"] for t in response.json()]
+
+    def test_stats_are_cached_until_a_reservation_changes(self):
+        caching.reset_counters()
+        reservation = self.reserve(at(12), self.tables[0])
+        self.assertEqual(self.stats()["total_reservations"], 1)
+        with self.assertNumQueries(0):
+            self.stats()
+
+        # Another day does not expire the entry
+        self.reserve(at(12, day=20), self.tables[0])
+        with self.assertNumQueries(0):
+            self.stats()
+
+        reservation.status = Reservation.STATUS_CANCELLED
+        reservation.save()
+        self.assertEqual(self.stats()["total_reservations"], 0)
+
+        # Moving a reservation expires both the old and the new day
+        reservation.status = Reservation.STATUS_PENDING
+        reservation.start_datetime = at(12, day=18)
+        reservation.save()
+        self.assertEqual(self.stats()["total_reservations"], 0)
+
+        self.assertEqual(caching.counters()["stats"], {"hits": 2, "misses": 3})
+
+    def test_availability_follows_tables_and_reservations(self):
+        self.assertEqual(self.available(), [1, 2, 3])
+        with self.assertNumQueries(0):
+            self.available()
+
+        reservation = self.reserve(at(21), self.tables[0])
+        self.assertEqual(self.available(), [2, 3])
+
+        self.tables[1].is_active = False
+        self.tables[1].save()
+        self.assertEqual(self.available(), [3])
+
+        reservation.tables.set([self.tables[2]])
+        self.assertEqual(self.available(), [1])
+
+        reservation.delete()
+        self.assertEqual(self.available(), [1, 3])
+
+    def test_counters_endpoint_is_staff_only(self):
+        self.stats()
+        response = self.client.get("/api/v1/staff/cache/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("stats", response.json()["namespaces"])
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/api/v1/staff/cache/").status_code, 401)
+
+
+class ReservationListTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Two reservations per start time so the id tie-breaker matters
+        for hour in range(12, 22):
+            self.reserve(at(hour), self.tables[0])
+            self.reserve(at(hour), self.tables[1], status=Reservation.STATUS_CONFIRMED)
+
+    def test_keyset_pages_cover_everything_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get("/api/v1/reservations/", params).json()
+            seen.extend(row["id"] for row in data["results"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        expected = list(Reservation.objects.order_by("start_datetime", "id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        params = {
+            "start": "2030-05-17T14:00:00Z", "end": "2030-05-17T18:00:00Z",
+            "status": "confirmed", "table": str(self.tables[1].id),
+        }
+        data = self.client.get("/api/v1/reservations/", params).json()
+        self.assertEqual([row["start_datetime"] for row in data], [
+            "2030-05-17T14:00:00Z", "2030-05-17T15:00:00Z",
+            "2030-05-17T16:00:00Z", "2030-05-17T17:00:00Z",
+        ])
+
+        for bad in ({"status": "LOST"}, {"start": "soon"}, {"cursor": "nope"}, {"limit": 0}):
+            self.assertEqual(self.client.get("/api/v1/reservations/", bad).status_code, 400, bad)
+
+    @mock.patch("reservations.listing.MAX_LIST_SIZE", 7)
+    def test_plain_list_is_capped(self):
+        response = self.client.get("/api/v1/reservations/")
+        first = [row["id"] for row in response.json()]
+        self.assertEqual(len(first), 7)
+
+        rest = self.client.get("/api/v1/reservations/", {"cursor": response["X-Next-Cursor"], "limit": 500}).json()
+        self.assertIsNone(rest["next_cursor"])
+        self.assertEqual(len(first) + len(rest["results"]), Reservation.objects.count())
+
+        small = self.client.get("/api/v1/reservations/", {"start": "2030-05-17T20:00:00Z"})
+        self.assertEqual(len(small.json()), 4)
+        self.assertNotIn("X-Next-Cursor", small)
+
+    def test_ndjson_stream(self):
+        response = self.client.get("/api/v1/reservations/", {"format": "ndjson", "start": "2030-05-17T20:00:00Z"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[0])["tables"][0]["number"], 1)
+
+    def test_lean_serializer_matches_model_serializer(self):
+        with self.assertNumQueries(2):
+            data = self.client.get("/api/v1/reservations/").json()
+        expected = ReservationSerializer(
+            Reservation.objects.order_by("start_datetime", "id"), many=True
+        ).data
+        self.assertEqual(data, json.loads(json.dumps(expected)))
+
+        with self.assertNumQueries(2):
+            self.client.get("/api/v1/reservations/", {"limit": 5})
+
+    def test_list_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/api/v1/reservations/").status_code, 401)
+
+
+class BookingTests(StaffClientMixin, TestCase):
+    def book(self, start, *tables):
+        return self.client.post("/api/v1/reservations/", {
+            "customer_name": "Ana", "customer_phone": "912345678",
+            "start_datetime": start, "guests": 2,
+            "tables_ids": [table.id for table in tables],
+        }, format="json")
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book("2030-05-17T20:00:00Z", self.tables[0]).status_code, 201)
+
+        response = self.book("2030-05-17T21:30:00Z", self.tables[1], self.tables[0])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["tables_ids"], [self.tables[0].id])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+        self.assertEqual(self.book("2030-05-17T22:00:00Z", self.tables[0]).status_code, 201)
+
+    def test_tables_must_seat_every_guest(self):
+        response = self.client.post("/api/v1/reservations/", {
+            "customer_name": "Ana", "customer_phone": "912345678",
+            "start_datetime": "2030-05-17T20:00:00Z", "guests": 5,
+            "tables_ids": [self.tables[0].id],
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("tables_ids", response.json())
+
+    def test_auto_assign_picks_free_tables(self):
+        self.reserve(at(20), self.tables[0])
+        payload = {
+            "customer_name": "Ana", "customer_phone": "912345678",
+            "start_datetime": "2030-05-17T20:00:00Z", "guests": 6, "auto_assign": True,
+        }
+
+        response = self.client.post("/api/v1/reservations/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([t["number"] for t in response.json()["tables"]], [2, 3])
+
+        response = self.client.post("/api/v1/reservations/", payload, format="json")
+        self.assertEqual(response.status_code, 409)
+
+    def test_update_checks_other_reservations_only(self):
+        reservation = self.reserve(at(20), self.tables[0])
+        self.reserve(at(20), self.tables[1])
+        url = f"/api/v1/reservations/{reservation.pk}/"
+        payload = {
+            "customer_name": "Ana", "customer_phone": "912345678",
+            "start_datetime": "2030-05-17T20:30:00Z", "guests": 2,
+        }
+
+        self.assertEqual(self.client.put(url, payload, format="json").status_code, 200)
+        payload["tables_ids"] = [self.tables[1].id]
+        self.assertEqual(self.client.put(url, payload, format="json").status_code, 409)
+
+    def test_reactivating_a_cancelled_reservation_checks_its_tables(self):
+        cancelled = self.reserve(at(20), self.tables[0], status=Reservation.STATUS_CANCELLED)
+        self.reserve(at(21), self.tables[0])
+        url = f"/api/v1/reservations/{cancelled.pk}/"
+
+        response = self.client.patch(url, {"status": "CONFIRMED"}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["tables_ids"], [self.tables[0].id])
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, Reservation.STATUS_CANCELLED)
+
+        cancelled.tables.set([self.tables[1]])
+        self.assertEqual(self.client.patch(url, {"status": "PENDING"}, format="json").status_code, 200)
+        self.assertTrue(TableSlotOccupancy.objects.filter(reservation=cancelled).exists())
+
+
+class BulkImportTests(StaffClientMixin, TestCase):
+    def test_json_import_reports_rows_and_fills_occupancy(self):
+        existing = self.reserve(at(20), self.tables[0])
+        rows = [
+            {"customer_name": "Rui", "customer_phone": "1", "start_datetime": "2030-05-17T12:00:00Z",
+             "guests": 2, "tables_ids": [self.tables[0].id]},
+            # Clashes with the row above
+            {"customer_name": "Rita", "customer_phone": "2", "start_datetime": "2030-05-17T13:00:00Z",
+             "guests": 2, "tables_ids": [self.tables[0].id]},
+            {"customer_name": "Rosa", "customer_phone": "3", "start_datetime": "2030-05-17T12:00:00Z",
+             "guests": 9, "tables_ids": [self.tables[1].id]},
+            {"id": existing.id, "customer_name": "Ana", "customer_phone": "912345678",
+             "start_datetime": "2030-05-17T18:00:00Z", "guests": 2, "status": "CONFIRMED"},
+        ]
+
+        report = self.client.post("/api/v1/reservations/bulk/", rows, format="json").json()
+        self.assertEqual((report["created"], report["updated"], report["failed"]), (1, 1, 2))
+        self.assertEqual([error["line"] for error in report["errors"]], [2, 3])
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.start_datetime, existing.status), (at(18), Reservation.STATUS_CONFIRMED))
+        self.assertEqual(list(existing.tables.all()), [self.tables[0]])
+        self.assertEqual(TableSlotOccupancy.objects.filter(table=self.tables[0]).count(), 16)
+
+    def test_update_frees_its_tables_only_once_accepted(self):
+        moved = self.reserve(at(20), self.tables[0])
+        stuck = self.reserve(at(20), self.tables[1])
+        self.reserve(at(20), self.tables[2])
+
+        def row(**fields):
+            return {"customer_name": "Rui", "customer_phone": "1", "start_datetime": "2030-05-17T20:00:00Z",
+                    "guests": 2, **fields}
+
+        rows = [
+            # Held by `moved` until its update below is accepted
+            row(tables_ids=[self.tables[0].id]),
+            # Clashes with the third reservation, so `stuck` keeps table 2...
+            row(id=stuck.id, tables_ids=[self.tables[2].id]),
+            # ...and table 2 stays taken
+            row(tables_ids=[self.tables[1].id]),
+            row(id=moved.id, start_datetime="2030-05-17T12:00:00Z"),
+        ]
+
+        report = self.client.post("/api/v1/reservations/bulk/", rows, format="json").json()
+        self.assertEqual((report["created"], report["updated"], report["failed"]), (1, 1, 2))
+        self.assertEqual([error["line"] for error in report["errors"]], [2, 3])
+        self.assertEqual(list(stuck.tables.all()), [self.tables[1]])
+        self.assertEqual(
+            set(TableSlotOccupancy.objects.filter(table=self.tables[0]).values_list("reservation_id", flat=True)),
+            {moved.id, Reservation.objects.latest("id").id},
+        )
+
+    def test_csv_round_trip_and_dry_run(self):
+        self.reserve(at(20), self.tables[0], self.tables[1])
+        exported = b"".join(
+            self.client.get("/api/v1/reservations/export/", {"format": "csv"}).streaming_content
+        ).decode()
+        self.assertIn(f"{self.tables[0].id};{self.tables[1].id}", exported)
+        response = self.client.get("/api/v1/reservations/export/", {"format": "csv", "start": "someday"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("detail", response.json())
+
+        # Re-importing the export as new rows clashes with the original
+        body = exported.replace(f"\n{Reservation.objects.get().id},", "\n,")
+        response = self.client.post("/api/v1/reservations/bulk/?dry_run=1", body, content_type="text/csv")
+        self.assertEqual(response.json()["failed"], 1)
+
+        # Start and end move together
+        moved = body.replace("2030-05-17T", "2030-05-18T")
+        response = self.client.post("/api/v1/reservations/bulk/?dry_run=1", moved, content_type="text/csv")
+        self.assertEqual((response.json()["created"], response.json()["failed"]), (1, 0))
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_ndjson_command(self):
+        rows = [
+            {"customer_name": "Rui", "customer_phone": "1", "start_datetime": f"2030-05-17T{hour}:00:00Z",
+             "guests": 2, "tables_ids": [self.tables[0].id]}
+            for hour in (12, 14, 16)
+        ]
+        out, err = StringIO(), StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "reservations.ndjson")
+            with open(path, "w") as f:
+                f.writelines(json.dumps(row) + "\n" for row in rows)
+                f.write("not json\n")
+            call_command("import_bulk", "reservations", path, "--chunk-size", "2", stdout=out, stderr=err)
+        self.assertIn("Created 3, updated 0, failed 1", out.getvalue())
+        self.assertIn("line 4", err.getvalue())
+
+
+class ListeningBroker(events.LocalBroker):
+    def has_subscribers(self):
+        return True
+
+
+class EventTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        # Publish the fixtures' changes before listening
+        with self.captureOnCommitCallbacks(execute=True):
+            super().setUp()
+        self.broker = ListeningBroker()
+        patcher = mock.patch.object(events, "get_broker", return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        messages = [(message["event"], message["data"]) for message in self.broker.recent()]
+        self.broker = ListeningBroker()
+        events.get_broker.return_value = self.broker
+        return messages
+
+    def test_one_delta_per_object_and_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/reservations/", {
+                "customer_name": "Ana", "customer_phone": "912345678",
+                "start_datetime": "2030-05-17T20:00:00Z", "guests": 2,
+                "tables_ids": [self.tables[0].id],
+            }, format="json")
+        pk = response.json()["id"]
+        (created, row), stats_changed = self.published()
+        self.assertEqual(created, events.RESERVATION_CREATED)
+        self.assertEqual(row, json.loads(json.dumps(response.json())))
+        self.assertEqual(stats_changed, (events.STATS_CHANGED, {"dates": ["2030-05-17"]}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/v1/reservations/{pk}/", {"status": "CANCELLED"}, format="json")
+        self.assertEqual(self.published()[0][0], events.RESERVATION_CANCELLED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/reservations/{pk}/")
+            self.client.put(f"/api/v1/tables/{self.tables[1].id}/", {"number": 2, "seats": 6}, format="json")
+        self.assertEqual(self.published(), [
+            (events.RESERVATION_DELETED, {"id": pk}),
+            (events.TABLE_UPDATED, {"id": self.tables[1].id, "number": 2, "seats": 6, "is_active": True, "group": ""}),
+            (events.STATS_CHANGED, {"dates": ["2030-05-17"]}),
+        ])
+
+    def test_nothing_is_published_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.reserve(at(20), self.tables[0])
+                transaction.set_rollback(True)
+        self.assertEqual(self.published(), [])
+
+    def test_a_rolled_back_savepoint_drops_only_its_own_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                kept = self.reserve(at(20), self.tables[0])
+                with transaction.atomic():
+                    self.reserve(at(20), self.tables[1])
+                    transaction.set_rollback(True)
+                also_kept = self.reserve(at(12, day=18), self.tables[2])
+        self.assertEqual([(event, data.get("id", data)) for event, data in self.published()], [
+            (events.RESERVATION_CREATED, kept.pk),
+            (events.RESERVATION_CREATED, also_kept.pk),
+            (events.STATS_CHANGED, {"dates": ["2030-05-17", "2030-05-18"]}),
+        ])
+
+    def test_stream_refuses_wsgi(self):
+        response = self.client.get("/api/v1/events/", {"token": str(AccessToken.for_user(self.staff))})
+        self.assertEqual(response.status_code, 501)
+        self.assertIn("ASGI", response.json()["detail"])
+
+    async def test_stream(self):
+        response = await self.async_client.get("/api/v1/events/")
+        self.assertEqual(response.status_code, 401)
+
+        token = str(AccessToken.for_user(self.staff))
+        response = await self.async_client.get("/api/v1/events/", {"token": token})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b"retry: 3000\n\n")
+
+        self.broker.publish(events.RESERVATION_DELETED, {"id": 7}, await routing.acurrent_id())
+        self.assertEqual(await anext(content), b'id: 1\nevent: reservation.deleted\ndata: {"id": 7}\n\n')
+
+
+class SeriesTests(StaffClientMixin, TestCase):
+    def create(self, expected=201, **fields):
+        payload = {
+            "customer_name": "Lda", "customer_phone": "912345678", "guests": 4,
+            "start_datetime": at(20, day=3).isoformat(), "frequency": "WEEKLY",
+            "tables_ids": [self.tables[0].pk], **fields,
+        }
+        response = self.client.post("/api/v1/reservations/series/", payload, format="json")
+        self.assertEqual(response.status_code, expected, response.content)
+        return response.json()
+
+    def occurrences(self, start="2030-05-01", end="2030-07-01"):
+        response = self.client.get("/api/v1/reservations/series/occurrences/", {"start": start, "end": end})
+        return [occurrence["start_datetime"][:10] for occurrence in response.json()]
+
+    def test_occurrences_follow_the_rule_and_skip_exceptions(self):
+        series = self.create(count=4, exceptions=["2030-05-24"])
+        self.assertEqual(series["last_start"], "2030-05-24T20:00:00Z")
+        self.assertEqual(self.occurrences(), ["2030-05-03", "2030-05-10", "2030-05-17"])
+        self.assertEqual(self.occurrences("2030-05-10", "2030-05-11"), ["2030-05-10"])
+
+        self.create(
+            start_datetime=at(12, day=15).isoformat(), frequency="MONTHLY", interval=2, until="2030-12-31",
+            tables_ids=[self.tables[1].pk],
+        )
+        self.assertEqual(self.occurrences("2030-05-11", "2031-01-01"), ["2030-05-15", "2030-05-17", "2030-07-15", "2030-09-15", "2030-11-15"])
+
+    def test_occurrences_hold_their_tables_and_count_in_stats(self):
+        self.create()
+        later = at(20, day=17) + timedelta(weeks=52)
+
+        self.assertNotIn(self.tables[0].pk, availability.available_table_ids_by_slot([later])[later])
+        response = self.client.get("/api/v1/tables/", {"datetime": later.isoformat()})
+        self.assertEqual([table["number"] for table in response.json()], [2, 3])
+        grid = self.client.get("/api/v1/tables/availability/", {"date": later.date().isoformat()}).json()
+        self.assertEqual([slot["free_tables"] for slot in grid["slots"] if slot["time"] == "20:00"], [2])
+
+        response = self.client.post("/api/v1/reservations/", {
+            "customer_name": "Ana", "customer_phone": "912345678", "guests": 2,
+            "start_datetime": later.isoformat(), "tables_ids": [self.tables[0].pk],
+        }, format="json")
+        self.assertEqual(response.status_code, 409)
+
+        stats = self.client.get("/api/v1/reservations/stats/", {"date": later.date().isoformat()}).json()
+        self.assertEqual((stats["total_reservations"], stats["total_guests"]), (1, 4))
+
+    def test_conflicting_series_are_rejected(self):
+        self.reserve(at(21, day=24), self.tables[0])
+        self.assertEqual(self.create(expected=409)["tables_ids"], [self.tables[0].pk])
+
+        self.create(exceptions=["2030-05-24"])
+        self.create(expected=409, start_datetime=at(21, day=10).isoformat(), frequency="MONTHLY")
+        self.create(start_datetime=at(21, day=10).isoformat(), tables_ids=[self.tables[1].pk])
+
+    def test_changes_expire_cached_stats(self):
+        series = self.create()
+        self.assertEqual(self.client.get("/api/v1/reservations/stats/", {"date": "2030-05-17"}).json()["total_reservations"], 1)
+        self.client.patch(f"/api/v1/reservations/series/{series['id']}/", {"exceptions": ["2030-05-17"]}, format="json")
+        self.assertEqual(self.client.get("/api/v1/reservations/stats/", {"date": "2030-05-17"}).json()["total_reservations"], 0)
+
+    def test_monthly_series_must_start_on_a_day_every_month_has(self):
+        response = self.create(expected=400, start_datetime=at(20, day=29).isoformat(), frequency="MONTHLY")
+        self.assertIn("start_datetime", response)
+
+
+class RestaurantConfigTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # The snapshot outlives the test transaction
+        self.addCleanup(config.invalidate)
+        response = self.client.put("/api/v1/reservations/config/", {
+            "slot_minutes": 30,
+            "default_duration_minutes": 90,
+            "periods": [
+                {"name": "Lunch", "opens": "12:00", "closes": "15:00"},
+                {"name": "Dinner", "opens": "19:00", "closes": "23:00"},
+            ],
+            "duration_rules": [{"min_guests": 6, "duration_minutes": 180}],
+        }, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def book(self, start, guests, tables):
+        return self.client.post("/api/v1/reservations/", {
+            "customer_name": "Ana", "customer_phone": "912345678", "guests": guests,
+            "start_datetime": start.isoformat(), "tables_ids": [table.pk for table in tables],
+        }, format="json")
+
+    def test_reservations_end_after_the_duration_for_their_party(self):
+        small = self.book(at(12), 2, self.tables[:1]).json()
+        large = self.book(at(19), 6, self.tables[1:]).json()
+        self.assertEqual(small["end_datetime"], "2030-05-17T13:30:00Z")
+        self.assertEqual(large["end_datetime"], "2030-05-17T22:00:00Z")
+
+        # The large party still holds its tables two and a half hours in
+        self.assertEqual(availability.reserved_table_ids(at(21, 30)), {self.tables[1].pk, self.tables[2].pk})
+        self.assertEqual(self.book(at(21, 30), 2, self.tables[2:]).status_code, 409)
+        self.assertEqual(self.book(at(13, 30), 2, self.tables[:1]).status_code, 201)
+
+    def test_grid_and_stats_follow_the_service_periods(self):
+        grid = self.client.get("/api/v1/tables/availability/", {"date": "2030-05-17", "guests": 2}).json()
+        self.assertEqual(grid["step"], 30)
+        self.assertEqual(
+            [slot["time"] for slot in grid["slots"]],
+            ["12:00", "12:30", "13:00", "13:30", "19:00", "19:30", "20:00", "20:30", "21:00", "21:30"],
+        )
+        grid = self.client.get("/api/v1/tables/availability/", {"date": "2030-05-17", "guests": 6}).json()
+        self.assertEqual([slot["time"] for slot in grid["slots"]], ["12:00", "19:00", "19:30", "20:00"])
+
+        stats = self.client.get("/api/v1/reservations/stats/", {"date": "2030-05-17"}).json()
+        self.assertEqual(stats["opening_hours"], {"open": 12, "close": 23})
+
+    def test_config_is_public_to_read_staff_only_to_change_and_cached(self):
+        self.client.force_authenticate(None)
+        response = self.client.get("/api/v1/reservations/config/")
+        self.assertEqual(response.json()["duration_rules"], [{"min_guests": 6, "duration_minutes": 180}])
+        self.assertEqual(self.client.put("/api/v1/reservations/config/", {}, format="json").status_code, 403)
+
+        with self.assertNumQueries(0):
+            config.current()
+        RestaurantConfig.objects.update(default_duration_minutes=60)
+        # Bulk updates skip the signals; saving a row expires the snapshot
+        self.assertEqual(config.current().default_duration, timedelta(minutes=90))
+        RestaurantConfig.objects.get().save()
+        self.assertEqual(config.current().duration_for(2), timedelta(minutes=60))
+        self.assertEqual(config.current().duration_for(8), timedelta(minutes=180))
+
+
+class AsyncReadViewTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.reserve(at(12), self.tables[0])
+        self.reserve(at(20), self.tables[1], self.tables[2], status=Reservation.STATUS_CONFIRMED)
+        series = ReservationSeries.objects.create(
+            customer_name="Lda", customer_phone="912345678", start_datetime=at(19, day=10), guests=3,
+            frequency=ReservationSeries.FREQUENCY_WEEKLY,
+        )
+        series.tables.set([self.tables[0]])
+        self.headers = {"Authorization": f"Bearer {add_claims(AccessToken.for_user(self.staff), self.staff)}"}
+
+    async def test_async_views_answer_like_the_drf_views(self):
+        pk = (await Reservation.objects.afirst()).pk
+        cases = [
+            (reservation_async_views.reservation_list, "/api/v1/reservations/", {}, {}),
+            (reservation_async_views.reservation_list, "/api/v1/reservations/", {"limit": 1, "status": "pending"}, {}),
+            (reservation_async_views.reservation_list, "/api/v1/reservations/", {"cursor": "nope"}, {}),
+            (reservation_async_views.reservation_detail, f"/api/v1/reservations/{pk}/", {}, {"pk": pk}),
+            (reservation_async_views.reservation_detail, "/api/v1/reservations/999/", {}, {"pk": 999}),
+            (reservation_async_views.reservation_stats, "/api/v1/reservations/stats/", {"date": "2030-05-17"}, {}),
+            (reservation_async_views.reservation_stats, "/api/v1/reservations/stats/", {"open": 30}, {}),
+            (table_async_views.table_list, "/api/v1/tables/", {"datetime": "2030-05-17T19:00:00Z"}, {}),
+            (table_async_views.table_availability, "/api/v1/tables/availability/", {"date": "2030-05-17"}, {}),
+            (user_async_views.auth_me, "/api/v1/auth/me/", {}, {}),
+        ]
+        for async_view, path, params, kwargs in cases:
+            with self.subTest(path=path, params=params):
+                response = await async_view(AsyncRequestFactory().get(path, params, headers=self.headers), **kwargs)
+                expected = await sync_to_async(self.client.get)(path, params)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+
+    async def test_requests_without_valid_credentials_go_to_the_drf_view(self):
+        with override_settings(ASYNC_READ_VIEWS=True):
+            view = read_async(reservation_async_views.reservation_stats)(views.reservation_stats)
+        with self.assertRaises(Fallback):
+            await reservation_async_views.reservation_stats(AsyncRequestFactory().get("/api/v1/reservations/stats/"))
+
+        for headers in ({}, {"Authorization": "Bearer nope"}):
+            response = await view(AsyncRequestFactory().get("/api/v1/reservations/stats/", headers=headers))
+            self.assertEqual(response.status_code, 401)
+        response = await view(AsyncRequestFactory().get("/api/v1/reservations/stats/", headers=self.headers))
+        self.assertEqual(response.status_code, 200)
+
+
+class ConditionalGetTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.reservation = self.reserve(at(20), self.tables[0])
+        self.headers = {"Authorization": f"Bearer {add_claims(AccessToken.for_user(self.staff), self.staff)}"}
+
+    def assertUnchanged(self, path, etag, client=None, params=None):
+        with self.assertNumQueries(0):
+            response = (client or self.client).get(path, params, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_reservation_list(self):
+        etag = self.client.get("/api/v1/reservations/")["ETag"]
+        self.assertUnchanged("/api/v1/reservations/", etag)
+        # Other filters are other representations
+        self.assertNotEqual(self.client.get("/api/v1/reservations/", {"status": "pending"})["ETag"], etag)
+
+        self.client.patch(f"/api/v1/reservations/{self.reservation.pk}/", {"status": "CONFIRMED"}, format="json")
+        response = self.client.get("/api/v1/reservations/", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # The payload embeds the tables
+        etag = response["ETag"]
+        self.client.put(f"/api/v1/tables/{self.tables[0].pk}/", {"number": 1, "seats": 6}, format="json")
+        self.assertEqual(self.client.get("/api/v1/reservations/", headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_table_list(self):
+        anonymous = APIClient()
+        etag = anonymous.get("/api/v1/tables/")["ETag"]
+        self.assertUnchanged("/api/v1/tables/", etag, client=anonymous)
+        self.assertNotEqual(self.client.get("/api/v1/tables/")["ETag"], etag)
+
+        params = {"datetime": "2030-05-17T20:00:00Z"}
+        free = anonymous.get("/api/v1/tables/", params)["ETag"]
+        self.assertUnchanged("/api/v1/tables/", free, client=anonymous, params=params)
+
+        self.client.post("/api/v1/tables/", {"number": 9, "seats": 2}, format="json")
+        self.assertEqual(anonymous.get("/api/v1/tables/", headers={"If-None-Match": etag}).status_code, 200)
+        self.assertEqual(anonymous.get("/api/v1/tables/", params, headers={"If-None-Match": free}).status_code, 200)
+
+    async def test_async_views_share_the_etags(self):
+        etag = (await sync_to_async(self.client.get)("/api/v1/reservations/"))["ETag"]
+        request = AsyncRequestFactory().get("/api/v1/reservations/", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual((await reservation_async_views.reservation_list(request)).status_code, 304)
+
+
+@override_settings(DATABASE_REPLICAS=["replica0"])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def read_alias(self, method="get", **headers):
+        @replicas.replica_reads
+        def view(request):
+            return HttpResponse(router.db_for_read(Reservation))
+
+        return view(getattr(RequestFactory(), method)("/", headers=headers)).content.decode()
+
+    def write(self, status=201, **headers):
+        middleware = replicas.ReplicaPinMiddleware(lambda request: HttpResponse(status=status))
+        return middleware(RequestFactory().post("/", headers=headers))
+
+    def test_reads_go_to_a_replica_and_writes_to_the_primary(self):
+        self.assertEqual(self.read_alias(), "replica0")
+        self.assertEqual(self.read_alias("post"), "default")
+        with replicas.reading_from("replica0"):
+            self.assertEqual(router.db_for_write(Reservation), "default")
+
+    def test_replica_payloads_are_cached_once_the_generation_settled(self):
+        def fill(alias=None):
+            with replicas.reading_from(alias):
+                return caching.cached("test", "key", ["gen:test"], lambda: router.db_for_read(Reservation))
+
+        caching.reset_counters()
+        caching._bump(["gen:test"])
+        # The replica may still miss the write that just bumped gen:test
+        self.assertEqual(fill("replica0"), "replica0")
+        self.assertEqual(fill("replica0"), "replica0")
+        self.assertEqual(caching.counters()["test"], {"hits": 0, "misses": 2})
+        with mock.patch("api.caching.time.time", return_value=time.time() + settings.REPLICA_PIN_SECONDS + 1):
+            fill("replica0")
+        self.assertEqual(fill(), "replica0")
+        self.assertEqual(caching.counters()["test"], {"hits": 1, "misses": 3})
+
+        # The primary is never behind
+        caching._bump(["gen:test"])
+        self.assertEqual(fill(), "default")
+        self.assertEqual(fill("replica0"), "default")
+
+    def test_clients_that_wrote_read_the_primary(self):
+        self.write(status=400, Authorization="Bearer a")
+        self.assertEqual(self.read_alias(Authorization="Bearer a"), "replica0")
+
+        response = self.write(Authorization="Bearer a")
+        self.assertEqual(self.read_alias(Authorization="Bearer a"), "default")
+        self.assertEqual(self.read_alias(Authorization="Bearer b"), "replica0")
+        # Anonymous customers are pinned by cookie
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE]["max-age"], settings.REPLICA_PIN_SECONDS)
+        self.assertEqual(self.read_alias(Cookie=f"{replicas.PIN_COOKIE}=1"), "default")
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate("replica0", "reservations"))
+        self.assertTrue(router.allow_migrate("default", "reservations"))
+
+
+@override_settings(WAITLIST_WORKERS=0)
+class WaitlistTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.booked = [self.reserve(at(20), table, guests=4) for table in self.tables]
+
+    def wait(self, hour, guests, minute=0):
+        response = APIClient().post("/api/v1/reservations/waitlist/", {
+            "customer_name": "Rui", "customer_phone": "912345678",
+            "start_datetime": at(hour, minute).isoformat(), "guests": guests,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return WaitlistEntry.objects.get(pk=response.json()["id"])
+
+    def test_cancellation_books_the_longest_waiting_party_that_fits(self):
+        too_big = self.wait(20, 6)
+        first = self.wait(20, 4, minute=30)
+        later = self.wait(19, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/v1/reservations/{self.booked[1].pk}/", {"status": "CANCELLED"}, format="json")
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, WaitlistEntry.STATUS_BOOKED)
+        self.assertEqual(first.reservation.start_datetime, at(20, 30))
+        self.assertEqual(list(first.reservation.tables.all()), [self.tables[1]])
+        self.assertEqual(
+            list(WaitlistEntry.objects.filter(pk__in=[too_big.pk, later.pk]).values_list("status", flat=True)),
+            [WaitlistEntry.STATUS_WAITING] * 2,
+        )
+
+        # Deleting an active reservation frees its tables too
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/reservations/{self.booked[0].pk}/")
+        later.refresh_from_db()
+        self.assertEqual(later.status, WaitlistEntry.STATUS_BOOKED)
+
+    def test_bulk_update_frees_cancelled_and_moved_reservations(self):
+        entry = self.wait(20, 4)
+        row = {"customer_name": "Ana", "customer_phone": "912345678",
+               "start_datetime": "2030-05-17T20:00:00Z", "guests": 4}
+        rows = [
+            {**row, "id": self.booked[0].pk, "status": "CANCELLED"},
+            {**row, "id": self.booked[1].pk, "start_datetime": "2030-05-17T12:00:00Z"},
+            # Same window and tables: nothing is freed
+            {**row, "id": self.booked[2].pk, "status": "CONFIRMED"},
+        ]
+
+        with mock.patch.object(waitlist, "freed", wraps=waitlist.freed) as freed:
+            with self.captureOnCommitCallbacks(execute=True):
+                report = self.client.post("/api/v1/reservations/bulk/", rows, format="json").json()
+        self.assertEqual(report["updated"], 3)
+        # The cancelled and the moved reservation left the same window: one match
+        freed.assert_called_once_with(current_id(), at(20), self.booked[0].end_datetime)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistEntry.STATUS_BOOKED)
+
+    def test_no_job_without_waiting_parties(self):
+        self.wait(12, 2)
+        with mock.patch.object(waitlist, "_submit") as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f"/api/v1/reservations/{self.booked[0].pk}/", {"status": "CANCELLED"}, format="json")
+        submit.assert_not_called()
+
+    def test_staff_manage_the_list(self):
+        entry = self.wait(20, 2)
+        self.assertEqual(APIClient().get("/api/v1/reservations/waitlist/").status_code, 403)
+        self.assertEqual([row["id"] for row in self.client.get("/api/v1/reservations/waitlist/").json()], [entry.pk])
+        self.assertEqual(self.client.delete(f"/api/v1/reservations/waitlist/{entry.pk}/").status_code, 204)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistEntry.STATUS_CANCELLED)
+
+
+class AnalyticsTests(StaffClientMixin, TestCase):
+    def test_heatmap_rates_and_table_utilization(self):
+        self.reserve(at(20), self.tables[0], guests=4, status=Reservation.STATUS_CONFIRMED)
+        # Two guests over eight seats: one guest per table
+        self.reserve(at(20, 30), self.tables[1], self.tables[2])
+        self.reserve(at(12), self.tables[0], status=Reservation.STATUS_CANCELLED)
+
+        week = {"start_date": "2030-05-13", "end_date": "2030-05-19"}
+        self.assertEqual(APIClient().get("/api/v1/reservations/analytics/", week).status_code, 401)
+        data = self.client.get("/api/v1/reservations/analytics/", week).json()
+        self.assertEqual((data["reservations"], data["cancelled"], data["cancellation_rate"]), (3, 1, 0.3333))
+
+        friday = dict(zip(data["heatmap"]["hours"], data["heatmap"]["occupancy"][4]))
+        # Guest-hours over the 12 seats of one Friday
+        self.assertEqual([friday[hour] for hour in (12, 19, 20, 21, 22, 23)], [0, 0, 0.4167, 0.5, 0.0833, 0])
+        self.assertEqual(sum(map(sum, data["heatmap"]["occupancy"])), sum(friday.values()))
+        # Two hours held out of 7 x 14 service hours
+        self.assertEqual([(row["number"], row["hours"], row["utilization"]) for row in data["tables"]], [
+            (1, 2.0, 0.0204), (2, 2.0, 0.0204), (3, 2.0, 0.0204),
+        ])
+
+        config.current()
+        # Reservations, their tables, the series, the tables (and the series' tables when there are series)
+        with self.assertNumQueries(4):
+            analytics.build(date(2030, 5, 13), date(2030, 5, 19), (10, 24))
+
+    def test_series_occurrences_count_as_reservations(self):
+        response = self.client.post("/api/v1/reservations/series/", {
+            "customer_name": "Lda", "customer_phone": "912345678", "guests": 4,
+            "start_datetime": at(20, day=3).isoformat(), "frequency": "WEEKLY", "count": 4,
+            "tables_ids": [self.tables[0].pk],
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.reserve(at(12), self.tables[1], status=Reservation.STATUS_CANCELLED)
+
+        data = self.client.get("/api/v1/reservations/analytics/", {"start_date": "2030-05-01", "end_date": "2030-05-31"}).json()
+        self.assertEqual((data["reservations"], data["cancelled"], data["cancellation_rate"]), (5, 1, 0.2))
+        friday = dict(zip(data["heatmap"]["hours"], data["heatmap"]["occupancy"][4]))
+        # Four occurrences of four guests over the 12 seats of five Fridays
+        self.assertEqual([friday[hour] for hour in (19, 20, 21, 22)], [0, 0.2667, 0.2667, 0])
+        self.assertEqual([row["hours"] for row in data["tables"]], [8.0, 0.0, 0.0])
+
+    def test_no_shows_are_reservations_that_ended_pending(self):
+        past = timezone.now() - timedelta(days=3)
+        self.reserve(past, self.tables[0])
+        self.reserve(past, self.tables[1], status=Reservation.STATUS_CONFIRMED)
+        self.reserve(past, self.tables[2], status=Reservation.STATUS_CANCELLED)
+
+        data = self.client.get("/api/v1/reservations/analytics/", {"date": timezone.localdate(past).isoformat()}).json()
+        self.assertEqual((data["no_shows"], data["no_show_rate"]), (1, 0.5))
+
+
+class BatchActionTests(StaffClientMixin, TestCase):
+    def batch(self, action, ids, **fields):
+        response = self.client.post(
+            "/api/v1/reservations/batch/", {"action": action, "ids": ids, **fields}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row["id"]: row.get("detail") for row in response.json()["results"]}
+
+    def statuses(self):
+        return dict(Reservation.objects.values_list("pk", "status"))
+
+    def test_confirm_and_cancel_with_one_statement_and_one_invalidation(self):
+        evening = [self.reserve(at(20), table) for table in self.tables]
+        cancelled = self.reserve(at(12), self.tables[0], status=Reservation.STATUS_CANCELLED)
+
+        with mock.patch.object(caching, "invalidate_reservations", wraps=caching.invalidate_reservations) as invalidate:
+            results = self.batch("confirm", [r.pk for r in evening] + [cancelled.pk, 999])
+        invalidate.assert_called_once()
+        self.assertEqual(results, {
+            **{r.pk: None for r in evening},
+            cancelled.pk: "Cancelled reservations cannot be confirmed.",
+            999: "Not found.",
+        })
+        self.assertEqual(set(self.statuses().values()), {Reservation.STATUS_CONFIRMED, Reservation.STATUS_CANCELLED})
+
+        # The same statements whatever the number of ids
+        with self.assertNumQueries(5):
+            self.batch("cancel", [evening[0].pk])
+        with self.assertNumQueries(5):
+            self.batch("cancel", [r.pk for r in evening[1:]])
+        self.assertEqual(set(self.statuses().values()), {Reservation.STATUS_CANCELLED})
+        self.assertFalse(TableSlotOccupancy.objects.exists())
+
+        self.batch("delete", [r.pk for r in evening])
+        self.assertEqual(list(self.statuses()), [cancelled.pk])
+
+        url = "/api/v1/reservations/batch/"
+        self.assertEqual(self.client.post(url, {"action": "move", "ids": [1]}, format="json").status_code, 400)
+        self.assertEqual(APIClient().post(url, {"action": "cancel", "ids": [1]}, format="json").status_code, 401)
+
+    def test_reassign_checks_seats_and_clashes(self):
+        big = Table.objects.create(number=9, seats=8)
+        moving = self.reserve(at(20), self.tables[0], guests=4)
+        clashing = self.reserve(at(21), self.tables[1], guests=4)
+        too_big = self.reserve(at(12), self.tables[2], guests=10)
+        # Someone already sits at the big table late in the evening
+        self.reserve(at(22), big)
+
+        results = self.batch("reassign", [moving.pk, clashing.pk, too_big.pk], tables_ids=[big.pk])
+        self.assertEqual(results, {
+            moving.pk: None,
+            # Overlaps both the reservation moved before it and the one at 22:00
+            clashing.pk: f"Tables already reserved for this time: [{big.pk}]",
+            too_big.pk: "Selected tables do not seat all guests.",
+        })
+        self.assertEqual(list(moving.tables.all()), [big])
+        self.assertEqual(list(clashing.tables.all()), [self.tables[1]])
+        self.assertEqual(
+            set(TableSlotOccupancy.objects.filter(reservation=moving).values_list("table_id", flat=True)), {big.pk}
+        )
+
+
+class ArchiveTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        long_ago = timezone.now().replace(microsecond=0) - timedelta(days=400)
+        self.old = [
+            self.reserve(long_ago, self.tables[0], self.tables[1], status=Reservation.STATUS_CONFIRMED),
+            self.reserve(long_ago + timedelta(days=1), self.tables[0], status=Reservation.STATUS_CANCELLED),
+            self.reserve(long_ago + timedelta(days=2), self.tables[2]),
+        ]
+        self.recent = self.reserve(timezone.now() - timedelta(days=3), self.tables[0])
+        self.upcoming = self.reserve(timezone.now() + timedelta(days=3), self.tables[0])
+
+    def archive(self, **options):
+        call_command("archive_reservations", stdout=StringIO(), **options)
+
+    def test_moves_finished_reservations_and_their_tables_in_chunks(self):
+        self.archive(chunk_size=2)
+
+        self.assertEqual(set(Reservation.objects.values_list("pk", flat=True)), {self.recent.pk, self.upcoming.pk})
+        archived = ArchivedReservation.objects.in_venue().order_by("start_datetime")
+        self.assertEqual([row.pk for row in archived], [reservation.pk for reservation in self.old])
+        self.assertEqual(archived[0].tables_ids, [self.tables[0].pk, self.tables[1].pk])
+        self.assertEqual(archived[1].status, Reservation.STATUS_CANCELLED)
+        self.assertFalse(Reservation.tables.through.objects.filter(reservation_id__in=[r.pk for r in self.old]).exists())
+        self.assertFalse(TableSlotOccupancy.objects.filter(reservation_id__in=[r.pk for r in self.old]).exists())
+
+        # Running again finds nothing left to move
+        self.archive(days=1)
+        self.assertEqual(ArchivedReservation.objects.count(), 4)
+        with self.assertRaises(CommandError):
+            self.archive(before=(timezone.now() + timedelta(days=1)).isoformat())
+
+    def test_staff_query_the_history(self):
+        self.archive()
+        url = "/api/v1/reservations/archive/"
+        self.assertEqual(APIClient().get(url).status_code, 401)
+
+        first = self.client.get(url, {"limit": 2}).json()
+        self.assertEqual([row["id"] for row in first["results"]], [self.old[0].pk, self.old[1].pk])
+        second = self.client.get(url, {"limit": 2, "cursor": first["next_cursor"]}).json()
+        self.assertEqual([row["id"] for row in second["results"]], [self.old[2].pk])
+        self.assertIsNone(second["next_cursor"])
+
+        cancelled = self.client.get(url, {"status": "cancelled"}).json()["results"]
+        self.assertEqual([row["id"] for row in cancelled], [self.old[1].pk])
+        self.assertEqual(self.client.get(url, {"status": "gone"}).status_code, 400)
+        # The live list no longer carries them
+        self.assertEqual(
+            [row["id"] for row in self.client.get("/api/v1/reservations/").json()], [self.recent.pk, self.upcoming.pk]
+        )
+
+
+class PerformanceMetricsTests(StaffClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.reserve(at(12), self.tables[0])
+
+    def test_requests_are_timed_and_exported(self):
+        response = self.client.get("/api/v1/reservations/")
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=[\d.]+$')
+
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",status="200",view="reservation_list"} 1', body
+        )
+        self.assertIn('http_response_size_bytes_count{view="reservation_list"} 1', body)
+        self.assertIn('http_request_db_queries_bucket{view="reservation_list",le="+Inf"} 1', body)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+
+    def test_repeated_query_shapes_are_flagged(self):
+        def per_table_lookups(request):
+            for table in self.tables * 4:
+                Table.objects.filter(pk=table.pk).first()
+            return HttpResponse()
+
+        middleware = PerformanceMiddleware(per_table_lookups)
+        with self.assertLogs("api.performance", "WARNING") as logs:
+            response = middleware(RequestFactory().get("/"))
+        self.assertIn('desc="12 queries"', response["Server-Timing"])
+        self.assertIn("query ran 12 times", logs.output[0])
+        self.assertEqual(metrics.REPEATED_QUERIES.snapshot(), {(("view", "unresolved"),): 1})
+
+
+class SeedDataTests(TestCase):
+    def seed(self, **options):
+        call_command("seed_data", tables=10, days=14, per_day=40, stdout=StringIO(), **options)
+
+    def test_seeds_tables_reservations_and_a_staff_user(self):
+        self.seed()
+        self.assertEqual(Table.objects.count(), 10)
+        self.assertEqual(Reservation.objects.count(), 14 * 40)
+        self.assertTrue(get_user_model().objects.get(username="bench").is_staff)
+        self.assertTrue(TableSlotOccupancy.objects.exists())
+
+        # Dinner is busier than mid-afternoon
+        hours = [timezone.localtime(start).hour for start in Reservation.objects.values_list("start_datetime", flat=True)]
+        self.assertGreater(sum(19 <= hour <= 21 for hour in hours), 2 * sum(15 <= hour <= 17 for hour in hours))
+
+    def test_seeds_only_what_the_api_accepts(self):
+        # Few tables for the peaks, so some parties find none free
+        call_command("seed_data", tables=3, days=2, per_day=60, stdout=StringIO())
+        held = {}
+        for reservation in Reservation.objects.prefetch_related("tables"):
+            tables = list(reservation.tables.all())
+            self.assertGreaterEqual(sum(table.seats for table in tables), reservation.guests)
+            if reservation.status in Reservation.ACTIVE_STATUSES:
+                for table in tables:
+                    held.setdefault(table.pk, []).append((reservation.start_datetime, reservation.end_datetime))
+        self.assertTrue(Reservation.objects.filter(status=Reservation.STATUS_CANCELLED).exists())
+        for windows in held.values():
+            windows.sort()
+            for (_start, end), (next_start, _end) in zip(windows, windows[1:]):
+                self.assertLessEqual(end, next_start)
+
+    def test_refuses_to_seed_over_existing_data_without_flush(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(flush=True, seed=1)
+        self.assertEqual(Reservation.objects.count(), 14 * 40)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_runs_every_scenario_as_a_venue_member(self):
+        out = StringIO()
+        # The test database stands in for the throwaway one
+        with mock.patch(
+            "reservations.management.commands.benchmark.throwaway_database", contextlib.nullcontext
+        ):
+            call_command("benchmark", tables=5, days=3, per_day=10, repeat=1, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["reservations"], 30)
+        self.assertIn("stats_day", report["results"])
+        self.assertIn("analytics_year", report["results"])
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN output is SQLite's")
+class QueryPlanTests(TestCase):
+    """The hot filters are answered from indexes, not table scans."""
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f"INDEX {index}", plan)
+        self.assertNotRegex(plan, r"SCAN reservations_reservation\b")
+
+    def test_day_range_uses_the_venue_start_index(self):
+        self.assertUsesIndex(hourly_rows(date(2030, 5, 17), date(2030, 5, 17)), "reservation_venue_start_idx")
+        self.assertUsesIndex(
+            filter_reservations(Reservation.objects.in_venue(), {"start": "2030-05-17", "status": "pending"}),
+            "reservation_venue_start_idx",
+        )
+
+    def test_table_filter_uses_the_through_table_index(self):
+        self.assertUsesIndex(
+            filter_reservations(Reservation.objects.all(), {"table": "1,2"}), "reservation_tables_table_res_idx"
+        )
+        self.assertUsesIndex(_grid_links([at(12), at(13)], Reservation.DURATION, [1, 2]), "reservation_tables_table_res_idx")
+
+    def test_wal_mode_is_opt_in(self):
+        # The journal mode sticks to the file, so the committed db.sqlite3 must not be switched
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal" if os.environ.get("SQLITE_WAL") == "1" else "delete")
+
+
+class ConcurrentBookingTests(LiveServerTestCase):
+    # Keep the default venue created by the migrations across the flush
+    serialized_rollback = True
+
+    def post(self, payload):
+        request = urllib.request.Request(
+            f"{self.live_server_url}/api/v1/reservations/",
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+    def test_parallel_bookings_never_double_book(self):
+        cache.clear()
+        tables = [Table.objects.create(number=n, seats=4) for n in range(1, 6)]
+        payloads = [
+            {
+                "customer_name": f"Guest {i}", "customer_phone": "912345678",
+                "start_datetime": f"2030-05-17T20:{i % 4 * 15:02d}:00Z", "guests": 2,
+                "tables_ids": [tables[i % len(tables)].id],
+            }
+            for i in range(200)
+        ]
+
+        with ThreadPoolExecutor(max_workers=24) as pool:
+            codes = list(pool.map(self.post, payloads))
+
+        self.assertEqual(codes.count(201), len(tables))
+        self.assertEqual(codes.count(409), len(payloads) - len(tables))
+        per_table = Reservation.tables.through.objects.values_list("table_id", flat=True)
+        self.assertEqual(sorted(per_table), sorted(table.id for table in tables))
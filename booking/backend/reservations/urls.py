@@ -1,8 +1,20 @@
 from django.urls import path
-from . import views
+from api.async_views import read_async
+from . import async_views, views
 
 urlpatterns = [
-    path("stats/", views.reservation_stats, name="reservation_stats"),
-    path("", views.reservation_list, name="reservation_list"),
-    path("<int:pk>/", views.reservation_detail, name="reservation_detail"),
+    path("stats/", read_async(async_views.reservation_stats)(views.reservation_stats), name="reservation_stats"),
+    path("analytics/", views.reservation_analytics, name="reservation_analytics"),
+    path("batch/", views.reservation_batch, name="reservation_batch"),
+    path("bulk/", views.reservation_bulk, name="reservation_bulk"),
+    path("archive/", views.reservation_archive, name="reservation_archive"),
+    path("export/", views.reservation_export, name="reservation_export"),
+    path("config/", views.restaurant_config, name="restaurant_config"),
+    path("series/", views.series_list, name="series_list"),
+    path("series/occurrences/", views.series_occurrences, name="series_occurrences"),
+    path("series/<int:pk>/", views.series_detail, name="series_detail"),
+    path("waitlist/", views.waitlist_list, name="waitlist_list"),
+    path("waitlist/<int:pk>/", views.waitlist_detail, name="waitlist_detail"),
+    path("", read_async(async_views.reservation_list)(views.reservation_list), name="reservation_list"),
+    path("<int:pk>/", read_async(async_views.reservation_detail)(views.reservation_detail), name="reservation_detail"),
 ]
@@ -1,45 +1,102 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from django.http import StreamingHttpResponse
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Sum, Count
-from datetime import datetime, timedelta
+from django.views.decorators.http import condition
+from datetime import date
 
-from .models import Reservation
-from .serializers import ReservationSerializer
-from tables.models import Table
+from api import caching, streams
+from api.replicas import replica_reads
+from venues import access
+from venues.access import IsVenueMember
+from . import analytics, archive, batch, booking, bulk, config, listing, recurrence, serializers, stats
+from .models import ArchivedReservation, Reservation, ReservationSeries, RestaurantConfig, WaitlistEntry
+from .serializers import (
+    ArchivedReservationSerializer, ReservationSerializer, ReservationSeriesSerializer, RestaurantConfigSerializer,
+    WaitlistEntrySerializer,
+)
 
+
+def conflict_response(exc):
+    return Response({"detail": exc.detail, "tables_ids": exc.table_ids}, status=status.HTTP_409_CONFLICT)
+
+def forbidden_response():
+    return Response({"detail": "You do not work for this venue"}, status=status.HTTP_403_FORBIDDEN)
+
+def reservation_list_etag(request):
+    """Answers a repeated GET with 304 from the cache, before any query"""
+    if request.method != 'GET' or not access.is_member(request.user):
+        return None
+    return caching.etag(request, caching.reservations_gen_keys())
+
+@replica_reads
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, streams.NDJSONRenderer])
+@condition(etag_func=reservation_list_etag)
 def reservation_list(request):
     if request.method == 'GET':
         if not request.user.is_authenticated:
             return Response({"detail": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
-            
-        reservations = Reservation.objects.all()
-        serializer = ReservationSerializer(reservations, many=True)
-        return Response(serializer.data)
+        if not access.is_member(request.user):
+            return forbidden_response()
+
+        params = request.query_params
+        try:
+            reservations = listing.filter_reservations(Reservation.objects.in_venue(), params)
+            limit = listing.page_size(params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Streaming export: ?format=ndjson
+        if request.accepted_renderer.format == streams.NDJSON:
+            rows = streams.ndjson_lines(serializers.iter_serialized(reservations))
+            return StreamingHttpResponse(rows, content_type=streams.NDJSONRenderer.media_type)
+
+        # Keyset pagination; without limit/cursor the plain list is capped at
+        # MAX_LIST_SIZE rows and the next cursor travels in a header
+        paged = 'limit' in params or 'cursor' in params
+        try:
+            page, next_cursor = listing.paginate(
+                reservations.values(*serializers.RESERVATION_FIELDS),
+                params.get('cursor'),
+                limit if paged else listing.MAX_LIST_SIZE,
+            )
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if paged:
+            return Response({"results": serializers.serialize_rows(page), "next_cursor": next_cursor})
+
+        response = Response(serializers.serialize_rows(page))
+        if next_cursor:
+            response[listing.NEXT_CURSOR_HEADER] = next_cursor
+        return response
     
     elif request.method == 'POST':
         serializer = ReservationSerializer(data=request.data)
         if serializer.is_valid():
-            reservation = serializer.save()
-            
-            # Add tables to reservation if tables_ids were provided
-            tables_ids = request.data.get('tables_ids', [])
-            if tables_ids:
-                tables = Table.objects.filter(id__in=tables_ids, is_active=True)
-                reservation.tables.set(tables)
-            
+            # Saves the reservation and its tables_ids in one locked transaction;
+            # with auto_assign and no tables_ids the server picks the tables
+            try:
+                booking.book(
+                    serializer,
+                    auto_assign=bool(request.data.get('auto_assign', False)),
+                    respect_groups=bool(request.data.get('respect_groups', False)),
+                )
+            except booking.BookingConflict as exc:
+                return conflict_response(exc)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsVenueMember])
 def reservation_detail(request, pk):
     try:
-        reservation = Reservation.objects.get(pk=pk)
+        reservation = Reservation.objects.in_venue().get(pk=pk)
     except Reservation.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
     
@@ -50,14 +107,10 @@ def reservation_detail(request, pk):
     elif request.method == 'PUT':
         serializer = ReservationSerializer(reservation, data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            
-            # Update tables if tables_ids were provided
-            tables_ids = request.data.get('tables_ids')
-            if tables_ids is not None:
-                tables = Table.objects.filter(id__in=tables_ids, is_active=True)
-                reservation.tables.set(tables)
-            
+            try:
+                booking.book(serializer)
+            except booking.BookingConflict as exc:
+                return conflict_response(exc)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -65,8 +118,10 @@ def reservation_detail(request, pk):
         # For status updates only
         status_value = request.data.get('status')
         if status_value and status_value in [Reservation.STATUS_PENDING, Reservation.STATUS_CONFIRMED, Reservation.STATUS_CANCELLED]:
-            reservation.status = status_value
-            reservation.save()
+            try:
+                booking.set_status(reservation, status_value)
+            except booking.BookingConflict as exc:
+                return conflict_response(exc)
             serializer = ReservationSerializer(reservation)
             return Response(serializer.data)
         return Response({"detail": "Invalid status value"}, status=status.HTTP_400_BAD_REQUEST)
@@ -75,54 +130,208 @@ def reservation_detail(request, pk):
         reservation.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
         
+def stats_request(params, conf):
+    """(start_date, end_date, opening_hours) of a stats request; ValueError with the detail otherwise"""
+    today = timezone.localdate()
+    try:
+        # A single ?date=, or a ?start_date=&end_date= range (inclusive); defaults to today
+        start_date = date.fromisoformat(params.get('start_date') or params.get('date') or today.isoformat())
+        end_date = date.fromisoformat(params.get('end_date') or start_date.isoformat())
+    except ValueError:
+        raise ValueError("Invalid date format")
+    if end_date < start_date or (end_date - start_date).days >= settings.RESERVATION_STATS_MAX_DAYS:
+        raise ValueError("Invalid date range")
+
+    # Defaults to the span of the configured service periods
+    default_open, default_close = conf.opening_hours()
+    try:
+        opening_hours = (int(params.get('open', default_open)), int(params.get('close', default_close)))
+    except ValueError:
+        raise ValueError("Invalid opening hours")
+    if not 0 <= opening_hours[0] < opening_hours[1] <= 24:
+        raise ValueError("Invalid opening hours")
+    return start_date, end_date, opening_hours
+
+def stats_cache_key(start_date, end_date, opening_hours):
+    return f"{start_date}:{end_date}:{opening_hours[0]}:{opening_hours[1]}"
+
+@replica_reads
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsVenueMember])
 def reservation_stats(request):
-    # Get the current date in the server's timezone
-    today = timezone.now().date()
-    
-    # Start and end of today
-    start_of_day = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-    end_of_day = timezone.make_aware(datetime.combine(today, datetime.max.time()))
-    
-    # Filter reservations for today that are not cancelled
-    today_reservations = Reservation.objects.filter(
-        start_datetime__range=(start_of_day, end_of_day),
-        status__in=[Reservation.STATUS_PENDING, Reservation.STATUS_CONFIRMED]
+    try:
+        start_date, end_date, opening_hours = stats_request(request.query_params, config.current())
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = caching.cached(
+        'stats',
+        stats_cache_key(start_date, end_date, opening_hours),
+        caching.stats_gen_keys(start_date, end_date),
+        lambda: stats.build_stats(start_date, end_date, opening_hours),
     )
-    
-    # Calculate stats
-    total_reservations = today_reservations.count()
-    total_guests = today_reservations.aggregate(total=Sum('guests'))['total'] or 0
-    
-    # Calculate reservations by status
-    pending_count = today_reservations.filter(status=Reservation.STATUS_PENDING).count()
-    confirmed_count = today_reservations.filter(status=Reservation.STATUS_CONFIRMED).count()
-    
-    # Get reservations for each hour of the day
-    hourly_data = []
-    for hour in range(10, 24):  # Restaurant hours from 10AM to 11PM
-        hour_start = timezone.make_aware(datetime.combine(today, datetime.min.time().replace(hour=hour)))
-        hour_end = hour_start + timedelta(hours=1)
-        
-        hour_reservations = today_reservations.filter(
-            start_datetime__range=(hour_start, hour_end)
-        )
-        
-        hourly_count = hour_reservations.count()
-        hourly_guests = hour_reservations.aggregate(total=Sum('guests'))['total'] or 0
-        
-        hourly_data.append({
-            'hour': f"{hour}:00",
-            'reservations': hourly_count,
-            'guests': hourly_guests
-        })
-    
-    return Response({
-        'date': today.strftime('%Y-%m-%d'),
-        'total_reservations': total_reservations,
-        'total_guests': total_guests,
-        'pending_reservations': pending_count,
-        'confirmed_reservations': confirmed_count,
-        'hourly_data': hourly_data
-    })
+    return Response(data)
+
+@replica_reads
+@api_view(['GET'])
+@permission_classes([IsVenueMember])
+def reservation_analytics(request):
+    # Same date range and opening hours parameters as the stats
+    try:
+        start_date, end_date, opening_hours = stats_request(request.query_params, config.current())
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(analytics.build(start_date, end_date, opening_hours))
+
+@api_view(['POST'])
+@permission_classes([IsVenueMember])
+def reservation_bulk(request):
+    # Body: a JSON list, CSV (text/csv) or NDJSON (application/x-ndjson) rows
+    try:
+        options = streams.import_options(request.query_params)
+        report = bulk.import_rows(streams.request_rows(request), **options)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report.as_dict())
+
+@api_view(['POST'])
+@permission_classes([IsVenueMember])
+def reservation_batch(request):
+    # Body: {"action": "confirm" | "cancel" | "delete" | "reassign", "ids": [...], "tables_ids": [...]}
+    serializer = batch.BatchActionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"results": batch.apply(**serializer.validated_data)})
+
+@api_view(['GET'])
+@permission_classes([IsVenueMember])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, streams.CSVRenderer, streams.NDJSONRenderer])
+def reservation_export(request):
+    fmt = request.accepted_renderer.format
+    if fmt not in streams.FORMATS:
+        fmt = streams.NDJSON
+    try:
+        reservations = listing.filter_reservations(Reservation.objects.in_venue(), request.query_params)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    rows = streams.lines(bulk.export_rows(reservations), fmt, bulk.FIELDS)
+    media_type = streams.CSVRenderer.media_type if fmt == streams.CSV else streams.NDJSONRenderer.media_type
+    return StreamingHttpResponse(rows, content_type=media_type)
+
+@replica_reads
+@api_view(['GET'])
+@permission_classes([IsVenueMember])
+def reservation_archive(request):
+    # History moved out of the hot table by the archive_reservations command, always paginated
+    params = request.query_params
+    try:
+        history = archive.filter_history(ArchivedReservation.objects.in_venue(), params)
+        page, next_cursor = listing.paginate(history.values(), params.get('cursor'), listing.page_size(params))
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"results": ArchivedReservationSerializer(page, many=True).data, "next_cursor": next_cursor})
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsVenueMember])
+def series_list(request):
+    if request.method == 'GET':
+        series = ReservationSeries.objects.in_venue().prefetch_related('tables').order_by('start_datetime', 'id')
+        return Response(ReservationSeriesSerializer(series, many=True).data)
+
+    serializer = ReservationSeriesSerializer(data=request.data)
+    if serializer.is_valid():
+        try:
+            booking.book_series(serializer)
+        except booking.BookingConflict as exc:
+            return conflict_response(exc)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+@permission_classes([IsVenueMember])
+def series_detail(request, pk):
+    try:
+        series = ReservationSeries.objects.in_venue().get(pk=pk)
+    except ReservationSeries.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'GET':
+        return Response(ReservationSeriesSerializer(series).data)
+
+    if request.method == 'DELETE':
+        series.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    # PATCH can skip one occurrence with {"exceptions": [...]} or cancel the series
+    serializer = ReservationSeriesSerializer(series, data=request.data, partial=request.method == 'PATCH')
+    if serializer.is_valid():
+        try:
+            booking.book_series(serializer)
+        except booking.BookingConflict as exc:
+            return conflict_response(exc)
+        return Response(serializer.data)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@permission_classes([IsVenueMember])
+def series_occurrences(request):
+    """Occurrences of every series starting in [start, end), expanded on read"""
+    try:
+        start = listing.parse_bound(request.query_params.get('start', ''), 'start')
+        end = listing.parse_bound(request.query_params.get('end', ''), 'end')
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if end <= start or (end - start).days > settings.RESERVATION_STATS_MAX_DAYS:
+        return Response({"detail": "Invalid date range"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(serializers.serialize_occurrences(recurrence.occurrences(start, end)))
+
+@api_view(['GET', 'PUT'])
+@permission_classes([AllowAny])
+def restaurant_config(request):
+    # Public so the booking form knows the service periods and durations
+    if request.method == 'GET':
+        return Response(serializers.config_payload(config.current()))
+
+    if not access.is_member(request.user):
+        return forbidden_response()
+    serializer = RestaurantConfigSerializer(RestaurantConfig.objects.in_venue().first(), data=request.data)
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializers.config_payload(config.current()))
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def waitlist_list(request):
+    # Anyone can join, like booking; staff see who is waiting
+    if request.method == 'GET':
+        if not access.is_member(request.user):
+            return forbidden_response()
+        entries = WaitlistEntry.objects.in_venue().order_by('start_datetime', 'created_at', 'id')
+        if request.query_params.get('status'):
+            entries = entries.filter(status=request.query_params['status'].upper())
+        return Response(WaitlistEntrySerializer(entries, many=True).data)
+
+    serializer = WaitlistEntrySerializer(data=request.data)
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsVenueMember])
+def waitlist_detail(request, pk):
+    try:
+        entry = WaitlistEntry.objects.in_venue().get(pk=pk)
+    except WaitlistEntry.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'GET':
+        return Response(WaitlistEntrySerializer(entry).data)
+
+    # Kept for the record; a booked entry keeps its reservation
+    if entry.status == WaitlistEntry.STATUS_WAITING:
+        entry.status = WaitlistEntry.STATUS_CANCELLED
+        entry.save(update_fields=['status'])
+    return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,147 @@
+"""
+Waitlist matching.
+
+A cancelled or deleted reservation frees its tables for its window. The
+signal handlers hand the window to ``freed``, which queues a job once the
+transaction commits; a worker thread then runs ``match``:
+
+* the candidates are the waiting parties whose stay would overlap the window,
+  read with one range scan on ``waitlist_venue_match_idx`` and capped at
+  ``WAITLIST_MATCH_CANDIDATES``, longest waiting first;
+* the first one that the tables free at its time can seat (``tables.assignment``)
+  is booked. Candidates wanting the same start and length share one lookup.
+
+Booking goes through ``booking.book``, which locks the tables and re-checks
+them like any other booking, and the entry is marked in the same transaction,
+so two workers never book one party or one table twice. The cancel request
+only pays for an indexed check that someone is waiting, and for queuing the job.
+
+Jobs live in the memory of the process that queued them: a job lost in a
+restart only delays the party until the next cancellation. With
+``WAITLIST_WORKERS = 0`` jobs run in the committing thread instead.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from tables import assignment
+from venues import routing
+from . import booking, config
+from .models import WaitlistEntry
+from .serializers import ReservationSerializer
+
+logger = logging.getLogger("reservations.waitlist")
+
+
+def candidates(start, end):
+    """Waiting entries whose stay would overlap [start, end), longest waiting first."""
+    earliest = max(start - config.current().max_duration, timezone.now())
+    return WaitlistEntry.objects.in_venue().filter(
+        status=WaitlistEntry.STATUS_WAITING,
+        start_datetime__gt=earliest,
+        start_datetime__lt=end,
+    ).order_by('created_at', 'id')[:settings.WAITLIST_MATCH_CANDIDATES]
+
+
+def _book(entry, table_ids):
+    """Book ``entry`` on ``table_ids`` and mark it in one transaction; None when it lost a race."""
+    serializer = ReservationSerializer(data={
+        'customer_name': entry.customer_name,
+        'customer_phone': entry.customer_phone,
+        'start_datetime': entry.start_datetime,
+        'guests': entry.guests,
+        'notes': entry.notes,
+        'tables_ids': table_ids,
+    })
+    try:
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            locked = WaitlistEntry.objects.select_for_update().filter(
+                pk=entry.pk, status=WaitlistEntry.STATUS_WAITING
+            ).first()
+            if locked is None:
+                return None
+            locked.reservation = booking.book(serializer)
+            locked.status = WaitlistEntry.STATUS_BOOKED
+            locked.save(update_fields=['reservation', 'status'])
+            return locked
+    except (booking.BookingConflict, serializers.ValidationError):
+        return None
+
+
+def match(start, end):
+    """Book the best waiting party into the freed [start, end) of the current venue; returns its entry or None."""
+    conf = config.current()
+    free = {}
+    for entry in candidates(start, end):
+        window = conf.duration_for(entry.guests)
+        key = (entry.start_datetime, window)
+        if key not in free:
+            free[key] = assignment.free_tables(entry.start_datetime, window)
+        table_ids = assignment.best_assignment(free[key], entry.guests)
+        if table_ids is None:
+            continue
+        booked = _book(entry, table_ids)
+        if booked is not None:
+            return booked
+        # Someone else took the tables (or the party) meanwhile: look again
+        free.clear()
+    return None
+
+
+def run(venue_id, start, end):
+    """``match`` in ``venue_id``; what a queued job does."""
+    with routing.activate(venue_id):
+        return match(start, end)
+
+
+_jobs = queue.Queue()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def _work():
+    while True:
+        job = _jobs.get()
+        try:
+            run(*job)
+        except Exception:
+            logger.exception("Waitlist matching failed for venue %s, %s - %s", *job)
+        finally:
+            # Worker threads outlive requests, so nothing else closes their connection
+            close_old_connections()
+            _jobs.task_done()
+
+
+def _submit(job):
+    if not settings.WAITLIST_WORKERS:
+        run(*job)
+        return
+    with _workers_lock:
+        while len(_workers) < settings.WAITLIST_WORKERS:
+            worker = threading.Thread(target=_work, name="waitlist-worker", daemon=True)
+            worker.start()
+            _workers.append(worker)
+    _jobs.put(job)
+
+
+def freed(venue_id, start, end):
+    """Queue a match for tables freed during [start, end) once the transaction commits."""
+
+    def submit():
+        with routing.activate(venue_id):
+            waiting = candidates(start, end).exists()
+        if waiting:
+            _submit((venue_id, start, end))
+
+    transaction.on_commit(submit)
+
+
+def join():
+    """Wait until every queued job has run."""
+    _jobs.join()
@@ -0,0 +1,101 @@
+"""
+Automatic table assignment.
+
+Given a party size and the set of free tables, pick the combination that
+wastes the fewest seats, then uses the fewest tables. The search is a 0/1
+knapsack over total seats: an optimal combination never exceeds
+``guests + largest table - 1`` seats (dropping any table from a larger one
+would still seat the party), so the table is at most
+``len(tables) x (guests + max seats)`` cells.
+"""
+from dataclasses import dataclass
+
+from reservations import config
+from . import availability
+
+
+@dataclass(frozen=True)
+class FreeTable:
+    id: int
+    seats: int
+    group: str = ''
+
+
+def best_combination(tables, guests):
+    """
+    Ids of the tables in ``tables`` that seat ``guests`` with the least waste,
+    or None when the tables cannot seat the party together.
+    """
+    tables = sorted(tables, key=lambda table: (-table.seats, table.id))
+    tables = [table for table in tables if table.seats > 0]
+    if guests <= 0 or sum(table.seats for table in tables) < guests:
+        return None
+
+    cap = guests + tables[0].seats - 1
+    unreachable = len(tables) + 1
+    # fewest[c]: fewest tables reaching exactly c seats; taken[i] marks the
+    # capacities improved by table i, for reconstruction
+    fewest = [0] + [unreachable] * cap
+    taken = []
+    for table in tables:
+        improved = set()
+        for c in range(cap, table.seats - 1, -1):
+            candidate = fewest[c - table.seats] + 1
+            if candidate < fewest[c]:
+                fewest[c] = candidate
+                improved.add(c)
+        taken.append(improved)
+
+    total = next((c for c in range(guests, cap + 1) if fewest[c] < unreachable), None)
+    if total is None:
+        return None
+
+    chosen = []
+    for index in range(len(tables) - 1, -1, -1):
+        if total in taken[index]:
+            chosen.append(tables[index].id)
+            total -= tables[index].seats
+    return sorted(chosen)
+
+
+def best_assignment(tables, guests, respect_groups=False):
+    """
+    Like ``best_combination``; with ``respect_groups`` a combination of several
+    tables must come from a single adjacency group, while any single table
+    still qualifies.
+    """
+    if not respect_groups:
+        return best_combination(tables, guests)
+
+    groups = {}
+    for table in tables:
+        if table.group:
+            groups.setdefault(table.group, []).append(table)
+    candidates = [best_combination(members, guests) for members in groups.values()]
+
+    # Any table big enough on its own, grouped or not
+    singles = [table for table in tables if table.seats >= guests]
+    if singles:
+        smallest = min(singles, key=lambda table: (table.seats, table.id))
+        candidates.append([smallest.id])
+
+    seats = {table.id: table.seats for table in tables}
+    candidates = [ids for ids in candidates if ids]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda ids: (sum(seats[i] for i in ids), len(ids), ids))
+
+
+def free_tables(start, window=None):
+    """Active tables free during [start, start + window), read with a single query."""
+    rows = availability.available_tables(start, window).values_list('id', 'seats', 'group')
+    return [FreeTable(*row) for row in rows]
+
+
+def suggest(start, guests, respect_groups=False, window=None):
+    """
+    Best table ids for a party at ``start``, or None when it cannot be seated.
+    The tables must stay free for ``window``, by default the party's configured duration.
+    """
+    window = window or config.current().duration_for(guests)
+    return best_assignment(free_tables(start, window), guests, respect_groups)
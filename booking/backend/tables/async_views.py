@@ -0,0 +1,64 @@
+"""
+Async versions of the availability endpoints (see ``api/async_views.py``).
+Each mirrors the GET branch of its DRF view in ``views.py``.
+"""
+from api import caching
+from api.async_views import Fallback, conditional, json_response, optional_user
+from api.replicas import replica_reads
+from reservations import config
+from . import availability
+from .serializers import TableSerializer
+from .views import (
+    day_start, grid_cache_key, grid_payload, grid_request, grid_rows, grid_slots, slot_cache_key, slot_request,
+)
+
+
+@replica_reads
+async def table_list(request):
+    await optional_user(request)
+    datetime_str = request.GET.get('datetime')
+    if not datetime_str:
+        # The plain table list is not a hot path
+        raise Fallback()
+    try:
+        target_datetime, window = slot_request(request.GET, await config.acurrent())
+    except ValueError as exc:
+        return json_response({"detail": str(exc)}, status=400)
+
+    async def compute():
+        tables = (await availability.aavailable_tables(target_datetime, window)).values(*TableSerializer.Meta.fields)
+        return [table async for table in tables]
+
+    async def respond():
+        data = await caching.acached(
+            'availability',
+            slot_cache_key(target_datetime, window),
+            caching.availability_gen_keys(target_datetime),
+            compute,
+        )
+        return json_response(data)
+
+    etag = await caching.aetag(request, caching.availability_gen_keys(target_datetime))
+    return await conditional(request, etag, respond)
+
+
+async def table_availability(request):
+    await optional_user(request)
+    conf = await config.acurrent()
+    try:
+        day, guests, step = grid_request(request.GET, conf)
+    except ValueError as exc:
+        return json_response({"detail": str(exc)}, status=400)
+
+    window = conf.duration_for(guests)
+
+    async def compute():
+        return grid_rows(await availability.aslot_grid(grid_slots(day, step, window, conf), window))
+
+    rows = await caching.acached(
+        'availability-grid',
+        grid_cache_key(day, step, window),
+        caching.availability_gen_keys(day_start(day)),
+        compute,
+    )
+    return json_response(grid_payload(day, guests, step, rows))
@@ -0,0 +1,185 @@
+"""Availability engine used by the table endpoints.
+
+Every lookup here runs a fixed number of queries, no matter how many
+reservations exist: reserved tables are read from ``TableSlotOccupancy`` with a
+single range scan over its ``(venue, slot, table)`` index, and tables held by
+recurring series with one more query (``reservations.recurrence.held``).
+Every lookup is confined to the current venue.
+
+``window`` is how long the table must stay free; it defaults to the
+configured reservation length (``reservations.config``).
+"""
+import heapq
+from bisect import bisect_left
+
+from reservations import config, recurrence
+from reservations.models import Reservation, TableSlotOccupancy
+from reservations.occupancy import slot_floor, slots_covering
+from .models import Table
+
+
+def _window(window):
+    return window or config.current().default_duration
+
+
+def _occupied(window_start, window_end):
+    """
+    Occupancy rows of reservations overlapping [window_start, window_end).
+
+    The buckets only narrow the scan; the reservation's own start and end
+    decide, so one ending inside the bucket where the window starts is no clash.
+    """
+    return TableSlotOccupancy.objects.in_venue().filter(
+        slot__gte=slot_floor(window_start),
+        slot__lt=window_end,
+        reservation__start_datetime__lt=window_end,
+        reservation__end_datetime__gt=window_start,
+    )
+
+
+def _series_table_ids(start, window):
+    return {table_id for _start, _end, table_id, _series in recurrence.held(start, start + window)}
+
+
+def reserved_table_ids(start, window=None, exclude_reservation=None):
+    """Return the ids of tables already held during [start, start + window)."""
+    window = _window(window)
+    occupied = _occupied(start, start + window)
+    if exclude_reservation is not None:
+        occupied = occupied.exclude(reservation_id=exclude_reservation)
+    return set(occupied.values_list('table_id', flat=True)) | _series_table_ids(start, window)
+
+
+def _free_tables(start, window, series_table_ids):
+    occupied = _occupied(start, start + window)
+    return (
+        Table.objects.in_venue().filter(is_active=True)
+        .exclude(id__in=occupied.values('table_id'))
+        .exclude(id__in=series_table_ids)
+    )
+
+
+def available_tables(start, window=None):
+    """Active tables free during [start, start + window); the series lookup is the only other query."""
+    window = _window(window)
+    return _free_tables(start, window, _series_table_ids(start, window))
+
+
+async def aavailable_tables(start, window=None):
+    """``available_tables`` for async views."""
+    window = window or (await config.acurrent()).default_duration
+    held = await recurrence.aheld(start, start + window)
+    return _free_tables(start, window, {table_id for _start, _end, table_id, _series in held})
+
+
+def available_table_ids_by_slot(slots, window=None):
+    """
+    Answer many candidate start times at once.
+
+    Returns a dict mapping each slot to the sorted ids of active tables that
+    are free for the whole window. Two queries are issued regardless of the
+    number of slots: one for the active tables and one range scan over the
+    occupancy buckets spanned by the slots, plus the series lookup.
+    """
+    slots = sorted(set(slots))
+    if not slots:
+        return {}
+    window = _window(window)
+
+    active_ids = sorted(Table.objects.in_venue().filter(is_active=True).values_list('id', flat=True))
+    rows = list(_occupied(slots[0], slots[-1] + window).values_list(
+        'slot', 'table_id', 'reservation__start_datetime', 'reservation__end_datetime'
+    ))
+    for start, end, table_id, _series in recurrence.held(slots[0], slots[-1] + window):
+        rows.extend((bucket, table_id, start, end) for bucket in slots_covering(start, end))
+    rows.sort(key=lambda row: row[0])
+    buckets = [row[0] for row in rows]
+
+    result = {}
+    for slot in slots:
+        lo = bisect_left(buckets, slot_floor(slot))
+        hi = bisect_left(buckets, slot + window)
+        reserved = {
+            table_id for _bucket, table_id, start, end in rows[lo:hi] if start < slot + window and end > slot
+        }
+        result[slot] = [table_id for table_id in active_ids if table_id not in reserved]
+    return result
+
+
+def _grid_links(slots, window, table_ids):
+    # A plain interval overlap on the stored ends (reservation_end_start_idx)
+    return Reservation.tables.through.objects.filter(
+        reservation__end_datetime__gt=slots[0],
+        reservation__start_datetime__lt=slots[-1] + window,
+        reservation__status__in=Reservation.ACTIVE_STATUSES,
+        table_id__in=table_ids,
+    ).values_list('reservation__start_datetime', 'reservation__end_datetime', 'table_id')
+
+
+def slot_grid(slots, window=None):
+    """
+    Free tables and seats for every slot of a grid, in one pass.
+
+    Reads the active tables and the (start, end, table) of every active
+    reservation and series occurrence touching the grid (three queries), then
+    sweeps the sorted slots:
+    reservations enter when they start before the end of a slot's window and
+    leave once they end before the slot starts. Returns one dict per slot with
+    ``free_tables`` and ``free_seats``.
+    """
+    slots = sorted(set(slots))
+    if not slots:
+        return []
+    window = _window(window)
+    seats = dict(Table.objects.in_venue().filter(is_active=True).values_list('id', 'seats'))
+    links = list(_grid_links(slots, window, list(seats)))
+    links += _series_links(recurrence.held(slots[0], slots[-1] + window), seats)
+    return _sweep(slots, window, seats, links)
+
+
+async def aslot_grid(slots, window=None):
+    """``slot_grid`` for async views."""
+    slots = sorted(set(slots))
+    if not slots:
+        return []
+    window = window or (await config.acurrent()).default_duration
+    seats = {
+        pk: count async for pk, count in Table.objects.in_venue().filter(is_active=True).values_list('id', 'seats')
+    }
+    links = [link async for link in _grid_links(slots, window, list(seats))]
+    links += _series_links(await recurrence.aheld(slots[0], slots[-1] + window), seats)
+    return _sweep(slots, window, seats, links)
+
+
+def _series_links(held, seats):
+    return [(start, end, table_id) for start, end, table_id, _series in held if table_id in seats]
+
+
+def _sweep(slots, window, seats, links):
+    intervals = sorted(links)
+    total_seats = sum(seats.values())
+    held = {}  # table id -> number of overlapping reservations
+    held_seats = 0
+    ending = []  # heap of (end, table id) for reservations in the sweep
+    next_interval = 0
+    grid = []
+    for slot in slots:
+        while next_interval < len(intervals) and intervals[next_interval][0] < slot + window:
+            _start, end, table_id = intervals[next_interval]
+            next_interval += 1
+            heapq.heappush(ending, (end, table_id))
+            held[table_id] = held.get(table_id, 0) + 1
+            if held[table_id] == 1:
+                held_seats += seats[table_id]
+        while ending and ending[0][0] <= slot:
+            _end, table_id = heapq.heappop(ending)
+            held[table_id] -= 1
+            if held[table_id] == 0:
+                del held[table_id]
+                held_seats -= seats[table_id]
+        grid.append({
+            'slot': slot,
+            'free_tables': len(seats) - len(held),
+            'free_seats': total_seats - held_seats,
+        })
+    return grid
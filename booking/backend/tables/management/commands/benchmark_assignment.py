@@ -0,0 +1,48 @@
+import json
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.benchmarking import measure, seed_reservations, seed_tables, throwaway_database
+from tables import assignment
+from tables.assignment import FreeTable
+
+
+class Command(BaseCommand):
+    help = "Benchmark the table assignment solver on large floors"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--floors", type=int, nargs="+", default=[200, 500, 1000])
+        parser.add_argument("--parties", type=int, nargs="+", default=[2, 6, 12, 30, 60])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        results = {"solver": {}}
+        for size in options["floors"]:
+            rng = random.Random(size)
+            floor = [
+                FreeTable(i, rng.choice([2, 2, 4, 4, 4, 6, 8]), f"zone-{i % 10}")
+                for i in range(1, size + 1)
+            ]
+            results["solver"][size] = {
+                party: {
+                    "mixed": measure(lambda: assignment.best_assignment(floor, party), repeat)["median_ms"],
+                    "grouped": measure(
+                        lambda: assignment.best_assignment(floor, party, respect_groups=True), repeat
+                    )["median_ms"],
+                }
+                for party in options["parties"]
+            }
+
+        # End to end: free-set query plus solver on a busy 200-table floor
+        with throwaway_database():
+            seed_reservations(50_000, seed_tables(200), days=90)
+            slot = timezone.now().replace(hour=20, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            results["suggest_200_tables"] = {
+                party: measure(lambda: assignment.suggest(slot, party), repeat)
+                for party in options["parties"]
+            }
+        self.stdout.write(json.dumps(results, indent=2))
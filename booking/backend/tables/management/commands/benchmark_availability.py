@@ -0,0 +1,41 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.benchmarking import measure, seed_reservations, seed_tables, throwaway_database
+from tables import availability
+
+
+class Command(BaseCommand):
+    help = "Benchmark the table availability engine against a seeded throwaway database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tables", type=int, default=60)
+        parser.add_argument("--reservations", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            table_ids = seed_tables(options["tables"])
+            seed_reservations(options["reservations"], table_ids)
+
+            # Friday 20:00 is the busiest slot of the week
+            now = timezone.now().replace(hour=20, minute=0, second=0, microsecond=0)
+            friday = now + timedelta(days=(4 - now.weekday()) % 7)
+            day_slots = [
+                friday.replace(hour=10) + timedelta(minutes=15 * i) for i in range(49)
+            ]
+
+            results = {
+                "reservations": options["reservations"],
+                "tables": options["tables"],
+                "single_slot": measure(
+                    lambda: list(availability.available_tables(friday)), options["repeat"]
+                ),
+                "day_of_slots": measure(
+                    lambda: availability.available_table_ids_by_slot(day_slots), options["repeat"]
+                ),
+            }
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tables", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="table",
+            name="group",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+    ]
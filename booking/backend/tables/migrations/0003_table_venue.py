@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Existing rows belong to the default venue created by venues.0001
+APP = "tables"
+MODELS = ("Table",)
+
+
+def fill_venue(apps, schema_editor):
+    Venue = apps.get_model("venues", "Venue")
+    venue = Venue.objects.get(slug=settings.DEFAULT_VENUE)
+    for model in MODELS:
+        apps.get_model(APP, model).objects.update(venue=venue)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tables", "0002_table_group"),
+        ("venues", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="table",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.RunPython(fill_venue, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="table",
+            name="venue",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="venues.venue",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="table",
+            name="number",
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name="table",
+            index=models.Index(
+                fields=["venue", "is_active"], name="table_venue_active_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="table",
+            constraint=models.UniqueConstraint(
+                fields=("venue", "number"), name="table_venue_number_unique"
+            ),
+        ),
+    ]
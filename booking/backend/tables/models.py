@@ -1,10 +1,22 @@
 from django.db import models
+from venues.models import VenueScopedModel
 
 
-class Table(models.Model):
-    number = models.PositiveIntegerField(unique=True)
+class Table(VenueScopedModel):
+    # Unique within the venue
+    number = models.PositiveIntegerField()
     seats = models.PositiveIntegerField()
     is_active = models.BooleanField(default=True)
+    # Tables sharing a group are adjacent and can be joined for one party
+    group = models.CharField(max_length=32, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["venue", "number"], name="table_venue_number_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["venue", "is_active"], name="table_venue_active_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Table {self.number} ({self.seats} seats)"
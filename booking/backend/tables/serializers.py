@@ -4,4 +4,13 @@ from .models import Table
 class TableSerializer(serializers.ModelSerializer):
     class Meta:
         model = Table
-        fields = ['id', 'number', 'seats', 'is_active']
+        fields = ['id', 'number', 'seats', 'is_active', 'group']
+
+    def validate_number(self, value):
+        # Numbers are unique per venue, which ModelSerializer cannot check without the venue field
+        tables = Table.objects.in_venue().filter(number=value)
+        if self.instance is not None:
+            tables = tables.exclude(pk=self.instance.pk)
+        if tables.exists():
+            raise serializers.ValidationError("table with this number already exists.")
+        return value
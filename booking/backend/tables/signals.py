@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api import caching, events
+from .models import Table
+
+
+@receiver(post_save, sender=Table)
+def table_saved(sender, instance, created, **kwargs):
+    caching.invalidate_tables(instance.venue_id)
+    events.table_changed(
+        instance.pk, events.TABLE_CREATED if created else events.TABLE_UPDATED, venue_id=instance.venue_id
+    )
+
+
+@receiver(post_delete, sender=Table)
+def table_deleted(sender, instance, **kwargs):
+    caching.invalidate_tables(instance.venue_id)
+    events.table_changed(instance.pk, events.TABLE_DELETED, venue_id=instance.venue_id)
@@ -1,3 +1,190 @@
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from reservations.models import Reservation
+from venues.routing import current_id
+from . import assignment, availability
+from .assignment import FreeTable
+from .models import Table
+
+
+def at(hour, minute=0):
+    return datetime(2030, 5, 17, hour, minute, tzinfo=dt_timezone.utc)
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tables = [Table.objects.create(number=n, seats=4) for n in range(1, 5)]
+        Table.objects.create(number=99, seats=4, is_active=False)
+
+    def reserve(self, start, *tables, status=Reservation.STATUS_CONFIRMED):
+        reservation = Reservation.objects.create(
+            customer_name="Ana", customer_phone="912345678",
+            start_datetime=start, guests=2, status=status,
+        )
+        reservation.tables.set(tables)
+        return reservation
+
+    def test_overlapping_reservations_hide_their_tables(self):
+        self.reserve(at(19), self.tables[0])
+        self.reserve(at(20, 30), self.tables[1])
+        self.reserve(at(20), self.tables[2], status=Reservation.STATUS_CANCELLED)
+        # Ends exactly when the requested window starts
+        self.reserve(at(18), self.tables[3])
+
+        free = availability.available_tables(at(20))
+        self.assertEqual(
+            sorted(free.values_list("number", flat=True)), [3, 4]
+        )
+
+    def test_reservations_off_the_bucket_grid_only_touching_do_not_clash(self):
+        # 20:05-22:05 shares the 22:00 bucket with a 22:05 booking, not a minute
+        self.reserve(at(20, 5), self.tables[0])
+
+        self.assertIn(self.tables[0], availability.available_tables(at(22, 5)))
+        self.assertNotIn(self.tables[0], availability.available_tables(at(22)))
+        self.assertNotIn(self.tables[0].id, availability.reserved_table_ids(at(22, 5)))
+        result = availability.available_table_ids_by_slot([at(18, 5), at(18, 10), at(22), at(22, 5)])
+        self.assertEqual(
+            [self.tables[0].id in result[slot] for slot in (at(18, 5), at(18, 10), at(22), at(22, 5))],
+            [True, False, False, True],
+        )
+
+    def test_table_list_query_count_is_constant(self):
+        for minute in range(0, 120, 5):
+            self.reserve(at(19) + timedelta(minutes=minute), self.tables[0], self.tables[1])
+
+        # The free tables and the series holding tables
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/tables/", {"datetime": "2030-05-17T20:00:00Z"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t["number"] for t in response.json()], [3, 4])
+
+    def test_invalid_datetime(self):
+        response = self.client.get("/api/v1/tables/", {"datetime": "tonight"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_many_slots_at_once(self):
+        self.reserve(at(19), self.tables[0])
+        slots = [at(16), at(18), at(20, 30), at(21)]
+
+        with self.assertNumQueries(3):
+            result = availability.available_table_ids_by_slot(slots)
+
+        ids = [t.id for t in self.tables]
+        self.assertEqual(result[at(16)], ids)
+        self.assertEqual(result[at(18)], ids[1:])
+        self.assertEqual(result[at(20, 30)], ids[1:])
+        self.assertEqual(result[at(21)], ids)
+
+
+class AssignmentTests(TestCase):
+    def test_least_waste_then_fewest_tables(self):
+        tables = [FreeTable(1, 2), FreeTable(2, 4), FreeTable(3, 4), FreeTable(4, 6), FreeTable(5, 8)]
+        self.assertEqual(assignment.best_combination(tables, 4), [2])
+        self.assertEqual(assignment.best_combination(tables, 7), [5])
+        self.assertEqual(assignment.best_combination(tables, 10), [2, 4])
+        self.assertEqual(assignment.best_combination(tables, 24), [1, 2, 3, 4, 5])
+        self.assertIsNone(assignment.best_combination(tables, 25))
+
+    def test_groups_keep_parties_together(self):
+        tables = [
+            FreeTable(1, 4, "terrace"), FreeTable(2, 4, "hall"),
+            FreeTable(3, 2, "hall"), FreeTable(4, 4, "hall"), FreeTable(5, 6),
+        ]
+        self.assertEqual(assignment.best_assignment(tables, 8), [1, 2])
+        self.assertEqual(assignment.best_assignment(tables, 8, respect_groups=True), [2, 4])
+        self.assertEqual(assignment.best_assignment(tables, 6, respect_groups=True), [5])
+        self.assertIsNone(assignment.best_assignment(tables, 12, respect_groups=True))
+
+    def test_suggest_endpoint_skips_reserved_tables(self):
+        cache.clear()
+        big = Table.objects.create(number=1, seats=8)
+        Table.objects.create(number=2, seats=4)
+        Table.objects.create(number=3, seats=4)
+        reservation = Reservation.objects.create(
+            customer_name="Ana", customer_phone="912345678", start_datetime=at(19), guests=8,
+        )
+        reservation.tables.set([big])
+
+        response = APIClient().get("/api/v1/tables/suggest/", {"datetime": "2030-05-17T20:00:00Z", "guests": 7})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([t["number"] for t in data["tables"]], [2, 3])
+        self.assertEqual(data["wasted_seats"], 1)
+
+        response = APIClient().get("/api/v1/tables/suggest/", {"datetime": "2030-05-17T20:00:00Z", "guests": 9})
+        self.assertEqual(response.status_code, 409)
+
+
+class DayGridTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.small = Table.objects.create(number=1, seats=2)
+        self.large = Table.objects.create(number=2, seats=6)
+
+    def reserve(self, start, table, status=Reservation.STATUS_CONFIRMED):
+        reservation = Reservation.objects.create(
+            customer_name="Ana", customer_phone="912345678",
+            start_datetime=start, guests=2, status=status,
+        )
+        reservation.tables.set([table])
+
+    def test_grid_matches_single_slot_lookups(self):
+        self.reserve(at(12), self.large)
+        self.reserve(at(13, 30), self.large)
+        self.reserve(at(19, 45), self.small)
+        self.reserve(at(20), self.large, status=Reservation.STATUS_CANCELLED)
+
+        with self.assertNumQueries(3):
+            response = APIClient().get("/api/v1/tables/availability/", {"date": "2030-05-17", "guests": 4})
+        slots = response.json()["slots"]
+
+        self.assertEqual(len(slots), 49)
+        self.assertEqual(slots[0]["time"], "10:00")
+        self.assertEqual(slots[-1]["time"], "22:00")
+        for row in slots:
+            start = datetime.fromisoformat(row["datetime"])
+            free = availability.available_tables(start)
+            self.assertEqual(row["free_tables"], free.count(), row)
+            self.assertEqual(row["available"], sum(t.seats for t in free) >= 4, row)
+
+        by_time = {row["time"]: row for row in slots}
+        self.assertEqual(by_time["11:00"]["free_seats"], 2)
+        self.assertEqual(by_time["15:30"]["free_seats"], 8)
+        self.assertFalse(by_time["14:00"]["available"])
+
+    def test_invalid_parameters(self):
+        for params in ({}, {"date": "2030-05-17", "guests": 0}, {"date": "2030-05-17", "step": 1}):
+            response = APIClient().get("/api/v1/tables/availability/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class BulkTableTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        staff = get_user_model().objects.create(username="staff", is_staff=True)
+        staff.venues.add(current_id())
+        self.client.force_authenticate(staff)
+        Table.objects.create(number=1, seats=2)
+
+    def test_upsert_by_number_and_export(self):
+        body = "number,seats,group\n1,4,terrace\n2,6,terrace\n3,x,\n"
+        response = self.client.post("/api/v1/tables/bulk/", body, content_type="text/csv")
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(response.json()["updated"], 1)
+        self.assertEqual(response.json()["errors"][0]["line"], 4)
+        self.assertEqual(list(Table.objects.order_by("number").values_list("number", "seats", "group")), [
+            (1, 4, "terrace"), (2, 6, "terrace"),
+        ])
 
-# Create your tests here.
+        response = self.client.get("/api/v1/tables/export/", {"format": "ndjson"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["number"] for line in lines], [1, 2])
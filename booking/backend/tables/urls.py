@@ -1,7 +1,12 @@
 from django.urls import path
-from . import views
+from api.async_views import read_async
+from . import async_views, views
 
 urlpatterns = [
-    path("", views.table_list, name="table_list"),
+    path("", read_async(async_views.table_list)(views.table_list), name="table_list"),
+    path("suggest/", views.table_suggest, name="table_suggest"),
+    path("availability/", read_async(async_views.table_availability)(views.table_availability), name="table_availability"),
+    path("bulk/", views.table_bulk, name="table_bulk"),
+    path("export/", views.table_export, name="table_export"),
     path("<int:pk>/", views.table_detail, name="table_detail"),
 ]
@@ -1,16 +1,66 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.views.decorators.http import condition
+from datetime import date, datetime, time, timedelta
 
+from api import caching, streams
+from api.replicas import replica_reads
+from reservations import config
+from venues import access
+from venues.access import IsVenueMember
+from . import assignment, availability, bulk
 from .models import Table
 from .serializers import TableSerializer
-from reservations.models import Reservation
 
+
+def parse_datetime_param(value):
+    """Parse an ISO datetime query parameter into an aware datetime."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def slot_request(params, conf):
+    """(datetime, window) of an availability lookup; ValueError with the detail otherwise"""
+    try:
+        target_datetime = parse_datetime_param(params.get('datetime', ''))
+    except ValueError:
+        raise ValueError("Invalid datetime format")
+    # ?guests= holds the tables for that party's duration instead of the default one
+    try:
+        guests = int(params['guests']) if params.get('guests') else None
+    except ValueError:
+        raise ValueError("Invalid guests value")
+    if guests is not None and guests < 1:
+        raise ValueError("Invalid guests value")
+    return target_datetime, conf.duration_for(guests)
+
+def slot_cache_key(target_datetime, window):
+    return f"{target_datetime.isoformat()}:{int(window.total_seconds()) // 60}"
+
+
+def table_list_etag(request):
+    """Answers a repeated GET with 304 from the cache, before any query"""
+    if request.method != 'GET':
+        return None
+    if request.query_params.get('datetime'):
+        try:
+            target_datetime, _window = slot_request(request.query_params, config.current())
+        except ValueError:
+            return None
+        return caching.etag(request, caching.availability_gen_keys(target_datetime))
+    # Staff also see the inactive tables
+    return caching.etag(request, caching.tables_gen_keys(), access.is_member(request.user))
+
+@replica_reads
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
+@condition(etag_func=table_list_etag)
 def table_list(request):
     if request.method == 'GET':
         # Check if we're looking for available tables at a specific time
@@ -18,44 +68,25 @@ def table_list(request):
         
         if datetime_str:
             try:
-                # Parse the datetime from the query parameter
-                target_datetime = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-                
-                # Define a time window for the reservation (2 hours)
-                reservation_window_end = target_datetime + timedelta(hours=2)
-                
-                # Get all tables that are active
-                available_tables = Table.objects.filter(is_active=True)
-                
-                # Get all reservations that overlap with the requested time window
-                # A reservation overlaps if it starts before the end of our window
-                # and ends after the start of our window
-                conflicting_reservations = Reservation.objects.filter(
-                    start_datetime__lt=reservation_window_end,
-                    start_datetime__gte=target_datetime - timedelta(hours=2),
-                    status__in=[Reservation.STATUS_PENDING, Reservation.STATUS_CONFIRMED]
-                )
-                
-                # Get the IDs of tables that are already reserved during the time window
-                reserved_table_ids = set()
-                for reservation in conflicting_reservations:
-                    reserved_table_ids.update(reservation.tables.values_list('id', flat=True))
-                
-                # Filter out the reserved tables
-                if reserved_table_ids:
-                    available_tables = available_tables.exclude(id__in=reserved_table_ids)
-                
-                serializer = TableSerializer(available_tables, many=True)
-                return Response(serializer.data)
-            except ValueError:
-                return Response({"detail": "Invalid datetime format"}, status=status.HTTP_400_BAD_REQUEST)
+                target_datetime, window = slot_request(request.query_params, config.current())
+            except ValueError as exc:
+                return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Active tables not held by an overlapping reservation, in one query
+            data = caching.cached(
+                'availability',
+                slot_cache_key(target_datetime, window),
+                caching.availability_gen_keys(target_datetime),
+                lambda: TableSerializer(availability.available_tables(target_datetime, window), many=True).data,
+            )
+            return Response(data)
         
         # If no datetime provided or request from staff, return all tables
-        if not request.user.is_authenticated:
-            tables = Table.objects.filter(is_active=True)
+        if not access.is_member(request.user):
+            tables = Table.objects.in_venue().filter(is_active=True)
         else:
             # Staff users can see all tables
-            tables = Table.objects.all()
+            tables = Table.objects.in_venue()
             
         serializer = TableSerializer(tables, many=True)
         return Response(serializer.data)
@@ -64,6 +95,8 @@ def table_list(request):
         # Only authenticated users can create tables
         if not request.user.is_authenticated:
             return Response({"detail": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
+        if not access.is_member(request.user):
+            return Response({"detail": "You do not work for this venue"}, status=status.HTTP_403_FORBIDDEN)
             
         serializer = TableSerializer(data=request.data)
         if serializer.is_valid():
@@ -71,11 +104,107 @@ def table_list(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def table_suggest(request):
+    try:
+        target_datetime = parse_datetime_param(request.query_params.get('datetime', ''))
+        guests = int(request.query_params.get('guests', ''))
+    except ValueError:
+        return Response({"detail": "datetime and guests are required"}, status=status.HTTP_400_BAD_REQUEST)
+    if guests < 1:
+        return Response({"detail": "Invalid guests value"}, status=status.HTTP_400_BAD_REQUEST)
+    respect_groups = request.query_params.get('groups', '').lower() in ('1', 'true')
+
+    table_ids = assignment.suggest(target_datetime, guests, respect_groups)
+    if table_ids is None:
+        return Response(
+            {"detail": "No combination of free tables seats this party"},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    tables = Table.objects.filter(id__in=table_ids).order_by('number')
+    seats = sum(table.seats for table in tables)
+    return Response({
+        "tables": TableSerializer(tables, many=True).data,
+        "seats": seats,
+        "wasted_seats": seats - guests,
+    })
+
+def grid_request(params, conf):
+    """(day, guests, step) of a day grid request; ValueError with the detail otherwise"""
+    try:
+        day = date.fromisoformat(params.get('date', ''))
+        guests = int(params.get('guests', 1))
+        # Minutes between two slots; the configured granularity by default
+        step = int(params.get('step', conf.slot_minutes))
+    except ValueError:
+        raise ValueError("date is required as YYYY-MM-DD")
+    if guests < 1 or not 5 <= step <= 120:
+        raise ValueError("Invalid guests or step value")
+    return day, guests, step
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def grid_slots(day, step, window, conf):
+    slots = []
+    for opens, closes in conf.service_windows(day):
+        slot = opens
+        # The last slot of a service period still ends by its closing time
+        while slot + window <= closes:
+            slots.append(slot)
+            slot += timedelta(minutes=step)
+    return slots
+
+def grid_cache_key(day, step, window):
+    return f"{day}:{step}:{int(window.total_seconds()) // 60}"
+
+def grid_rows(grid):
+    return [
+        {
+            "time": timezone.localtime(row["slot"]).strftime("%H:%M"),
+            "datetime": row["slot"].isoformat(),
+            "free_tables": row["free_tables"],
+            "free_seats": row["free_seats"],
+        }
+        for row in grid
+    ]
+
+def grid_payload(day, guests, step, rows):
+    return {
+        "date": day.isoformat(),
+        "guests": guests,
+        "step": step,
+        # Free seats at least the party size means some combination seats it
+        "slots": [{**row, "available": row["free_seats"] >= guests} for row in rows],
+    }
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def table_availability(request):
+    """Availability of every bookable slot of a day for a party size"""
+    conf = config.current()
+    try:
+        day, guests, step = grid_request(request.query_params, conf)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Slots must stay free for as long as this party would hold its tables
+    window = conf.duration_for(guests)
+    rows = caching.cached(
+        'availability-grid',
+        grid_cache_key(day, step, window),
+        caching.availability_gen_keys(day_start(day)),
+        lambda: grid_rows(availability.slot_grid(grid_slots(day, step, window, conf), window)),
+    )
+    return Response(grid_payload(day, guests, step, rows))
+
 @api_view(['GET', 'PUT', 'DELETE'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsVenueMember])
 def table_detail(request, pk):
     try:
-        table = Table.objects.get(pk=pk)
+        table = Table.objects.in_venue().get(pk=pk)
     except Table.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
     
@@ -93,3 +222,25 @@ def table_detail(request, pk):
     elif request.method == 'DELETE':
         table.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['POST'])
+@permission_classes([IsVenueMember])
+def table_bulk(request):
+    # Body: a JSON list, CSV (text/csv) or NDJSON (application/x-ndjson) rows
+    try:
+        options = streams.import_options(request.query_params)
+        report = bulk.import_rows(streams.request_rows(request), **options)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report.as_dict())
+
+@api_view(['GET'])
+@permission_classes([IsVenueMember])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, streams.CSVRenderer, streams.NDJSONRenderer])
+def table_export(request):
+    fmt = request.accepted_renderer.format
+    if fmt not in streams.FORMATS:
+        fmt = streams.NDJSON
+    rows = streams.lines(bulk.export_rows(Table.objects.in_venue()), fmt, ('id', *bulk.FIELDS))
+    media_type = streams.CSVRenderer.media_type if fmt == streams.CSV else streams.NDJSONRenderer.media_type
+    return StreamingHttpResponse(rows, content_type=media_type)
@@ -0,0 +1,7 @@
+from api.async_views import authenticated_user, json_response
+from .views import user_payload
+
+
+async def auth_me(request):
+    """Async ``views.auth_me``"""
+    return json_response(user_payload(await authenticated_user(request)))
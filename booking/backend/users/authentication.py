@@ -0,0 +1,68 @@
+"""
+JWT authentication from the token's claims, without loading the user.
+
+Tokens issued by ``users.tokens`` carry the user's flags; ``request.user`` is
+then a ``ClaimsUser`` built from them. Tokens without the claims (issued before
+they were added) still authenticate against the database.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from . import revocation
+from .tokens import CLAIMS, VENUES_CLAIM
+
+
+class ClaimsUser(TokenUser):
+    @property
+    def email(self):
+        return self.token.get("email", "")
+
+    @property
+    def venue_ids(self):
+        return self.token.get(VENUES_CLAIM, [])
+
+
+def has_claims(token):
+    return all(claim in token for claim in (*CLAIMS, VENUES_CLAIM))
+
+
+def _claims_user(token):
+    if api_settings.USER_ID_CLAIM not in token:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+    return ClaimsUser(token)
+
+
+def _revoked():
+    return AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if not has_claims(validated_token):
+            return super().get_user(validated_token)
+        user = _claims_user(validated_token)
+        if revocation.is_revoked(validated_token):
+            raise _revoked()
+        return user
+
+    async def aget_user(self, validated_token):
+        """``get_user`` with the revocation (or, for old tokens, the user) read asynchronously."""
+        if not has_claims(validated_token):
+            try:
+                user = await self.user_model.objects.aget(
+                    **{api_settings.USER_ID_FIELD: validated_token[api_settings.USER_ID_CLAIM]}
+                )
+            except KeyError:
+                raise InvalidToken(_("Token contained no recognizable user identification"))
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            return user
+        user = _claims_user(validated_token)
+        if await revocation.ais_revoked(validated_token):
+            raise _revoked()
+        return user
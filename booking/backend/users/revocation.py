@@ -0,0 +1,48 @@
+"""
+Revocation of access tokens issued before a user was changed.
+
+Access tokens carry the user's flags as claims (see ``users.tokens``), so
+requests are authenticated without loading the user. When a user is deleted,
+deactivated, changes role or password, ``revoke`` stores the time in the cache;
+tokens issued up to then are rejected until they would have expired anyway.
+Revocations live in ``AUTH_REVOCATION_CACHE_ALIAS``: with the local-memory
+cache they only reach the current process, so multi-process deployments need
+a shared cache (``REDIS_URL``).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+
+
+def _cache():
+    return caches[settings.AUTH_REVOCATION_CACHE_ALIAS]
+
+
+def _key(user_id):
+    return f"auth:revoked:{user_id}"
+
+
+def revoke(user_id):
+    """Reject the user's current access tokens once the transaction commits."""
+
+    def store():
+        timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 1
+        _cache().set(_key(user_id), int(time.time()), timeout)
+
+    transaction.on_commit(store)
+
+
+def _revoked(token, revoked_at):
+    # iat has one-second resolution: a token issued in the revoking second is rejected too
+    return revoked_at is not None and token.get("iat", 0) <= revoked_at
+
+
+def is_revoked(token):
+    return _revoked(token, _cache().get(_key(token[api_settings.USER_ID_CLAIM])))
+
+
+async def ais_revoked(token):
+    return _revoked(token, await _cache().aget(_key(token[api_settings.USER_ID_CLAIM])))
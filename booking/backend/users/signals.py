@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from . import revocation
+from .tokens import CLAIMS
+
+User = get_user_model()
+
+# Changes that must not wait for the user's access tokens to expire; a new
+# password (e.g. after a reset) logs out every session holding an old token
+REVOKING_FIELDS = ("is_active", "password", *CLAIMS)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(REVOKING_FIELDS):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(*REVOKING_FIELDS).first()
+    if previous and any(previous[field] != getattr(instance, field) for field in REVOKING_FIELDS):
+        revocation.revoke(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revocation.revoke(instance.pk)
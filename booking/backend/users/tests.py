@@ -1,3 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from venues.routing import current_id
+from .tokens import ClaimsTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username="staff", password="secret", email="s@x.pt", is_staff=True)
+        self.staff.venues.add(current_id())
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post("/api/v1/auth/token/", {"username": "staff", "password": "secret"})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get(self, path, access):
+        return self.client.get(path, HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_tokens_carry_the_user_flags(self):
+        access = AccessToken(self.login()["access"])
+        self.assertEqual(
+            (access["username"], access["email"], access["is_staff"], access["is_superuser"]),
+            ("staff", "s@x.pt", True, False),
+        )
+
+    def test_authenticated_requests_do_not_load_the_user(self):
+        access = self.login()["access"]
+        with self.assertNumQueries(0):
+            response = self.get("/api/v1/auth/me/", access)
+        self.assertEqual(response.json()["username"], "staff")
+        self.assertTrue(response.json()["is_staff"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get("/api/v1/staff/ping/", access).status_code, 200)
+
+    def test_tokens_without_claims_still_authenticate(self):
+        response = self.get("/api/v1/auth/me/", AccessToken.for_user(self.staff))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["email"], "s@x.pt")
+
+    def test_deactivation_and_deletion_revoke_issued_tokens(self):
+        access = self.login()["access"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.is_active = False
+            self.staff.save()
+        self.assertEqual(self.get("/api/v1/auth/me/", access).status_code, 401)
+
+        other = User.objects.create_user(username="other", password="secret")
+        access = str(ClaimsTokenObtainPairSerializer.get_token(other).access_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(self.get("/api/v1/auth/me/", access).status_code, 401)
+
+    def test_password_change_revokes_issued_tokens(self):
+        access = self.login()["access"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.set_password("changed")
+            self.staff.save()
+        self.assertEqual(self.get("/api/v1/auth/me/", access).status_code, 401)
+
+    def test_refresh_rewrites_the_claims_and_rejects_inactive_users(self):
+        refresh = self.login()["refresh"]
+        User.objects.filter(pk=self.staff.pk).update(is_staff=False)
+        response = self.client.post("/api/v1/auth/token/refresh/", {"refresh": refresh})
+        self.assertFalse(AccessToken(response.json()["access"])["is_staff"])
+
+        User.objects.filter(pk=self.staff.pk).update(is_active=False)
+        response = self.client.post("/api/v1/auth/token/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_unrelated_saves_keep_tokens_valid(self):
+        access = self.login()["access"]
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.staff.pk).save()
+        self.assertEqual(self.get("/api/v1/auth/me/", access).status_code, 200)
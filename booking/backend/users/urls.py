@@ -1,10 +1,11 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from . import views
+from api.async_views import read_async
+from . import async_views, views
 
 urlpatterns = [
     # JWT authentication
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path("me/", views.auth_me, name="auth_me"),
+    path("me/", read_async(async_views.auth_me)(views.auth_me), name="auth_me"),
 ]
@@ -3,6 +3,7 @@ from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from rest_framework import status
+from venues.routing import current_id
 
 User = get_user_model()
 
@@ -18,15 +19,18 @@ def staff_ping(_request):
 @permission_classes([IsAuthenticated])
 def auth_me(request):
     """Get current authenticated user information"""
-    user = request.user
-    return Response({
+    return Response(user_payload(request.user))
+
+
+def user_payload(user):
+    return {
         "id": user.id,
         "username": user.username,
         "email": getattr(user, "email", ""),
         "is_superuser": bool(getattr(user, "is_superuser", False)),
         "is_staff": bool(getattr(user, "is_staff", False)),
         "is_active": bool(getattr(user, "is_active", False)),
-    })
+    }
 
 
 @api_view(["GET"]) 
@@ -64,6 +68,8 @@ def create_user(request):
     user.is_staff = is_staff
     user.is_superuser = is_superuser
     user.save()
+    # New staff work for the venue they were created in
+    user.venues.add(current_id())
     
     return Response(
         {"id": user.id, "username": user.username}, 
@@ -0,0 +1,45 @@
+"""
+Venue staff.
+
+A user works for the venues whose ``staff`` lists them; superusers work for
+every venue. Users authenticated from token claims carry their venue ids in
+the token (``users.tokens``), so the check needs no query; other users are
+looked up.
+"""
+from rest_framework.permissions import BasePermission
+
+from .routing import current_id
+
+
+def _claimed(user, venue_id):
+    venue_ids = getattr(user, "venue_ids", None)
+    return None if venue_ids is None else venue_id in venue_ids
+
+
+def is_member(user, venue_id=None):
+    """Whether ``user`` works for ``venue_id`` (by default the current venue)."""
+    if not user or not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    venue_id = venue_id or current_id()
+    claimed = _claimed(user, venue_id)
+    return claimed if claimed is not None else user.venues.filter(pk=venue_id).exists()
+
+
+async def ais_member(user, venue_id=None):
+    """``is_member`` for async views."""
+    if not user or not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    venue_id = venue_id or current_id()
+    claimed = _claimed(user, venue_id)
+    return claimed if claimed is not None else await user.venues.filter(pk=venue_id).aexists()
+
+
+class IsVenueMember(BasePermission):
+    """Authenticated staff of the venue the request was routed to."""
+
+    def has_permission(self, request, view):
+        return is_member(request.user)
@@ -0,0 +1,44 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+from . import routing
+
+
+def requested_slug(request):
+    return request.headers.get("X-Venue") or request.GET.get("venue") or settings.DEFAULT_VENUE
+
+
+def _unknown_venue():
+    return JsonResponse({"detail": "Unknown venue"}, status=404)
+
+
+class VenueMiddleware:
+    """Routes each request to its venue (see venues/routing.py); unknown slugs get a 404."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        try:
+            request.venue_id = routing.venue_id(requested_slug(request))
+        except routing.UnknownVenue:
+            return _unknown_venue()
+        with routing.activate(request.venue_id):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        try:
+            request.venue_id = await routing.avenue_id(requested_slug(request))
+        except routing.UnknownVenue:
+            return _unknown_venue()
+        with routing.activate(request.venue_id):
+            return await self.get_response(request)
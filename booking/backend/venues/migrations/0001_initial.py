@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_default_venue(apps, schema_editor):
+    # The existing data becomes the default venue's, worked by the existing staff
+    Venue = apps.get_model("venues", "Venue")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    venue, _created = Venue.objects.get_or_create(
+        slug=settings.DEFAULT_VENUE, defaults={"name": settings.DEFAULT_VENUE.title()}
+    )
+    venue.staff.add(*User.objects.filter(is_staff=True))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Venue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=120)),
+                ("slug", models.SlugField(max_length=40, unique=True)),
+                (
+                    "staff",
+                    models.ManyToManyField(
+                        blank=True, related_name="venues", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_default_venue, migrations.RunPython.noop),
+    ]
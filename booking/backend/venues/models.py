@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import models
+
+
+class Venue(models.Model):
+    """One restaurant. Tables, reservations, series and the configuration all belong to one."""
+
+    name = models.CharField(max_length=120)
+    # Requests pick their venue by slug (see venues/routing.py)
+    slug = models.SlugField(max_length=40, unique=True)
+    staff = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="venues", blank=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class VenueQuerySet(models.QuerySet):
+    def in_venue(self, venue_id=None):
+        """Rows of ``venue_id``, by default the venue the request was routed to."""
+        from .routing import current_id
+
+        return self.filter(venue_id=venue_id or current_id())
+
+
+class VenueScopedModel(models.Model):
+    """
+    A row belonging to one venue. Saved into the current venue when none is
+    set; read through ``objects.in_venue()``. Subclasses declare indexes that
+    lead with ``venue``, which also serve plain venue lookups.
+    """
+
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name="+", db_index=False)
+
+    objects = VenueQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.venue_id is None:
+            from .routing import current_id
+
+            self.venue_id = current_id()
+        super().save(*args, **kwargs)
@@ -0,0 +1,83 @@
+"""
+Which venue a request works on.
+
+``VenueMiddleware`` resolves the venue from the ``X-Venue`` header or the
+``?venue=`` parameter (a slug) and activates it for the request; without
+either, the ``DEFAULT_VENUE`` applies, as it does outside requests (management
+commands, the shell) unless ``activate`` says otherwise. Data access reads the
+active venue through ``current_id()``.
+
+Slugs are resolved once per ``VENUE_CACHE_SECONDS`` per process, so routing a
+request costs no query.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import Venue
+
+_venue_id = contextvars.ContextVar("venue_id", default=None)
+
+_lock = threading.Lock()
+_ids = {}  # slug -> (venue id, expiry)
+
+
+class UnknownVenue(LookupError):
+    """No venue has this slug."""
+
+
+def _cached(slug):
+    entry = _ids.get(slug)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+    return None
+
+
+def venue_id(slug):
+    """Id of the venue with ``slug``; raises ``UnknownVenue``."""
+    pk = _cached(slug)
+    if pk is not None:
+        return pk
+    pk = Venue.objects.filter(slug=slug).values_list("pk", flat=True).first()
+    if pk is None:
+        raise UnknownVenue(slug)
+    with _lock:
+        _ids[slug] = (pk, time.monotonic() + settings.VENUE_CACHE_SECONDS)
+    return pk
+
+
+async def avenue_id(slug):
+    """``venue_id`` for async code."""
+    return _cached(slug) or await sync_to_async(venue_id)(slug)
+
+
+def forget():
+    """Drop the resolved slugs; the signal handlers call this when a venue changes."""
+    with _lock:
+        _ids.clear()
+
+
+def current_id():
+    """Id of the active venue."""
+    pk = _venue_id.get()
+    return pk if pk is not None else venue_id(settings.DEFAULT_VENUE)
+
+
+async def acurrent_id():
+    """``current_id`` for async code."""
+    pk = _venue_id.get()
+    return pk if pk is not None else await avenue_id(settings.DEFAULT_VENUE)
+
+
+@contextmanager
+def activate(venue_id):
+    """Work on ``venue_id`` inside the block."""
+    token = _venue_id.set(venue_id)
+    try:
+        yield
+    finally:
+        _venue_id.reset(token)
@@ -0,0 +1,29 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users import revocation
+from . import routing
+from .models import Venue
+
+
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+def venue_changed(sender, **kwargs):
+    routing.forget()
+
+
+@receiver(m2m_changed, sender=Venue.staff.through)
+def staff_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Tokens list the user's venues; revoke them so the next refresh lists the new ones
+    if reverse:
+        users = [instance.pk]
+    elif action == "pre_clear":
+        instance._cleared_staff = list(instance.staff.values_list("pk", flat=True))
+        return
+    elif action == "post_clear":
+        users = getattr(instance, "_cleared_staff", [])
+    else:
+        users = pk_set or []
+    if action.startswith("post_"):
+        for user_id in users:
+            revocation.revoke(user_id)
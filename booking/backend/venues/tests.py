@@ -0,0 +1,69 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from reservations.models import Reservation
+from tables.models import Table
+from . import routing
+from .models import Venue
+
+
+def at(hour):
+    return datetime(2030, 5, 17, hour, tzinfo=dt_timezone.utc)
+
+
+class VenueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.main = Venue.objects.get(slug="main")
+        self.other = Venue.objects.create(slug="porto", name="Porto")
+        self.staff = get_user_model().objects.create(username="staff", is_staff=True)
+        self.staff.venues.add(self.main)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        # The same table number in both venues
+        self.main_table = Table.objects.create(number=1, seats=4)
+        with routing.activate(self.other.pk):
+            self.other_table = Table.objects.create(number=1, seats=4)
+
+    def book(self, venue, table):
+        return APIClient().post("/api/v1/reservations/", {
+            "customer_name": "Ana", "customer_phone": "912345678",
+            "start_datetime": "2030-05-17T20:00:00Z", "guests": 2, "tables_ids": [table.id],
+        }, format="json", headers={"X-Venue": venue})
+
+    def test_rows_belong_to_the_routed_venue(self):
+        self.assertEqual(self.main_table.venue_id, self.main.pk)
+        self.assertEqual(self.other_table.venue_id, self.other.pk)
+        self.assertEqual(self.book("porto", self.other_table).status_code, 201)
+        # A table of another venue cannot be booked
+        self.assertEqual(self.book("main", self.other_table).status_code, 400)
+        self.assertEqual(Reservation.objects.get().venue_id, self.other.pk)
+
+        self.assertEqual([table["id"] for table in self.client.get("/api/v1/tables/").json()], [self.main_table.id])
+        self.assertEqual(self.client.get("/api/v1/reservations/").json(), [])
+        self.assertEqual(self.client.get("/api/v1/reservations/", {"venue": "porto"}).status_code, 403)
+
+    def test_unknown_venue(self):
+        response = self.client.get("/api/v1/tables/", headers={"X-Venue": "lisboa"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "Unknown venue"})
+
+    def test_staff_work_for_their_venues_only(self):
+        self.assertEqual(self.client.get("/api/v1/reservations/stats/", {"venue": "porto"}).status_code, 403)
+        self.other.staff.add(self.staff)
+        self.assertEqual(self.client.get("/api/v1/reservations/stats/", {"venue": "porto"}).status_code, 200)
+
+    def test_availability_is_cached_per_venue(self):
+        params = {"datetime": "2030-05-17T20:00:00Z"}
+        self.assertEqual(len(APIClient().get("/api/v1/tables/", params).json()), 1)
+        self.assertEqual(len(APIClient().get("/api/v1/tables/", params, headers={"X-Venue": "porto"}).json()), 1)
+
+        # Booking in one venue leaves the other's cached grid alone
+        self.book("porto", self.other_table)
+        self.assertEqual(APIClient().get("/api/v1/tables/", params, headers={"X-Venue": "porto"}).json(), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(len(APIClient().get("/api/v1/tables/", params).json()), 1)
@@ -0,0 +1,12 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .models import Venue
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def venue_list(request):
+    """Venues a client can route to with X-Venue or ?venue="""
+    return Response(list(Venue.objects.order_by('name').values('id', 'slug', 'name')))
@@ -1 +1,4 @@
 export const API_BASE_URL: string = (import.meta as any).env.VITE_API_BASE_URL ?? 'http://localhost:8000/api/v1';
+
+// Slug of the restaurant this front end books for; empty uses the server's default venue
+export const VENUE: string = (import.meta as any).env.VITE_VENUE ?? '';
@@ -1,4 +1,4 @@
-import { API_BASE_URL } from '../config';
+import { API_BASE_URL, VENUE } from '../config';
 
 function notifyAuthChanged() {
   try {
@@ -22,6 +22,7 @@ function withAuth(init?: RequestInit): RequestInit {
     headers: {
       'Content-Type': 'application/json',
       ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      ...(VENUE ? { 'X-Venue': VENUE } : {}),
       ...(init?.headers || {}),
     },
   };
@@ -78,3 +79,33 @@ export async function apiDelete(path: string, init?: RequestInit): Promise<void>
   handleUnauthorized(res.status);
   if (!res.ok) throw new Error(`DELETE ${path} failed: ${res.status}`);
 }
+
+export type PushEventHandlers = Partial<Record<string, (data: any) => void>>;
+
+/**
+ * Subscribe to the server push channel (Server-Sent Events). Handlers are keyed by
+ * event name, e.g. 'reservation.created' or 'stats.changed'. EventSource reconnects
+ * on its own and resumes from the last event id. `onUnavailable` runs when the channel
+ * cannot be opened at all (e.g. the server answers 501 when not running under ASGI).
+ * Returns an unsubscribe function.
+ */
+export function subscribeEvents(handlers: PushEventHandlers, onUnavailable?: () => void): () => void {
+  const token = localStorage.getItem('access_token');
+  if (!token) return () => {};
+  if (typeof EventSource === 'undefined') {
+    onUnavailable?.();
+    return () => {};
+  }
+
+  // EventSource cannot send headers: the venue goes in the query string
+  const venue = VENUE ? `&venue=${encodeURIComponent(VENUE)}` : '';
+  const source = new EventSource(`${API_BASE_URL}/events/?token=${encodeURIComponent(token)}${venue}`);
+  for (const [name, handler] of Object.entries(handlers)) {
+    source.addEventListener(name, (event) => handler?.(JSON.parse((event as MessageEvent).data)));
+  }
+  // Network errors leave it CONNECTING; a refused stream closes it for good
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) onUnavailable?.();
+  };
+  return () => source.close();
+}
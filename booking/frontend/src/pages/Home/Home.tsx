@@ -1,6 +1,6 @@
 import React from 'react';
 import './Home.css';
-import { apiGet, apiPost } from '../../lib/api';
+import { apiGet, apiPost, subscribeEvents } from '../../lib/api';
 import { 
   BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
   PieChart, Pie, Cell
@@ -15,6 +15,7 @@ export default function Home() {
   const [stats, setStats] = React.useState<any>(null);
   const [loading, setLoading] = React.useState<boolean>(true);
   const [staffError, setStaffError] = React.useState<string | null>(null);
+  const [liveUpdates, setLiveUpdates] = React.useState<boolean>(true);
   
   // Customer reservation form state (always declare, but only use when isStaff is false)
   const [fullName, setFullName] = React.useState('');
@@ -64,10 +65,26 @@ export default function Home() {
     }
     
     fetchStats();
-    
-    // Refresh stats every 5 minutes
-    const interval = setInterval(fetchStats, 5 * 60 * 1000);
-    return () => clearInterval(interval);
+
+    // Refresh when the server reports a change to today's reservations
+    const today = new Date().toLocaleDateString('sv-SE');
+    // Slow fallback in case a pushed event is missed
+    let interval = setInterval(fetchStats, 5 * 60 * 1000);
+    const unsubscribe = subscribeEvents({
+      'stats.changed': (data: { dates: string[] }) => {
+        if (data.dates.includes(today)) fetchStats();
+      },
+    }, () => {
+      // No push channel: say so and poll more often instead
+      setLiveUpdates(false);
+      clearInterval(interval);
+      interval = setInterval(fetchStats, 30 * 1000);
+    });
+
+    return () => {
+      unsubscribe();
+      clearInterval(interval);
+    };
   }, [isStaff]);
 
   // Load available tables when date or time changes (for customer form)
@@ -176,6 +193,11 @@ export default function Home() {
             <p className="date-display">
               Estatísticas para hoje: {stats?.date ? new Date(stats.date).toLocaleDateString('pt-PT') : ''}
             </p>
+            {!liveUpdates && (
+              <p className="date-display">
+                Atualizações em tempo real indisponíveis; a atualizar a cada 30 segundos.
+              </p>
+            )}
           </div>
           
           {loading ? (
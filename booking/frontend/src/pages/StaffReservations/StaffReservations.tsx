@@ -1,10 +1,10 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import FullCalendar from '@fullcalendar/react';
 import dayGridPlugin from '@fullcalendar/daygrid';
 import timeGridPlugin from '@fullcalendar/timegrid';
 import interactionPlugin from '@fullcalendar/interaction';
-import { apiGet, apiPatch, apiDelete } from '../../lib/api';
+import { apiGet, apiPost, apiPatch, apiDelete, subscribeEvents } from '../../lib/api';
 import { Button } from '../../components/Buttons';
 import '../../components/Buttons/Button.css';
 import './StaffReservations.css';
@@ -22,12 +22,29 @@ interface Reservation {
   customer_name: string;
   customer_phone: string;
   start_datetime: string;
+  end_datetime: string;
   guests: number;
   notes: string;
   status: 'PENDING' | 'CONFIRMED' | 'CANCELLED';
   tables: Table[];
 }
 
+interface BatchResult {
+  id: number;
+  ok: boolean;
+  detail?: string;
+}
+
+interface ReservationPage {
+  results: Reservation[];
+  next_cursor: string | null;
+}
+
+interface DateRange {
+  start: string;
+  end: string;
+}
+
 interface AuthMe {
   id: number;
   username: string;
@@ -38,6 +55,28 @@ interface AuthMe {
 }
 
 // Utility functions
+const PAGE_SIZE = 500;
+
+// Every reservation matching the filters, one keyset page at a time
+const fetchAllPages = async (filters: Record<string, string>): Promise<Reservation[]> => {
+  const rows: Reservation[] = [];
+  let cursor: string | null = null;
+  do {
+    const query = new URLSearchParams({ ...filters, limit: String(PAGE_SIZE) });
+    if (cursor) query.set('cursor', cursor);
+    const page: ReservationPage = await apiGet<ReservationPage>(`/reservations/?${query}`);
+    rows.push(...page.results);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return rows;
+};
+
+const nextDay = (day: string) => {
+  const date = new Date(`${day}T00:00:00`);
+  date.setDate(date.getDate() + 1);
+  return date.toLocaleDateString('sv-SE');
+};
+
 const formatDateTime = (dateStr: string) => {
   const date = new Date(dateStr);
   return date.toLocaleString('pt-PT', {
@@ -59,6 +98,11 @@ const StaffReservations: React.FC = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [statusFilter, setStatusFilter] = useState<string>('all');
+  const [batchDay, setBatchDay] = useState<string>('');
+  // The dates shown by the calendar; only their reservations are loaded
+  const [range, setRange] = useState<DateRange | null>(null);
+  const filtersRef = useRef<{ range: DateRange | null; status: string }>({ range: null, status: 'all' });
+  filtersRef.current = { range, status: statusFilter };
 
   // Effects
   // Auth check
@@ -77,11 +121,16 @@ const StaffReservations: React.FC = () => {
     }
   }, [navigate]);
 
-  // Fetch reservations
+  // Fetch the reservations of the visible dates, filtered by the server
   const fetchReservations = useCallback(async () => {
+    if (!range) return;
     try {
       setLoading(true);
-      const data = await apiGet<Reservation[]>('/reservations/');
+      const data = await fetchAllPages({
+        start: range.start,
+        end: range.end,
+        ...(statusFilter !== 'all' ? { status: statusFilter } : {}),
+      });
       setReservations(data);
       setError(null);
     } catch (err) {
@@ -90,12 +139,48 @@ const StaffReservations: React.FC = () => {
     } finally {
       setLoading(false);
     }
-  }, []);
+  }, [range, statusFilter]);
 
   useEffect(() => {
     fetchReservations();
   }, [fetchReservations]);
 
+  // Apply pushed changes instead of re-fetching the whole list
+  useEffect(() => {
+    const matchesFilters = (reservation: Reservation) => {
+      const { range: shown, status } = filtersRef.current;
+      const start = new Date(reservation.start_datetime);
+      return (
+        shown !== null
+        && start >= new Date(shown.start)
+        && start < new Date(shown.end)
+        && (status === 'all' || reservation.status === status)
+      );
+    };
+    const upsert = (reservation: Reservation) => {
+      setReservations(prev => {
+        const index = prev.findIndex(res => res.id === reservation.id);
+        if (!matchesFilters(reservation)) {
+          return index === -1 ? prev : prev.filter(res => res.id !== reservation.id);
+        }
+        if (index === -1) return [...prev, reservation];
+        const next = [...prev];
+        next[index] = reservation;
+        return next;
+      });
+      setSelectedReservation(prev => (prev?.id === reservation.id ? reservation : prev));
+    };
+    return subscribeEvents({
+      'reservation.created': upsert,
+      'reservation.updated': upsert,
+      'reservation.cancelled': upsert,
+      'reservation.deleted': ({ id }: { id: number }) => {
+        setReservations(prev => prev.filter(res => res.id !== id));
+        setSelectedReservation(prev => (prev?.id === id ? null : prev));
+      },
+    });
+  }, []);
+
   // Handlers
   const handleEventClick = (info: any) => {
     const reservationId = parseInt(info.event.id);
@@ -115,10 +200,10 @@ const StaffReservations: React.FC = () => {
 
       await apiPatch(`/reservations/${id}/`, { status: newStatus });
       
-      setReservations(prevReservations => 
-        prevReservations.map(res => 
-          res.id === id ? { ...res, status: newStatus } : res
-        )
+      setReservations(prevReservations =>
+        statusFilter === 'all' || statusFilter === newStatus
+          ? prevReservations.map(res => (res.id === id ? { ...res, status: newStatus } : res))
+          : prevReservations.filter(res => res.id !== id)
       );
       
       if (selectedReservation?.id === id) {
@@ -152,20 +237,47 @@ const StaffReservations: React.FC = () => {
     }
   };
 
+  // Confirms or cancels every matching reservation of a day in one request
+  const applyToDay = async (action: 'confirm' | 'cancel') => {
+    const newStatus = action === 'confirm' ? 'CONFIRMED' : 'CANCELLED';
+
+    try {
+      // The day may lie outside the calendar's dates, so its ids come from the server
+      const ids = (await fetchAllPages({
+        start: batchDay,
+        end: nextDay(batchDay),
+        status: action === 'confirm' ? 'PENDING' : 'PENDING,CONFIRMED',
+      })).map(res => res.id);
+      if (ids.length === 0) return;
+
+      const { results } = await apiPost<{ results: BatchResult[] }>('/reservations/batch/', { action, ids });
+      const done = new Set(results.filter(result => result.ok).map(result => result.id));
+
+      setReservations(prevReservations =>
+        statusFilter === 'all' || statusFilter === newStatus
+          ? prevReservations.map(res => (done.has(res.id) ? { ...res, status: newStatus } : res))
+          : prevReservations.filter(res => !done.has(res.id))
+      );
+      setSelectedReservation(prev => (prev && done.has(prev.id) ? { ...prev, status: newStatus } : prev));
+
+      const failed = results.length - done.size;
+      setError(failed > 0 ? `${failed} reservation(s) could not be updated.` : null);
+    } catch (err) {
+      setError('Failed to update the reservations of the day. Please try again.');
+      console.error('Error applying batch action:', err);
+    }
+  };
+
   const closeReservationDetail = () => {
     setSelectedReservation(null);
   };
 
   // Computed values
-  const filteredReservations = statusFilter === 'all' 
-    ? reservations 
-    : reservations.filter(r => r.status === statusFilter);
-
-  const events = filteredReservations.map(reservation => ({
+  const events = reservations.map(reservation => ({
     id: String(reservation.id),
     title: `${reservation.customer_name} - ${reservation.guests} pessoas`,
     start: reservation.start_datetime,
-    end: new Date(new Date(reservation.start_datetime).getTime() + 2 * 60 * 60 * 1000).toISOString(),
+    end: reservation.end_datetime,
     backgroundColor: reservation.status === 'CONFIRMED' 
       ? '#4CAF50' 
       : reservation.status === 'CANCELLED' 
@@ -203,6 +315,19 @@ const StaffReservations: React.FC = () => {
               <option value="CANCELLED">Canceladas</option>
             </select>
           </div>
+
+          <div className="filter-item">
+            <label>Ações do dia</label>
+            <input type="date" value={batchDay} onChange={(e) => setBatchDay(e.target.value)} />
+            <div className="batch-actions">
+              <Button variant="success" disabled={!batchDay} onClick={() => applyToDay('confirm')}>
+                ✓ Confirmar pendentes
+              </Button>
+              <Button variant="secondary" disabled={!batchDay} onClick={() => applyToDay('cancel')}>
+                ✕ Cancelar todas
+              </Button>
+            </div>
+          </div>
         </div>
       </div>
       
@@ -210,33 +335,31 @@ const StaffReservations: React.FC = () => {
       
       {/* Calendar */}
       <div className="calendar-container">
-        {loading ? (
-          <p>A carregar reservas...</p>
-        ) : (
-          <FullCalendar
-            plugins={[dayGridPlugin, timeGridPlugin, interactionPlugin]}
-            initialView="timeGridWeek"
-            headerToolbar={{
-              left: 'prev,next today',
-              center: 'title',
-              right: 'dayGridMonth,timeGridWeek,timeGridDay'
-            }}
-            buttonText={{
-              today: 'Hoje',
-              month: 'Mês',
-              week: 'Semana',
-              day: 'Dia'
-            }}
-            locale="pt"
-            events={events}
-            eventClick={handleEventClick}
-            height="auto"
-            nowIndicator={true}
-            allDaySlot={false}
-            slotMinTime="10:00:00"
-            slotMaxTime="23:59:00"
-          />
-        )}
+        {loading && <p>A carregar reservas...</p>}
+        <FullCalendar
+          plugins={[dayGridPlugin, timeGridPlugin, interactionPlugin]}
+          initialView="timeGridWeek"
+          headerToolbar={{
+            left: 'prev,next today',
+            center: 'title',
+            right: 'dayGridMonth,timeGridWeek,timeGridDay'
+          }}
+          buttonText={{
+            today: 'Hoje',
+            month: 'Mês',
+            week: 'Semana',
+            day: 'Dia'
+          }}
+          locale="pt"
+          events={events}
+          eventClick={handleEventClick}
+          datesSet={(info) => setRange({ start: info.startStr, end: info.endStr })}
+          height="auto"
+          nowIndicator={true}
+          allDaySlot={false}
+          slotMinTime="10:00:00"
+          slotMaxTime="23:59:00"
+        />
       </div>
       
       {/* Reservation Detail */}